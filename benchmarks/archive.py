@@ -0,0 +1,90 @@
+"""Time the hot-table operations before and after archiving old posts.
+
+Fills a database with N posts spread evenly over the last few years (each
+with a comment and a vote), then times a spam re-scan, the first feed page
+and a burst of votes; archives everything older than --keep-days and runs
+the same operations again. Also reports the archiving rate and the cost of
+looking up and searching archived posts.
+
+Usage: python -m benchmarks.archive [--posts 200000] [--years 4] [--keep-days 90]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from rssx.database.db import Database
+from rssx.database.ids import next_id
+
+
+def fill(db, posts, years):
+    now = int(time.time())
+    span = years * 365 * 86400
+    with db.pool.connection() as conn:
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT INTO posts (id, author, content, timestamp, signature) VALUES (?, ?, ?, ?, ?)",
+            (
+                (f"p{i}", f"user{i % 500}", f"post number {i} about topic{i % 100}", now - span + i * span // posts, "")
+                for i in range(posts)
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO comments (id, author, timestamp, content, post_id, signature) VALUES (?, ?, ?, ?, ?, ?)",
+            ((next_id(), "bob", now, f"comment on {i}", f"p{i}", "") for i in range(posts)),
+        )
+        conn.executemany(
+            "INSERT INTO votes (post_id, username, vote_type) VALUES (?, 'seed', 'upvote')",
+            ((f"p{i}",) for i in range(posts)),
+        )
+        conn.commit()
+    while db.index_pending_search(5000):
+        pass
+
+
+def timed(label, fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"  {label:<28} {elapsed * 1000:9.2f} ms")
+    return elapsed
+
+
+def measure(db, posts, round_):
+    timed("spam re-scan", lambda: db.remove_spam_posts(["viagra"]))
+    timed("feed first page", lambda: db.get_posts_page(20), repeat=20)
+    voters = iter(range(10 ** 9))
+    timed("vote", lambda: db.vote(f"p{posts - 1}", f"{round_}-{next(voters)}", "upvote"), repeat=200)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=200000)
+    parser.add_argument("--years", type=int, default=4)
+    parser.add_argument("--keep-days", type=float, default=90)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"), archive_dir=os.path.join(tmp, "archive"))
+        fill(db, args.posts, args.years)
+        size = os.path.getsize(os.path.join(tmp, "bench.db"))
+        print(f"{args.posts} posts, {size / 2 ** 20:.0f} MB, everything hot:")
+        measure(db, args.posts, "before")
+
+        start = time.perf_counter()
+        moved = db.archive_old_posts(args.keep_days)
+        elapsed = time.perf_counter() - start
+        print(f"archived {moved} posts in {elapsed:.2f} s ({moved / elapsed:.0f} posts/s)")
+        print(f"archive files: {', '.join(sorted(os.listdir(os.path.join(tmp, 'archive'))))}")
+
+        print(f"{args.posts - moved} posts hot:")
+        measure(db, args.posts, "after")
+        timed("get archived post", lambda: db.get_post_by_id("p0"), repeat=200)
+        timed("get hot post", lambda: db.get_post_by_id(f"p{args.posts - 1}"), repeat=200)
+        timed("search across archives", lambda: db.search("topic7", 20), repeat=5)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Measure how much an online backup stalls the server.
+
+Fills a database, then keeps a few threads voting while it takes backups:
+first with the default step size, then with the whole copy in one step.
+For each run reports the backup time, the number of steps, the longest
+step (the longest a shared connection is held) and the vote latency seen
+by the writers, against the same writers with no backup running.
+
+Usage: python -m benchmarks.backup [--posts 200000] [--threads 4]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from rssx.database.backup import BACKUP_STEP_PAGES, BACKUP_STEP_PAUSE
+from rssx.database.db import Database
+
+
+def fill(db, posts):
+    with db.pool.connection() as conn:
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT INTO posts (id, author, content, timestamp, signature) VALUES (?, ?, ?, ?, ?)",
+            ((f"p{i}", f"user{i % 500}", f"post body {i} " * 20, i, "s" * 64) for i in range(posts)),
+        )
+        conn.commit()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def voting(db, posts, threads, during):
+    """Vote from threads threads while during() runs; return (result, sorted latencies)"""
+    stop = threading.Event()
+    latencies = []
+    lock = threading.Lock()
+
+    def run(n):
+        local, i = [], 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            db.vote(f"p{(n * 7919 + i) % posts}", f"voter{n}-{i}", "upvote")
+            local.append(time.perf_counter() - start)
+            i += 1
+        with lock:
+            latencies.extend(local)
+
+    pool = [threading.Thread(target=run, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    try:
+        result = during()
+    finally:
+        stop.set()
+        for thread in pool:
+            thread.join()
+    return result, sorted(latencies)
+
+
+def report(label, stats, latencies):
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    backup = f"{stats.seconds:8.2f} {stats.steps:7d} {stats.longest_step * 1000:10.1f}" if stats else " " * 26
+    print(f"{label:<16} {backup} {len(latencies):7d} {pct(0.5):7.2f} {pct(0.99):7.2f} {latencies[-1] * 1000:7.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"), pool_size=args.threads + 1)
+        fill(db, args.posts)
+        size = os.path.getsize(os.path.join(tmp, "bench.db"))
+        print(f"{args.posts} posts, {size / 2 ** 20:.0f} MB; {args.threads} threads voting")
+        print(f"{'':<16} {'backup s':>8} {'steps':>7} {'longest ms':>10} {'votes':>7} {'p50 ms':>7} {'p99 ms':>7} {'max ms':>7}")
+
+        _, latencies = voting(db, args.posts, args.threads, lambda: time.sleep(2))
+        report("no backup", None, latencies)
+        for label, pages, pause in (
+            (f"{BACKUP_STEP_PAGES} pages/step", BACKUP_STEP_PAGES, BACKUP_STEP_PAUSE),
+            ("one step", -1, 0),
+        ):
+            dest = os.path.join(tmp, "backup.db")
+            stats, latencies = voting(db, args.posts, args.threads, lambda: db.backup(dest, pages, pause))
+            report(label, stats, latencies)
+            check = Database(dest)
+            with check.pool.connection() as conn:
+                copied = conn.execute("SELECT count(*) FROM posts").fetchone()[0]
+            check.close()
+            assert copied == args.posts, f"backup has {copied} posts"
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Compare the per-word blacklist loop with BlacklistMatcher.
+
+Builds a blacklist of 10k random terms and times checking post-sized
+content against it both ways: the old loop that lower-cases the content
+once per word, and a single pass through the compiled automaton.
+
+Usage: python -m benchmarks.blacklist_matcher [--terms 10000] [--posts 200]
+"""
+import argparse
+import random
+import string
+import time
+
+from rssx.security.blacklist import BlacklistMatcher
+
+
+def random_word(rng):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 12)))
+
+
+def naive_search(words, content):
+    for word in words:
+        if word.lower() in content.lower():
+            return word
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--terms", type=int, default=10000)
+    parser.add_argument("--posts", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    words = sorted({random_word(rng) for _ in range(args.terms)})
+    posts = [" ".join(random_word(rng) for _ in range(60)) for _ in range(args.posts)]
+    # Put a blacklisted word at the end of every tenth post
+    for i in range(0, len(posts), 10):
+        posts[i] += " " + rng.choice(words).upper()
+
+    start = time.perf_counter()
+    matcher = BlacklistMatcher(words)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    naive = [naive_search(words, post) is not None for post in posts]
+    slow = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compiled = [matcher.search(post) is not None for post in posts]
+    fast = time.perf_counter() - start
+
+    assert naive == compiled
+    print(f"{len(words)} terms, {len(posts)} posts of ~{sum(map(len, posts)) // len(posts)} chars")
+    print(f"build:            {build * 1000:>9.1f} ms")
+    print(f"per-word loop:    {slow / len(posts) * 1e6:>9.1f} us/post")
+    print(f"compiled matcher: {fast / len(posts) * 1e6:>9.1f} us/post ({slow / fast:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
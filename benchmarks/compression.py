@@ -0,0 +1,135 @@
+"""Compare disk, memory and scan time with and without content compression.
+
+Builds the same corpus into two databases, one storing content as plain
+text and one with compress_threshold set. The corpus is real prose: the
+docstrings of the standard library (or the paragraphs of --corpus FILE),
+cut into mostly short posts with a share of long-form ones, each with a
+few comments. Reports the file size, the bytes of stored content, the
+time of a full spam re-scan and of indexing everything for search, and
+the memory held by a page of feed records before serialization.
+
+Usage: python -m benchmarks.compression [--posts 20000] [--long-share 0.2] [--threshold 512]
+"""
+import argparse
+import ast
+import os
+import random
+import sysconfig
+import tempfile
+import time
+import tracemalloc
+
+from rssx.database.db import Database
+
+COMMENTS_PER_POST = 3
+
+
+def stdlib_paragraphs(limit=50000):
+    paragraphs = []
+    stdlib = sysconfig.get_paths()["stdlib"]
+    for name in sorted(os.listdir(stdlib)):
+        if not name.endswith(".py"):
+            continue
+        try:
+            with open(os.path.join(stdlib, name), encoding="utf-8") as f:
+                tree = ast.parse(f.read())
+        except (SyntaxError, UnicodeDecodeError):
+            continue
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+                doc = ast.get_docstring(node)
+                if doc:
+                    paragraphs.extend(p.strip() for p in doc.split("\n\n") if len(p.strip()) > 40)
+        if len(paragraphs) >= limit:
+            break
+    return paragraphs
+
+
+def file_paragraphs(path):
+    with open(path, encoding="utf-8") as f:
+        return [p.strip() for p in f.read().split("\n\n") if p.strip()]
+
+
+def corpus(paragraphs, posts, long_share, seed=1):
+    """Yield (post content, [comment contents]); long posts are 2-8 KB, the rest one paragraph"""
+    rng = random.Random(seed)
+    for _ in range(posts):
+        if rng.random() < long_share:
+            body, target = [], rng.randint(2048, 8192)
+            while sum(map(len, body)) < target:
+                body.append(rng.choice(paragraphs))
+            content = "\n\n".join(body)
+        else:
+            content = rng.choice(paragraphs)[:500]
+        yield content, [rng.choice(paragraphs)[:300] for _ in range(COMMENTS_PER_POST)]
+
+
+def build(path, threshold, posts):
+    db = Database(path, compress_threshold=threshold)
+    for i, (content, comments) in enumerate(posts):
+        post_id = db.save_post(
+            {"id": f"p{i}", "author": f"user{i % 500}", "content": content, "timestamp": i, "signature": "s" * 64}
+        )
+        for j, comment in enumerate(comments):
+            db.save_comment(
+                {"author": f"user{j}", "content": comment, "timestamp": i, "post_id": post_id, "signature": "s" * 64}
+            )
+    return db
+
+
+def measure(label, path, db):
+    start = time.perf_counter()
+    while db.index_pending_search(5000):
+        pass
+    indexing = time.perf_counter() - start
+    start = time.perf_counter()
+    db.remove_spam_posts(["zzyzx"])
+    rescan = time.perf_counter() - start
+
+    tracemalloc.start()
+    posts, _ = db.get_posts_page(100)
+    comments = db.get_comments_for_posts(post.id for post in posts)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del posts, comments
+
+    with db.pool.connection() as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        stored = conn.execute(
+            "SELECT (SELECT SUM(length(CAST(content AS BLOB))) FROM posts)"
+            " + (SELECT SUM(length(CAST(content AS BLOB))) FROM comments)"
+        ).fetchone()[0]
+        compressed = conn.execute("SELECT COUNT(*) FROM posts WHERE typeof(content) = 'blob'").fetchone()[0]
+    size = os.path.getsize(path)
+    print(
+        f"{label:<12} {size / 2 ** 20:9.1f} {stored / 2 ** 20:11.1f} {compressed:11d}"
+        f" {rescan * 1000:10.0f} {indexing * 1000:10.0f} {held / 1024:10.0f}"
+    )
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--long-share", type=float, default=0.2)
+    parser.add_argument("--threshold", type=int, default=512)
+    parser.add_argument("--corpus", help="text file of paragraphs separated by blank lines")
+    args = parser.parse_args()
+
+    paragraphs = file_paragraphs(args.corpus) if args.corpus else stdlib_paragraphs()
+    print(f"{args.posts} posts ({args.long_share:.0%} long-form), {COMMENTS_PER_POST} comments each, "
+          f"from {len(paragraphs)} paragraphs")
+    print(f"{'':<12} {'file MB':>9} {'content MB':>11} {'compressed':>11} {'rescan ms':>10} "
+          f"{'index ms':>10} {'page KiB':>10}")
+    sizes = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, threshold in (("plain", 0), (f"over {args.threshold} B", args.threshold)):
+            path = os.path.join(tmp, f"{threshold}.db")
+            db = build(path, threshold, corpus(paragraphs, args.posts, args.long_share))
+            sizes.append(measure(label, path, db))
+            db.close()
+    print(f"file size with compression: {sizes[1] / sizes[0]:.0%} of plain")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Compare full feed and post polls with revalidated (If-None-Match) ones.
+
+Seeds posts with comments, then polls /api/feed, /api/post/<id> and
+/api/public_key through the Flask test client: once without validators
+and once sending the ETag of the previous response, as the Python
+clients do. Reports time and bytes per poll and the status returned.
+
+Usage: python -m benchmarks.conditional_get [--posts 10000] [--polls 200]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.feed_stream import create_app, seed
+
+
+def poll(client, url, polls, revalidate):
+    etag = client.get(url).headers.get("ETag")
+    headers = {"If-None-Match": etag} if revalidate else {}
+    size, statuses = 0, set()
+    start = time.perf_counter()
+    for _ in range(polls):
+        response = client.get(url, headers=headers)
+        size += len(response.data)
+        statuses.add(response.status_code)
+    elapsed = (time.perf_counter() - start) / polls
+    return elapsed, size / polls, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=10000)
+    parser.add_argument("--comments-per-post", type=int, default=5)
+    parser.add_argument("--polls", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "feed.db")
+        seed(db_path, args.posts, args.comments_per_post)
+        client = create_app(tmp, db_path).test_client()
+        print(f"{'':<28} {'ms/poll':>8} {'bytes/poll':>11} {'status':>7}")
+        for url in ("/api/feed", "/api/feed?limit=100", "/api/post/p1", "/api/public_key"):
+            for revalidate in (False, True):
+                elapsed, size, statuses = poll(client, url, args.polls, revalidate)
+                label = f"{url}{' + ETag' if revalidate else ''}"
+                print(f"{label:<28} {elapsed * 1000:8.2f} {size:11.0f} {'/'.join(map(str, sorted(statuses))):>7}")
+
+
+if __name__ == "__main__":
+    main()
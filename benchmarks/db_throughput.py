@@ -0,0 +1,115 @@
+"""Compare Database throughput with per-call connections against the pool.
+
+Usage: python -m benchmarks.db_throughput [--ops 5000] [--threads 4]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from rssx.database.db import Database
+
+
+class PerCallConnections:
+    """The previous access pattern: connect, run one statement, close"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.close()
+
+    def get_user(self, username):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        row = conn.execute(
+            "SELECT username, password FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        conn.close()
+        return row
+
+    def get_post_by_id(self, post_id):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        row = conn.execute("SELECT * FROM posts WHERE id = ?", (post_id,)).fetchone()
+        conn.close()
+        return row
+
+    def update_login_time(self, username):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute(
+            "UPDATE users SET last_login = ? WHERE username = ?",
+            (int(time.time()), username),
+        )
+        conn.commit()
+        conn.close()
+
+
+def seed(db_path, users, posts):
+    db = Database(db_path)
+    for i in range(users):
+        db.save_user(f"user{i}", "x")
+    for i in range(posts):
+        db.save_post(
+            {
+                "id": f"p{i}",
+                "author": f"user{i % users}",
+                "content": f"post {i}",
+                "timestamp": i,
+                "signature": "",
+            }
+        )
+    db.close()
+
+
+def run(target, ops, threads, users, posts):
+    """Run a 90% read / 10% write mix and return requests per second"""
+    per_thread = ops // threads
+
+    def worker(offset):
+        for i in range(per_thread):
+            n = offset + i
+            if n % 10 == 0:
+                target.update_login_time(f"user{n % users}")
+            elif n % 2:
+                target.get_user(f"user{n % users}")
+            else:
+                target.get_post_by_id(f"p{n % posts}")
+
+    pool = [threading.Thread(target=worker, args=(t * per_thread,)) for t in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return per_thread * threads / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--posts", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        before_path = os.path.join(tmp, "before.db")
+        seed(before_path, args.users, args.posts)
+        before = run(
+            PerCallConnections(before_path), args.ops, args.threads, args.users, args.posts
+        )
+
+        after_path = os.path.join(tmp, "after.db")
+        seed(after_path, args.users, args.posts)
+        db = Database(after_path, pool_size=args.threads)
+        after = run(db, args.ops, args.threads, args.users, args.posts)
+        db.close()
+
+    print(f"per-call connections: {before:10.0f} req/s")
+    print(f"pooled WAL:           {after:10.0f} req/s ({after / before:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
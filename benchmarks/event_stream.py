@@ -0,0 +1,119 @@
+"""Measure /api/stream fan-out and compare it with polling the feed for changes.
+
+Three parts:
+  fan-out      publish events to --clients subscriptions, each drained by
+               its own thread as a stream would; report publish cost and
+               publish-to-delivery latency
+  slow client  the same with one extra subscription that never reads:
+               publish cost should not change, and the stalled client is
+               dropped once its queue is full
+  wire bytes   seed a feed, then for a mix of posts, comments and votes
+               compare what a client downloads to see each change by
+               re-fetching the first feed page (with If-None-Match, as
+               the Python clients do) against the size of the SSE event
+
+Usage: python -m benchmarks.event_stream [--clients 100] [--events 2000]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from benchmarks.feed_stream import create_app, seed
+from rssx.utils.event_bus import SSE_QUEUE_SIZE, EventBus
+
+PAYLOAD = {"post_id": "0361021439017216", "upvotes": 12, "downvotes": 3, "spam": 0}
+
+
+def fan_out(clients, events, stalled):
+    bus = EventBus(max_connections=clients + stalled)
+    latencies = []
+    lock = threading.Lock()
+    subscriptions = [bus.subscribe() for _ in range(clients)]
+    stalled_subscriptions = [bus.subscribe() for _ in range(stalled)]
+
+    def drain(subscription):
+        seen = []
+        while len(seen) < events:
+            event = subscription.next(1)
+            if event is None:
+                break  # overflowed and dropped, like a stream that fell behind
+            seen.append(time.perf_counter() - sent[event.number])
+        with lock:
+            latencies.extend(seen)
+
+    sent = {}
+    threads = [threading.Thread(target=drain, args=(s,)) for s in subscriptions]
+    for thread in threads:
+        thread.start()
+    publish = 0.0
+    for i in range(1, events + 1):
+        start = time.perf_counter()
+        sent[i] = start
+        bus.publish("vote", PAYLOAD)
+        publish += time.perf_counter() - start
+        if i % 10 == 0:
+            time.sleep(0.002)  # writes arrive spread out, as requests do
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    dropped = sum(s.overflowed for s in subscriptions + stalled_subscriptions)
+    return publish / events, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)], dropped
+
+
+def wire_bytes(posts):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "feed.db")
+        seed(db_path, posts, 3)
+        app = create_app(tmp, db_path, GZIP_LEVEL=0)
+        client = app.test_client()
+        client.post("/api/register", json={"username": "watcher", "password": "secret1"})
+        token = client.post("/api/login", json={"username": "watcher", "password": "secret1"}).json["token"]
+        auth = {"Authorization": f"Bearer {token}"}
+        events = app.view_functions["api.get_feed"].__self__.events
+        subscription = events.subscribe()
+
+        etag = client.get("/api/feed").headers["ETag"]
+        polled, streamed = [], []
+        for i in range(30):
+            if i % 3 == 0:
+                client.post("/api/post", json={"content": f"news item {i}"}, headers=auth)
+            elif i % 3 == 1:
+                client.post("/api/comment", json={"post_id": f"p{posts - 1 - i}", "content": f"reply {i}"}, headers=auth)
+            else:
+                client.post("/api/upvote", json={"post_id": f"p{posts - 1 - i}"}, headers=auth)
+            response = client.get("/api/feed", headers={"If-None-Match": etag})
+            etag = response.headers["ETag"]
+            polled.append(len(response.data))
+            while True:
+                event = subscription.next(0)
+                if event is None:
+                    break
+                streamed.append(len(event.text.encode()))
+        events.unsubscribe(subscription)
+        app.view_functions["api.get_feed"].__self__.db.close()
+        return statistics.mean(polled), statistics.mean(streamed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--posts", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'':<14} {'publish us':>10} {'p50 ms':>8} {'p99 ms':>8} {'dropped':>8}")
+    for label, stalled in (("fan-out", 0), ("slow client", 1)):
+        publish, p50, p99, dropped = fan_out(args.clients, args.events, stalled)
+        print(f"{label:<14} {publish * 1e6:10.1f} {p50 * 1000:8.2f} {p99 * 1000:8.2f} {dropped:8d}")
+    print(f"({args.clients} readers, {args.events} events, queue {SSE_QUEUE_SIZE})")
+
+    polled, streamed = wire_bytes(args.posts)
+    print(f"\nbytes per change seen: feed re-fetch {polled:.0f}, SSE event {streamed:.0f} "
+          f"({polled / streamed:.0f}x less)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Compare read-heavy feed traffic with the in-process feed cache off and on.
+
+Seeds posts with comments, then replays a mix of requests through the
+Flask test client: mostly reads of the first few feed pages in each
+sort, with a vote or a comment every --write-every requests. Reports
+time per request, the SQL statements run per read, and the cache's
+hit rate and counters from /api/health. Reads served from the cache run no
+SQL at all.
+
+Usage: python -m benchmarks.feed_cache [--posts 10000] [--requests 5000] [--write-every 50]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from urllib.parse import quote
+
+from benchmarks.feed_stream import create_app, seed
+
+
+def replay(client, db, requests, write_every, seed=1):
+    """Run the request mix; return (ms per request, statements per read)"""
+    rng = random.Random(seed)
+    statements = []
+    db.pool.set_trace_callback(statements.append)
+    # Cursors of the first pages, as a client paging through would send them
+    urls = []
+    for sort in ("ranked", "activity"):
+        url = f"/api/feed?sort={sort}"
+        for _ in range(3):
+            urls.append(url)
+            cursor = client.get(url).get_json()["next_cursor"]
+            url = f"/api/feed?sort={sort}&cursor={quote(cursor)}"
+    del statements[:]
+
+    reads = read_statements = 0
+    start = time.perf_counter()
+    for i in range(1, requests + 1):
+        if i % write_every == 0:
+            post_id = f"p{rng.randrange(100)}"
+            if rng.random() < 0.5:
+                db.vote(post_id, f"voter{i}", "upvote")
+            else:
+                db.save_comment(
+                    {"author": "bob", "content": "a reply", "timestamp": 10 ** 6 + i, "post_id": post_id, "signature": "s" * 64}
+                )
+        else:
+            before = len(statements)
+            client.get(rng.choice(urls))
+            read_statements += len(statements) - before
+            reads += 1
+    elapsed = time.perf_counter() - start
+    db.pool.set_trace_callback(None)
+    return elapsed * 1000 / requests, read_statements / reads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=10000)
+    parser.add_argument("--comments-per-post", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--write-every", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{args.requests} requests over {args.posts} posts, one write every {args.write_every}")
+        print(f"{'':<10} {'ms/req':>8} {'SQL/read':>9} {'hit rate':>9}")
+        for label, size in (("no cache", 0), ("cache", 256)):
+            db_path = os.path.join(tmp, f"{label}.db")
+            seed(db_path, args.posts, args.comments_per_post)
+            app = create_app(tmp, db_path, FEED_CACHE_SIZE=size)
+            client = app.test_client()
+            db = app.view_functions["api.get_feed"].__self__.db
+            per_request, per_read = replay(client, db, args.requests, args.write_every)
+            stats = client.get("/api/health").get_json().get("feed_cache")
+            hit_rate = f"{stats['hits'] / max(stats['hits'] + stats['misses'], 1):.0%}" if stats else "-"
+            print(f"{label:<10} {per_request:8.2f} {per_read:9.2f} {hit_rate:>9}")
+            if stats:
+                print(f"{'':<10} {stats}")
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
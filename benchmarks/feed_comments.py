@@ -0,0 +1,77 @@
+"""Compare per-post comment loading (N+1) with get_comments_for_posts.
+
+Seeds 10k posts and 100k comments, then times attaching comments to feed
+pages of several sizes both ways, and attaching only a preview of the first
+3 comments per post with get_comment_previews.
+
+Usage: python -m benchmarks.feed_comments [--posts 10000] [--comments 100000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from rssx.database.db import Database
+
+
+def seed(db, posts, comments):
+    with db.pool.connection() as conn:
+        conn.executemany(
+            "INSERT INTO posts (id, author, content, timestamp, signature) VALUES (?, ?, ?, ?, '')",
+            ((f"p{i}", f"user{i % 500}", f"post body {i}", i) for i in range(posts)),
+        )
+        rng = random.Random(42)
+        conn.executemany(
+            "INSERT INTO comments (author, timestamp, content, post_id, signature) VALUES (?, ?, ?, ?, '')",
+            (
+                (f"user{i % 500}", i, f"comment {i}", f"p{rng.randrange(posts)}")
+                for i in range(comments)
+            ),
+        )
+        conn.commit()
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=10000)
+    parser.add_argument("--comments", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        seed(db, args.posts, args.comments)
+        print(f"{args.posts} posts, {args.comments} comments")
+        print(f"{'page size':>10} {'N+1 (ms)':>12} {'batched (ms)':>14} {'speedup':>8} {'preview (ms)':>13}")
+        for page_size in (20, 100, args.posts):
+            post_ids = [f"p{i}" for i in range(page_size)]
+
+            def per_post():
+                return {post_id: db.get_comments_for_post(post_id) for post_id in post_ids}
+
+            def batched():
+                return db.get_comments_for_posts(post_ids)
+
+            assert per_post() == batched()
+            slow = best_of(per_post, args.repeat)
+            fast = best_of(batched, args.repeat)
+            preview = best_of(lambda: db.get_comment_previews(post_ids, 3), args.repeat)
+            print(
+                f"{page_size:>10} {slow * 1000:>12.1f} {fast * 1000:>14.1f} {slow / fast:>7.1f}x"
+                f" {preview * 1000:>13.1f}"
+            )
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Measure peak memory per feed request: dict rows vs Post/Comment records.
+
+Seeds posts with comments, then builds one /api/feed response body (a page
+of posts with every comment, JSON-encoded) two ways under tracemalloc:
+the old way, turning every sqlite3.Row into a dict that the API layer then
+mutates, and the current way, Post and Comment records serialized once with
+to_dict(). Reports peak traced memory, memory still held by the rows
+before serialization, and time per request.
+
+Usage: python -m benchmarks.feed_memory [--posts 5000] [--comments-per-post 20] [--page 100]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+from rssx.database.db import FEED_ORDER, Database
+
+
+def seed(db, posts, comments_per_post):
+    with db.pool.connection() as conn:
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT INTO posts (id, author, content, timestamp, signature, last_activity_at) VALUES (?, ?, ?, ?, ?, ?)",
+            ((f"p{i}", f"user{i % 500}", f"post body {i} " * 8, i, "s" * 64, i) for i in range(posts)),
+        )
+        conn.executemany(
+            "INSERT INTO comments (author, timestamp, content, post_id, signature) VALUES (?, ?, ?, ?, ?)",
+            (
+                (f"user{i % 500}", i, f"comment {i}", f"p{i % posts}", "s" * 64)
+                for i in range(posts * comments_per_post)
+            ),
+        )
+        conn.commit()
+
+
+def format_time(timestamp):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
+
+
+def dict_rows(db, page):
+    """The feed path before records: dict(sqlite3.Row) mutated in place"""
+    with db.pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute(f"SELECT * FROM posts ORDER BY {FEED_ORDER} LIMIT ?", (page,))
+        posts = []
+        for row in cursor.fetchall():
+            post = dict(row)
+            post.pop("author_popularity", None)
+            posts.append(post)
+        ids = [post["id"] for post in posts]
+        cursor.execute(
+            f"SELECT * FROM comments WHERE post_id IN ({', '.join('?' * len(ids))}) ORDER BY post_id, timestamp",
+            ids,
+        )
+        comments = {post_id: [] for post_id in ids}
+        for row in cursor:
+            comments[row["post_id"]].append(dict(row))
+    for post in posts:
+        for comment in comments[post["id"]]:
+            comment["timestamp_formatted"] = format_time(comment["timestamp"])
+        post["comments"] = comments[post["id"]]
+    return posts
+
+
+def records(db, page):
+    """The current feed path: Post and Comment records from the database"""
+    posts, _ = db.get_posts_page(page)
+    return posts, db.get_comments_for_posts(post.id for post in posts)
+
+
+def records_response(held):
+    """Build the response dicts once, at the boundary, and encode them"""
+    posts, comments = held
+    payload = []
+    for post in posts:
+        post_dict = post.to_dict()
+        post_dict["comments"] = []
+        for comment in comments[post.id]:
+            comment_dict = comment.to_dict()
+            comment_dict["timestamp_formatted"] = format_time(comment.timestamp)
+            post_dict["comments"].append(comment_dict)
+        payload.append(post_dict)
+    return json.dumps(payload)
+
+
+def measure(label, build, serialize, repeat):
+    tracemalloc.start()
+    held = build()
+    rows_size, _ = tracemalloc.get_traced_memory()
+    body = serialize(held)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held, body
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        serialize(build())
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:>10} {peak / 1024:>12.0f} {rows_size / 1024:>12.0f} {elapsed * 1000:>10.2f}")
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--comments-per-post", type=int, default=20)
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        seed(db, args.posts, args.comments_per_post)
+        print(f"feed page of {args.page} posts with {args.comments_per_post} comments each")
+        print(f"{'rows':>10} {'peak (KiB)':>12} {'rows (KiB)':>12} {'time (ms)':>10}")
+        before = measure(
+            "dicts", lambda: dict_rows(db, args.page), lambda posts: json.dumps(posts), args.repeat
+        )
+        after = measure(
+            "records", lambda: records(db, args.page), records_response, args.repeat
+        )
+        print(f"peak memory per request: {after / before:.0%} of before")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Compare the streamed /api/feed?stream=1 with building the whole feed before replying.
+
+Seeds posts with comments, then serves the entire feed (every post with
+its comments) through the Flask app two ways, each in a fresh process:
+buffered, the way the full feed used to be served (every post dict built
+into one list, then jsonify), and streamed. Reports time to first byte,
+total time, response size and how much the process's peak RSS grew.
+
+Usage: python -m benchmarks.feed_stream [--posts 50000] [--comments-per-post 5]
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from rssx.database.db import Database
+
+
+def seed(db_path, posts, comments_per_post):
+    db = Database(db_path)
+    with db.pool.connection() as conn:
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT INTO posts (id, author, content, timestamp, signature, last_activity_at) VALUES (?, ?, ?, ?, ?, ?)",
+            ((f"p{i}", f"user{i % 500}", f"post body {i} " * 10, i, "s" * 64, i) for i in range(posts)),
+        )
+        conn.executemany(
+            "INSERT INTO comments (author, timestamp, content, post_id, signature) VALUES (?, ?, ?, ?, ?)",
+            (
+                (f"user{i % 500}", i, f"comment {i}", f"p{i % posts}", "s" * 64)
+                for i in range(posts * comments_per_post)
+            ),
+        )
+        conn.commit()
+    db.close()
+
+
+def create_app(tmp, db_path, **overrides):
+    from rssx.utils.config import Config
+    import server_flask
+
+    config = Config(os.path.join(tmp, "config.json"))
+    config.config.update(
+        DB_PATH=db_path,
+        LOG_FILE=os.path.join(tmp, "rssx.log"),
+        PUBLIC_KEY_FILE=os.path.join(tmp, "public.pem"),
+        PRIVATE_KEY_FILE=os.path.join(tmp, "private.pem"),
+        ENABLE_WEB_UI=False,
+        SEARCH_INDEX_INTERVAL=3600,
+    )
+    config.config.update(overrides)
+    return server_flask.create_app(config)
+
+
+def serve(mode, tmp, db_path):
+    """Serve the whole feed once in this process and print one result line"""
+    app = create_app(tmp, db_path)
+    client = app.test_client()
+    client.get("/api/feed?limit=1")  # warm up imports and the pool
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    if mode == "buffered":
+        from flask import jsonify
+
+        with app.test_request_context():
+            api = app.view_functions["api.get_feed"].__self__
+            posts = api.db.get_all_posts()
+            response = jsonify({"posts": api._feed_payload(posts, "all"), "next_cursor": None})
+            chunks = iter(response.response)
+    else:
+        response = client.get("/api/feed?stream=1", buffered=False)
+        chunks = iter(response.response)
+    size = len(next(chunks))
+    first_byte = time.perf_counter() - start
+    for chunk in chunks:
+        size += len(chunk)
+    total = time.perf_counter() - start
+    grown = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+    print(f"{mode:<10} {first_byte * 1000:10.0f} {total * 1000:10.0f} {size / 2 ** 20:9.1f} {grown / 1024:12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=50000)
+    parser.add_argument("--comments-per-post", type=int, default=5)
+    parser.add_argument("--serve", choices=("buffered", "streamed"), help=argparse.SUPPRESS)
+    parser.add_argument("--dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.dir, os.path.join(args.dir, "feed.db"))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        seed(os.path.join(tmp, "feed.db"), args.posts, args.comments_per_post)
+        print(f"whole feed: {args.posts} posts with {args.comments_per_post} comments each")
+        print(f"{'':<10} {'TTFB (ms)':>10} {'total (ms)':>10} {'size (MB)':>9} {'RSS +(MiB)':>12}")
+        for mode in ("buffered", "streamed"):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.feed_stream", "--serve", mode, "--dir", tmp],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            print(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Compare bytes on the wire and CPU per request at different gzip levels.
+
+Seeds posts with comments, then requests feed JSON and the rendered feed
+page through the Flask app with gzip off and at several levels, sending
+Accept-Encoding: gzip like a browser or the requests library. Reports the
+response size, the CPU time per request, and the CPU time of compressing
+the body alone (what a request costs when the body is not already in the
+middleware's ETag memo).
+
+Usage: python -m benchmarks.gzip_levels [--posts 2000] [--requests 50] [--levels 0,1,6,9]
+"""
+import argparse
+import os
+import tempfile
+import time
+import zlib
+
+from benchmarks.feed_stream import create_app, seed
+
+URLS = ("/api/feed", "/api/feed?limit=100&comments=all", "/api/feed?stream=1", "/feed")
+
+
+def gzip_cpu(body, level, repeat=20):
+    """CPU seconds to gzip body once at level"""
+    start = time.process_time()
+    for _ in range(repeat):
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        compressor.compress(body)
+        compressor.flush()
+    return (time.process_time() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--comments-per-post", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--levels", default="0,1,6,9")
+    args = parser.parse_args()
+    headers = {"Accept-Encoding": "gzip, deflate"}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "feed.db")
+        seed(db_path, args.posts, args.comments_per_post)
+        print(f"{'':<34} {'level':>5} {'KiB':>8} {'ratio':>6} {'CPU ms/req':>10} {'gzip ms':>8}")
+        for level in (int(level) for level in args.levels.split(",")):
+            app = create_app(tmp, db_path, GZIP_LEVEL=level, ENABLE_WEB_UI=True)
+            client = app.test_client()
+            for url in URLS:
+                identity = client.get(url).data
+                size = len(client.get(url, headers=headers).data)
+                start = time.process_time()
+                for _ in range(args.requests):
+                    client.get(url, headers=headers).data
+                cpu = (time.process_time() - start) / args.requests
+                compress = gzip_cpu(identity, level) if level else 0
+                print(
+                    f"{url:<34} {level:5d} {size / 1024:8.1f} {len(identity) / size:6.1f}"
+                    f" {cpu * 1000:10.2f} {compress * 1000:8.2f}"
+                )
+            app.view_functions["api.get_feed"].__self__.db.close()
+
+
+if __name__ == "__main__":
+    main()
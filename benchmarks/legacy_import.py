@@ -0,0 +1,61 @@
+"""Time the one-shot legacy import and startup with a legacy archive present.
+
+Writes users.json, servers.json and N posts/*.rssx files to a temporary
+directory, runs import_legacy_data, then times opening the database again
+(which used to re-import everything on every start).
+
+Usage: python -m benchmarks.legacy_import [--posts 50000] [--chunk-size 1000]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from rssx.database.db import Database
+from rssx.database.legacy_import import import_legacy_data
+
+
+def write_archive(root, posts):
+    with open(os.path.join(root, "users.json"), "w") as f:
+        json.dump({f"user{i}": f"hash{i}" for i in range(1000)}, f)
+    with open(os.path.join(root, "servers.json"), "w") as f:
+        json.dump([f"http://peer{i}.example" for i in range(10)], f)
+    posts_dir = os.path.join(root, "posts")
+    os.makedirs(posts_dir)
+    for i in range(posts):
+        with open(os.path.join(posts_dir, f"{i}.rssx"), "w") as f:
+            f.write(
+                f"ID: legacy{i}\nAuthor: user{i % 1000}\nTimestamp: {1600000000 + i}\n"
+                f"Content: legacy post number {i}\nSignature: sig{i}\n"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=50000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        write_archive(tmp, args.posts)
+        os.chdir(tmp)
+        try:
+            db = Database("bench.db")
+            start = time.perf_counter()
+            totals = import_legacy_data(db, chunk_size=args.chunk_size, report=print)
+            elapsed = time.perf_counter() - start
+            assert import_legacy_data(db, report=lambda message: None) is None
+            db.close()
+            print(f"imported {totals} in {elapsed:.2f} s")
+
+            start = time.perf_counter()
+            Database("bench.db").close()
+            print(f"restart with the archive still present: {(time.perf_counter() - start) * 1000:.1f} ms")
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Measure full-text search latency and the cost of keeping the index in sync.
+
+Seeds a database with posts and comments drawn from a Zipf-like vocabulary,
+indexes it with Database.index_pending_search and times Database.search
+for rare, mid-frequency and very common words (first page and a few pages
+deep). Finally compares save_post and save_comment latency with the search
+triggers in place against the same database with them dropped.
+
+Usage: python -m benchmarks.search [--posts 1000000] [--comments 1000000]
+"""
+import argparse
+import os
+import random
+import string
+import tempfile
+import time
+
+from rssx.database.db import Database
+
+VOCABULARY = 20000
+WORDS_PER_ROW = 30
+SAVES = 5000
+
+
+def make_vocabulary(rng):
+    words = set()
+    while len(words) < VOCABULARY:
+        words.add("".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10))))
+    return sorted(words)
+
+
+def make_text(rng, vocabulary, weights):
+    return " ".join(rng.choices(vocabulary, cum_weights=weights, k=WORDS_PER_ROW))
+
+
+def seed(db, rng, vocabulary, weights, posts, comments):
+    with db.pool.connection() as conn:
+        conn.executemany(
+            "INSERT INTO posts (id, author, content, timestamp, signature) VALUES (?, ?, ?, ?, '')",
+            ((f"p{i}", f"user{i % 500}", make_text(rng, vocabulary, weights), i) for i in range(posts)),
+        )
+        conn.executemany(
+            "INSERT INTO comments (author, timestamp, content, post_id, signature) VALUES (?, ?, ?, ?, '')",
+            (
+                (f"user{i % 500}", i, make_text(rng, vocabulary, weights), f"p{rng.randrange(posts)}")
+                for i in range(comments)
+            ),
+        )
+        conn.commit()
+
+
+def time_saves(db, rng, vocabulary, weights):
+    start = time.perf_counter()
+    for i in range(SAVES):
+        post_id = db.save_post(
+            {"author": "bench", "content": make_text(rng, vocabulary, weights), "timestamp": i, "signature": ""}
+        )
+        db.save_comment(
+            {"author": "bench", "timestamp": i, "content": make_text(rng, vocabulary, weights),
+             "post_id": post_id, "signature": ""}
+        )
+    return (time.perf_counter() - start) / (SAVES * 2)
+
+
+def time_search(db, word, pages):
+    start = time.perf_counter()
+    cursor = None
+    found = 0
+    for _ in range(pages):
+        results, cursor = db.search(word, 20, cursor)
+        found += len(results)
+        if not cursor:
+            break
+    return (time.perf_counter() - start) / pages, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1000000)
+    parser.add_argument("--comments", type=int, default=1000000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(rng)
+    # Zipf-like: the word at rank r appears with weight 1 / r
+    weights = []
+    total = 0.0
+    for rank in range(1, VOCABULARY + 1):
+        total += 1.0 / rank
+        weights.append(total)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "search.db"))
+        start = time.perf_counter()
+        seed(db, rng, vocabulary, weights, args.posts, args.comments)
+        print(f"seeded {args.posts} posts, {args.comments} comments in {time.perf_counter() - start:.1f} s")
+        start = time.perf_counter()
+        while db.index_pending_search():
+            pass
+        elapsed = time.perf_counter() - start
+        print(f"indexed in {elapsed:.1f} s ({elapsed / (args.posts + args.comments) * 1e6:.0f} us/row)")
+
+        print(f"{'word rank':>10} {'page 1 (ms)':>12} {'pages 1-5 (ms/page)':>20}")
+        for rank in (VOCABULARY - 1, 1000, 100, 0):
+            word = vocabulary[rank]
+            first, _ = time_search(db, word, 1)
+            deep, found = time_search(db, word, 5)
+            print(f"{rank + 1:>10} {first * 1000:>12.1f} {deep * 1000:>20.1f}   ({found} results)")
+
+        with_fts = time_saves(db, rng, vocabulary, weights)
+        with db.pool.connection() as conn:
+            for table in ("posts", "comments"):
+                for event in ("insert", "delete", "update"):
+                    conn.execute(f"DROP TRIGGER {table}_search_{event}")
+            conn.commit()
+        without_fts = time_saves(db, rng, vocabulary, weights)
+        db.close()
+
+    print(f"save_post/save_comment: {with_fts * 1e6:.0f} us with search triggers, "
+          f"{without_fts * 1e6:.0f} us without ({(with_fts / without_fts - 1) * 100:+.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Measure vote/comment throughput and latency with and without group commit.
+
+Many threads call Database.vote and Database.save_comment as fast as they
+can, as request threads do during a burst on a viral post. Each
+configuration reports throughput and p50/p99 per-call latency: one
+transaction per write, then a WriteQueue with a few batch settings.
+
+Usage: python -m benchmarks.write_queue [--threads 32] [--ops 300]
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from rssx.database.db import Database
+
+CONFIGS = (
+    ("no queue", 0, 0.0),
+    ("batch 100, 0 ms", 100, 0.0),
+    ("batch 100, 2 ms", 100, 0.002),
+    ("batch 500, 5 ms", 500, 0.005),
+)
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(db_path, threads, ops, batch_size, batch_delay):
+    db = Database(db_path, pool_size=threads, write_batch_size=batch_size, write_batch_delay=batch_delay)
+    latencies = []
+    lock = threading.Lock()
+    failures = []
+
+    def client(seed):
+        rng = random.Random(seed)
+        local = []
+        for i in range(ops):
+            start = time.perf_counter()
+            if rng.random() < 0.8:
+                db.vote("viral", f"user{seed}-{i}", rng.choice(("upvote", "downvote")))
+            elif db.save_comment(
+                {"author": f"user{seed}", "timestamp": i, "content": "so true",
+                 "post_id": "viral", "signature": ""}
+            ) is None:
+                failures.append(seed)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    pool = [threading.Thread(target=client, args=(seed,)) for seed in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    db.close()
+    latencies.sort()
+    return len(latencies) / elapsed, percentile(latencies, 0.5), percentile(latencies, 0.99), len(failures)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--ops", type=int, default=300, help="writes per thread")
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads x {args.ops} writes (80% votes, 20% comments)")
+    print(f"{'config':<18} {'writes/s':>10} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    for name, batch_size, batch_delay in CONFIGS:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "writes.db")
+            db = Database(db_path)
+            db.save_post({"id": "viral", "author": "op", "content": "viral", "timestamp": 0, "signature": ""})
+            db.close()
+            throughput, p50, p99, failures = run(db_path, args.threads, args.ops, batch_size, batch_delay)
+        note = f"  ({failures} failed)" if failures else ""
+        print(f"{name:<18} {throughput:>10.0f} {p50 * 1000:>10.2f} {p99 * 1000:>10.2f}{note}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,10 +6,17 @@ import time
 import sys
 import getpass
 from datetime import datetime
+from rssx.utils.http_client import ETagCache, read_events
 
 SERVER_URL = "http://127.0.0.1:5000"
 TOKEN_FILE = "token.txt"
 CONFIG_FILE = "config.json"
+# Last 200 response per URL, revalidated with If-None-Match
+_etag_cache = ETagCache()
+# Seconds to wait before reconnecting to the event stream; a stream silent
+# for STREAM_READ_TIMEOUT (several missed heartbeats) is reconnected too
+STREAM_RETRY = 3
+STREAM_READ_TIMEOUT = 60
 
 # Load configuration from file
 def load_config():
@@ -49,12 +56,20 @@ def save_token(token):
         
 # Pretty print for RSSX posts
 def pretty_print_post(post_content):
-    lines = post_content.strip().split('\n')
-    post_data = {}
-    for line in lines:
-        if ': ' in line:
-            key, value = line.split(': ', 1)
-            post_data[key] = value
+    if isinstance(post_content, dict):
+        # /api/feed returns post objects rather than .rssx text
+        post_data = {
+            'Author': post_content.get('author', 'unknown'),
+            'Content': post_content.get('content', ''),
+            'Timestamp': post_content.get('timestamp', 0),
+        }
+    else:
+        lines = post_content.strip().split('\n')
+        post_data = {}
+        for line in lines:
+            if ': ' in line:
+                key, value = line.split(': ', 1)
+                post_data[key] = value
     
     # Format the output with colors if available
     if 'Author' in post_data and 'Content' in post_data and 'Timestamp' in post_data:
@@ -161,6 +176,47 @@ def create_post():
     else:
         print("Failed to create post.")
 
+# Print one /api/stream event
+def print_event(kind, data):
+    if kind == "post":
+        print("\n[new post]")
+        pretty_print_post(data)
+    elif kind == "comment":
+        print(f"[comment on {data.get('post_id')}] {data.get('author')}: {data.get('content')}")
+    elif kind == "vote":
+        spam = "  [SUSPECTED SPAM]" if data.get("spam") else ""
+        print(f"[votes on {data.get('post_id')}] +{data.get('upvotes')} -{data.get('downvotes')}{spam}")
+    elif kind == "spam":
+        if data.get("post_id"):
+            print(f"[spam] post {data['post_id']} was flagged")
+        else:
+            print("[spam] several posts were flagged; view the feed to see them")
+    elif kind == "reset":
+        print("[missed updates] view the feed to catch up")
+
+# Watch new posts, comments and votes as they happen, until Ctrl-C
+def watch_feed():
+    print("\n=== Watching Feed (Ctrl-C to stop) ===")
+    last_event_id = None
+    try:
+        while True:
+            headers = {"Last-Event-ID": last_event_id} if last_event_id else {}
+            try:
+                with requests.get(f"{SERVER_URL}/api/stream", headers=headers, stream=True,
+                                  timeout=(5, STREAM_READ_TIMEOUT)) as response:
+                    if response.status_code != 200:
+                        print(f"Event stream unavailable ({response.status_code}), retrying...")
+                    else:
+                        for event_id, kind, data in read_events(response):
+                            last_event_id = event_id or last_event_id
+                            print_event(kind, json.loads(data))
+            except requests.RequestException as e:
+                print(f"Connection lost ({e.__class__.__name__}), reconnecting...")
+            # Resumes after last_event_id, so nothing is missed while reconnecting
+            time.sleep(STREAM_RETRY)
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+
 # View the feed (all posts from the server)
 def get_feed():
     token = load_token()
@@ -171,20 +227,34 @@ def get_feed():
     print("\n=== Loading Feed ===")
     headers = {"Authorization": f"Bearer {token}"}  # Use JWT token for authentication
     
+    cursor = None
+    shown = 0
     try:
-        response = requests.get(f"{SERVER_URL}/api/feed", headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            posts = response.json().get("posts", [])
-            if not posts:
+        while True:
+            params = {"cursor": cursor} if cursor else {}
+            status, data = _etag_cache.get_json(f"{SERVER_URL}/api/feed", headers=headers, params=params)
+            
+            if status != 200:
+                error = data.get("error", "Unknown error")
+                print(f"Failed to fetch the feed: {error}")
+                return
+            
+            posts = data.get("posts", [])
+            if not posts and not shown:
                 print("No posts available.")
-            else:
-                print(f"\nFound {len(posts)} post(s)")
-                for post in posts:
-                    pretty_print_post(post)
-        else:
-            error = response.json().get("error", "Unknown error")
-            print(f"Failed to fetch the feed: {error}")
+                return
+            
+            print(f"\nShowing posts {shown + 1}-{shown + len(posts)}")
+            for post in posts:
+                pretty_print_post(post)
+            shown += len(posts)
+            
+            cursor = data.get("next_cursor")
+            if not cursor:
+                print("End of feed.")
+                return
+            if input("Load more posts? (y/N): ").strip().lower() != "y":
+                return
     except requests.RequestException as e:
         print(f"Connection error: {str(e)}")
 
@@ -251,10 +321,11 @@ def show_help():
     print("  2. Login - Authenticate with your credentials")
     print("  3. Create Post - Share a message on the network")
     print("  4. View Feed - See posts from this server and connected servers")
-    print("  5. Check Server - View server status and connected servers")
-    print("  6. My Profile - View your user details and session information")
-    print("  7. Help - Show this help information")
-    print("  8. Exit - Close the application")
+    print("  5. Watch Feed - Show new posts, comments and votes as they happen")
+    print("  6. Check Server - View server status and connected servers")
+    print("  7. My Profile - View your user details and session information")
+    print("  8. Help - Show this help information")
+    print("  9. Exit - Close the application")
     print("\nSecurity Information:")
     print("- Your password is never stored in plain text")
     print("- Communication is secured with RSA signatures")
@@ -284,8 +355,8 @@ def menu():
                 token = None
             
         print(f"\nUser: {username} | {status}")
-        print("\n1. Register\n2. Login\n3. Create Post\n4. View Feed")
-        print("5. Check Server\n6. My Profile\n7. Help\n8. Exit")
+        print("\n1. Register\n2. Login\n3. Create Post\n4. View Feed\n5. Watch Feed")
+        print("6. Check Server\n7. My Profile\n8. Help\n9. Exit")
         
         choice = input("\nChoose an option: ")
 
@@ -298,12 +369,14 @@ def menu():
         elif choice == "4":
             get_feed()
         elif choice == "5":
-            check_server_status()
+            watch_feed()
         elif choice == "6":
-            view_profile()
+            check_server_status()
         elif choice == "7":
-            show_help()
+            view_profile()
         elif choice == "8":
+            show_help()
+        elif choice == "9":
             print("Goodbye!")
             break
         else:
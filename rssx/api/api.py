@@ -139,7 +139,7 @@ class RSSXApi:
     def get_feed(self):
         """Get all posts from the local database"""
         posts = self.db.get_all_posts()
-        return jsonify({"posts": posts}), 200
+        return jsonify({"posts": [post.to_dict() for post in posts]}), 200
     
     def get_post(self, post_id):
         """Get a specific post by ID"""
@@ -147,7 +147,7 @@ class RSSXApi:
         if not post:
             return jsonify({"error": "Post not found"}), 404
         
-        return jsonify({"post": post}), 200
+        return jsonify({"post": post.to_dict()}), 200
     
     def list_servers(self):
         """List all connected servers"""
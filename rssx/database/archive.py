@@ -0,0 +1,286 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict
+from urllib.parse import quote
+
+from rssx.database.compression import CONTENT_FUNCTION, register_functions
+from rssx.database.records import COMMENT_FIELDS, POST_FIELDS, ArchivedPost, Comment
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_BATCH_SIZE = 500
+# Posts are grouped into one archive file per UTC calendar year
+ARCHIVE_PERIOD_FORMAT = "%Y"
+ARCHIVE_FILE = re.compile(r"^archive-([0-9-]+)\.db$")
+# SQLite allows 10 attached databases by default; keep some headroom
+MAX_ATTACHED = 8
+
+POST_COLUMNS = POST_FIELDS
+COMMENT_COLUMNS = COMMENT_FIELDS
+VOTE_COLUMNS = ("post_id", "username", "vote_type")
+
+# Archive files hold the same rows as the hot tables, minus the columns only
+# the feed needs; content is copied as stored, compressed or not. Archives
+# are append-only, so their search indexes are filled as rows are copied in
+# and need no triggers.
+ARCHIVE_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS posts (
+        id TEXT PRIMARY KEY,
+        author TEXT NOT NULL,
+        content TEXT NOT NULL,
+        timestamp INTEGER NOT NULL,
+        signature TEXT NOT NULL,
+        upvotes INTEGER DEFAULT 0,
+        downvotes INTEGER DEFAULT 0,
+        spam INTEGER DEFAULT 0,
+        federated_from TEXT,
+        comment_count INTEGER NOT NULL DEFAULT 0,
+        last_activity_at INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS comments (
+        id INTEGER PRIMARY KEY,
+        author TEXT NOT NULL,
+        timestamp INTEGER NOT NULL,
+        content TEXT NOT NULL,
+        post_id TEXT NOT NULL,
+        signature TEXT NOT NULL,
+        federated_from TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_comments_post_timestamp ON comments (post_id, timestamp)",
+    """
+    CREATE TABLE IF NOT EXISTS votes (
+        post_id TEXT NOT NULL,
+        username TEXT NOT NULL,
+        vote_type TEXT NOT NULL,
+        PRIMARY KEY (post_id, username)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+        content, content='posts', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS comments_fts USING fts5(
+        content, content='comments', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+)
+
+
+def archive_period(timestamp):
+    """Return the archive period ("2023") a post timestamp belongs to"""
+    try:
+        seconds = int(float(timestamp))
+    except (TypeError, ValueError):
+        seconds = 0
+    return time.strftime(ARCHIVE_PERIOD_FORMAT, time.gmtime(seconds))
+
+
+def archive_path(archive_dir, period):
+    """Return the path of the archive file for period"""
+    return os.path.join(archive_dir, f"archive-{period}.db")
+
+
+def _placeholders(values):
+    return ", ".join("?" * len(values))
+
+
+class ArchiveSet:
+    """Read-only access to the archive files in archive_dir.
+
+    Archives are attached on demand to one private connection, read-only,
+    and stay attached (up to MAX_ATTACHED, least recently used detached
+    first) so repeated lookups in the same period reuse them.
+    """
+
+    def __init__(self, archive_dir, busy_timeout=5.0):
+        """Read archives from archive_dir; the directory may not exist yet"""
+        self.archive_dir = archive_dir
+        self._conn = sqlite3.connect(
+            ":memory:", uri=True, timeout=busy_timeout, check_same_thread=False
+        )
+        register_functions(self._conn)
+        self._attached = OrderedDict()
+        self._lock = threading.Lock()
+
+    def periods(self):
+        """Return the periods that have an archive file, newest first"""
+        try:
+            names = os.listdir(self.archive_dir)
+        except FileNotFoundError:
+            return []
+        periods = [m.group(1) for m in map(ARCHIVE_FILE.match, names) if m]
+        return sorted(periods, reverse=True)
+
+    def _attach(self, period):
+        """Return the schema name of period's archive, attaching it if needed"""
+        schema = self._attached.get(period)
+        if schema is not None:
+            self._attached.move_to_end(period)
+            return schema
+        if len(self._attached) >= MAX_ATTACHED:
+            _, oldest = self._attached.popitem(last=False)
+            self._conn.execute(f"DETACH DATABASE {oldest}")
+        schema = "archive_" + period.replace("-", "_")
+        uri = "file:" + quote(os.path.abspath(archive_path(self.archive_dir, period))) + "?mode=ro"
+        self._conn.execute(f"ATTACH DATABASE ? AS {schema}", (uri,))
+        self._attached[period] = schema
+        return schema
+
+    def read(self, period, read, *args, row_factory=sqlite3.Row):
+        """Call read(cursor, schema, *args) with period's archive attached and return its result"""
+        with self._lock:
+            schema = self._attach(period)
+            cursor = self._conn.cursor()
+            cursor.row_factory = row_factory
+            try:
+                return read(cursor, schema, *args)
+            finally:
+                cursor.close()
+
+    def get_post(self, post_id):
+        """Return an archived post as an ArchivedPost record, or None"""
+        for period in self.periods():
+            post = self.read(period, _select_post, post_id, row_factory=ArchivedPost.from_row)
+            if post is not None:
+                return post
+        return None
+
+    def get_comments(self, post_id):
+        """Return the archived comments of a post as Comment records, oldest first"""
+        for period in self.periods():
+            comments = self.read(period, _select_comments, post_id, row_factory=Comment.from_row)
+            if comments:
+                return comments
+        return []
+
+    def close(self):
+        """Detach every archive and close the connection"""
+        with self._lock:
+            self._attached.clear()
+            self._conn.close()
+
+
+def _select_post(cursor, schema, post_id):
+    cursor.execute(f"SELECT {ArchivedPost.SELECT} FROM {schema}.posts WHERE id = ?", (post_id,))
+    return cursor.fetchone()
+
+
+def _select_comments(cursor, schema, post_id):
+    cursor.execute(
+        f"SELECT {Comment.SELECT} FROM {schema}.comments WHERE post_id = ? ORDER BY timestamp ASC", (post_id,)
+    )
+    return cursor.fetchall()
+
+
+def _write_archive(path, posts, comments, votes):
+    """Append rows to one archive file and index them for search.
+
+    Rows already in the archive (left behind by a run that stopped between
+    writing the archive and deleting from the hot tables) are skipped.
+    """
+    conn = sqlite3.connect(path)
+    register_functions(conn)
+    try:
+        for statement in ARCHIVE_SCHEMA:
+            conn.execute(statement)
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        for table, columns, rows, rowid in (
+            ("posts", POST_COLUMNS, posts, "rowid"),
+            ("comments", COMMENT_COLUMNS, comments, "id"),
+        ):
+            if not rows:
+                continue
+            ids = [row["id"] for row in rows]
+            cursor.execute(f"SELECT id FROM {table} WHERE id IN ({_placeholders(ids)})", ids)
+            existing = {row[0] for row in cursor}
+            new = [row for row in rows if row["id"] not in existing]
+            if not new:
+                continue
+            cursor.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({_placeholders(columns)})",
+                ([row[column] for column in columns] for row in new),
+            )
+            new_ids = [row["id"] for row in new]
+            cursor.execute(
+                f"INSERT INTO {table}_fts (rowid, content) "
+                f"SELECT {rowid}, {CONTENT_FUNCTION}(content) FROM {table} WHERE id IN ({_placeholders(new_ids)})",
+                new_ids,
+            )
+        cursor.executemany(
+            f"INSERT OR IGNORE INTO votes ({', '.join(VOTE_COLUMNS)}) VALUES ({_placeholders(VOTE_COLUMNS)})",
+            ([row[column] for column in VOTE_COLUMNS] for row in votes),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def archive_posts(db, archive_dir, cutoff, batch_size=ARCHIVE_BATCH_SIZE, report=logger.info):
+    """Move posts older than cutoff, with their comments and votes, into archive files.
+
+    Works through the oldest posts batch_size at a time. Each batch holds
+    the hot database's write lock while its rows are appended to the archive
+    file for their period and then deleted from the hot tables, so no vote
+    or comment can slip in between. The archive is committed first: a crash
+    in between leaves rows in both places, and the next run skips the copies
+    it already has. Returns the number of posts moved.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    moved = 0
+    with db.pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        while True:
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                cursor.execute(
+                    f"SELECT {', '.join(POST_COLUMNS)} FROM posts WHERE timestamp < ? ORDER BY timestamp LIMIT ?",
+                    (cutoff, batch_size),
+                )
+                posts = cursor.fetchall()
+                if not posts:
+                    conn.rollback()
+                    break
+                ids = [post["id"] for post in posts]
+                cursor.execute(
+                    f"SELECT {', '.join(COMMENT_COLUMNS)} FROM comments WHERE post_id IN ({_placeholders(ids)})",
+                    ids,
+                )
+                comments = cursor.fetchall()
+                cursor.execute(
+                    f"SELECT {', '.join(VOTE_COLUMNS)} FROM votes WHERE post_id IN ({_placeholders(ids)})",
+                    ids,
+                )
+                votes = cursor.fetchall()
+
+                periods = {post["id"]: archive_period(post["timestamp"]) for post in posts}
+                for period in sorted(set(periods.values())):
+                    _write_archive(
+                        archive_path(archive_dir, period),
+                        [post for post in posts if periods[post["id"]] == period],
+                        [comment for comment in comments if periods[comment["post_id"]] == period],
+                        [vote for vote in votes if periods[vote["post_id"]] == period],
+                    )
+
+                for table, column in (("votes", "post_id"), ("comments", "post_id"), ("posts", "id")):
+                    cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({_placeholders(ids)})", ids)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            moved += len(posts)
+            report(f"Archived {moved} posts")
+    return moved
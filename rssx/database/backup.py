@@ -0,0 +1,125 @@
+import os
+import re
+import sqlite3
+import time
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Pages copied per backup step, and the pause between steps during which the
+# source connection is free for other work
+BACKUP_STEP_PAGES = 256
+BACKUP_STEP_PAUSE = 0.005
+SNAPSHOT_FILE = re.compile(r"^rssx-(\d{8}-\d{6})\.db$")
+SNAPSHOT_KEEP = 7
+
+# longest_step is the longest time, in seconds, one step kept the source
+# connection busy: the worst stall a request sharing that connection can see
+BackupStats = namedtuple("BackupStats", "path pages steps seconds longest_step")
+
+
+def backup_connection(conn, dest_path, pages=BACKUP_STEP_PAGES, pause=BACKUP_STEP_PAUSE):
+    """Copy the database open on conn to dest_path with the sqlite3 backup API.
+
+    conn holds one read transaction for the whole copy, so the backup is a
+    consistent snapshot that includes everything committed to the WAL, and
+    writers on other connections never restart it. In WAL mode those
+    writers are not blocked at all. The copy is written to dest_path.part
+    and renamed into place once complete. Returns BackupStats.
+    """
+    partial = dest_path + ".part"
+    if os.path.exists(partial):
+        os.remove(partial)
+    dest = sqlite3.connect(partial)
+    steps = []
+    last = time.perf_counter()
+
+    def progress(status, remaining, total):
+        nonlocal last
+        now = time.perf_counter()
+        steps.append(now - last)
+        if remaining and pause:
+            time.sleep(pause)
+        last = time.perf_counter()
+
+    start = time.perf_counter()
+    try:
+        conn.execute("BEGIN")
+        conn.execute("SELECT count(*) FROM sqlite_master").fetchone()
+        try:
+            last = time.perf_counter()
+            conn.backup(dest, pages=pages, progress=progress)
+        finally:
+            conn.rollback()
+        total_pages = dest.execute("PRAGMA page_count").fetchone()[0]
+        # A backup is a single self-contained file, whatever the source used
+        dest.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        dest.close()
+    os.replace(partial, dest_path)
+    return BackupStats(dest_path, total_pages, len(steps), time.perf_counter() - start, max(steps, default=0.0))
+
+
+def snapshot_path(snapshot_dir, when=None):
+    """Return the path of the snapshot taken at when (default now), named by its UTC time"""
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime(when))
+    return os.path.join(snapshot_dir, f"rssx-{stamp}.db")
+
+
+def list_snapshots(snapshot_dir):
+    """Return the snapshot files in snapshot_dir, newest first"""
+    try:
+        names = os.listdir(snapshot_dir)
+    except FileNotFoundError:
+        return []
+    names = sorted((name for name in names if SNAPSHOT_FILE.match(name)), reverse=True)
+    return [os.path.join(snapshot_dir, name) for name in names]
+
+
+def prune_snapshots(snapshot_dir, keep=SNAPSHOT_KEEP):
+    """Delete all but the keep newest snapshots; return the paths deleted"""
+    removed = []
+    for path in list_snapshots(snapshot_dir)[max(keep, 1):]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue  # pruned by another process, e.g. a --snapshot run
+        removed.append(path)
+        logger.info(f"Removed old snapshot {path}")
+    return removed
+
+
+def restore_database(backup_path, db_path, report=logger.info):
+    """Replace db_path with the contents of backup_path.
+
+    Only run this while nothing has db_path open. The backup is checked with
+    PRAGMA quick_check first, and the current database (WAL included) is
+    itself backed up to db_path.before-restore. The backup API copies pages
+    verbatim, so rowids, and with them the search indexes, come back as
+    they were; migrations newer than the backup run on the next open. The
+    archive files are left alone: posts archived since the backup was taken
+    are found in both places, and the next archiving run skips them.
+    """
+    uri = "file:" + os.path.abspath(backup_path) + "?mode=ro"
+    source = sqlite3.connect(uri, uri=True)
+    try:
+        status = source.execute("PRAGMA quick_check").fetchone()[0]
+        if status != "ok":
+            raise sqlite3.DatabaseError(f"{backup_path} failed quick_check: {status}")
+        if os.path.exists(db_path):
+            current = sqlite3.connect(db_path)
+            try:
+                stats = backup_connection(current, db_path + ".before-restore", pages=-1, pause=0)
+            finally:
+                current.close()
+            report(f"Saved the current database as {stats.path}")
+        stats = backup_connection(source, db_path + ".restore", pages=-1, pause=0)
+    finally:
+        source.close()
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    os.replace(stats.path, db_path)
+    report(f"Restored {db_path} from {backup_path} ({stats.pages} pages)")
+    return stats
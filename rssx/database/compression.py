@@ -0,0 +1,34 @@
+import zlib
+
+# Post and comment content longer than the threshold (in UTF-8 bytes) may be
+# stored zlib-compressed. Stored content is then either TEXT, as written, or
+# a BLOB holding the compressed UTF-8: the storage class is the marker, so
+# rows written before compression was turned on need no rewrite.
+COMPRESSION_LEVEL = 6
+# SQL name of decompress_content, registered on every connection; the search
+# triggers call it, so the tables can only be written through connections
+# that have it (see register_functions)
+CONTENT_FUNCTION = "rssx_content"
+
+
+def compress_content(text, threshold):
+    """Return text as it should be stored: compressed bytes if that pays off, else text"""
+    if not threshold or not isinstance(text, str) or len(text) <= threshold:
+        return text
+    raw = text.encode("utf-8")
+    if len(raw) <= threshold:
+        return text
+    packed = zlib.compress(raw, COMPRESSION_LEVEL)
+    return packed if len(packed) < len(raw) else text
+
+
+def decompress_content(value):
+    """Return stored content as text"""
+    if isinstance(value, bytes):
+        return zlib.decompress(value).decode("utf-8")
+    return value
+
+
+def register_functions(conn):
+    """Make decompress_content available to SQL on conn as rssx_content(content)"""
+    conn.create_function(CONTENT_FUNCTION, 1, decompress_content, deterministic=True)
@@ -3,178 +3,238 @@ import os
 import json
 import time
 import logging
-from pathlib import Path
+import base64
+import hashlib
+import re
+from concurrent.futures import Future
+
+from rssx.database.pool import ConnectionPool
+from rssx.database.storage import Storage
+from rssx.database.write_queue import WriteQueue
+from rssx.database.archive import ARCHIVE_BATCH_SIZE, ArchiveSet, archive_posts
+from rssx.database.backup import (
+    BACKUP_STEP_PAGES, BACKUP_STEP_PAUSE, SNAPSHOT_KEEP, backup_connection, prune_snapshots,
+    restore_database, snapshot_path,
+)
+from rssx.database.compression import CONTENT_FUNCTION, compress_content, decompress_content
+from rssx.database.records import Comment, Post
+from rssx.database.migrations import apply_migrations
+from rssx.database.ids import next_id, next_post_id
+from rssx.database.legacy_import import LEGACY_IMPORT_KEY, import_legacy_data, legacy_data_present
+from rssx.security.blacklist import BlacklistMatcher
 
 logger = logging.getLogger(__name__)
 
-
-class Database:
-    def __init__(self, db_path="rssx.db"):
+COMMENT_BATCH_SIZE = 500
+# Posts per UNION ALL query when fetching comment previews; SQLite allows
+# at most 500 terms in a compound SELECT
+COMMENT_PREVIEW_BATCH_SIZE = 100
+SPAM_UPDATE_BATCH_SIZE = 500
+# Attempts at inserting a generated ID before giving up; a clash needs two
+# processes with the same node ID minting an ID in the same millisecond.
+GENERATED_ID_ATTEMPTS = 3
+# Feed sort orders and the columns of their keyset; each has a matching index
+FEED_SORT_KEYS = {
+    "ranked": ("author_popularity", "upvotes", "timestamp", "id"),  # idx_posts_feed
+    "activity": ("last_activity_at", "id"),  # idx_posts_activity
+}
+FEED_ORDER = ", ".join(f"{column} DESC" for column in FEED_SORT_KEYS["ranked"])
+SEARCH_MAX_TERMS = 16
+# Only the newest SEARCH_CANDIDATES matches per table are ranked, so a query
+# for a very common word costs the same however large the tables grow. The
+# first page's cursor pins the newest rowid per table, so rows indexed while
+# a client pages through cannot push older matches out of that window.
+SEARCH_CANDIDATES = 5000
+SEARCH_INDEX_BATCH_SIZE = 500
+SEARCH_TERM = re.compile(r"\w+")
+
+
+def encode_cursor(values):
+    """Encode a sort key as an opaque, URL-safe pagination cursor"""
+    raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, length):
+    """Decode a cursor produced by encode_cursor; raise ValueError if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {str(e)}")
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def build_match_query(text):
+    """Turn free text into an FTS5 MATCH expression that finds rows containing every word.
+
+    Each word is quoted, so FTS5 operators and punctuation typed by users are
+    searched for literally instead of raising a syntax error. Returns None if
+    text has no searchable words.
+    """
+    terms = SEARCH_TERM.findall(text or "")[:SEARCH_MAX_TERMS]
+    if not terms:
+        return None
+    return " ".join(f'"{term}"' for term in terms)
+
+
+def _search_caps(cursor):
+    """Return the newest (post rowid, comment ID) in the hot search indexes"""
+    cursor.execute(
+        """
+        SELECT COALESCE((SELECT rowid FROM posts_fts ORDER BY rowid DESC LIMIT 1), 0),
+               COALESCE((SELECT rowid FROM comments_fts ORDER BY rowid DESC LIMIT 1), 0)
+        """
+    )
+    return tuple(cursor.fetchone())
+
+
+def _search_hits(cursor, schema, match, after, limit, caps=None):
+    """Return up to limit (rank, kind, ref) search hits from one schema's indexes, after the key after.
+
+    caps is (post rowid, comment ID): hits newer than these are left out.
+    """
+    post_cap, comment_cap = caps or (None, None)
+    params, capped = [], {}
+    for kind, cap in (("comment", comment_cap), ("post", post_cap)):
+        capped[kind] = "" if cap is None else "AND rowid <= ?"
+        params.extend([match] + ([] if cap is None else [cap]) + [SEARCH_CANDIDATES])
+    where = ""
+    if after:
+        params.extend(after)
+        where = "WHERE (rank, kind, ref) > (?, ?, ?)"
+    params.append(limit)
+    cursor.execute(
+        f"""
+        SELECT rank, kind, ref FROM (
+            SELECT * FROM (
+                SELECT 'comment' AS kind, rowid AS ref, rank
+                FROM {schema}.comments_fts WHERE comments_fts MATCH ? {capped['comment']}
+                ORDER BY rowid DESC LIMIT ?
+            )
+            UNION ALL
+            SELECT * FROM (
+                SELECT 'post' AS kind, rowid AS ref, rank
+                FROM {schema}.posts_fts WHERE posts_fts MATCH ? {capped['post']}
+                ORDER BY rowid DESC LIMIT ?
+            )
+        ) {where}
+        ORDER BY rank, kind, ref LIMIT ?
+        """,
+        params,
+    )
+    return [tuple(hit) for hit in cursor.fetchall()]
+
+
+def _search_tier(cursor, schema, match, after, limit, caps=None):
+    """Return [(rank, kind, ref, row)] for up to limit hits in one schema; row is None if it was deleted"""
+    hits = _search_hits(cursor, schema, match, after, limit, caps)
+    rows = {}
+    for kind, sql in (
+        ("post", "SELECT rowid AS ref, * FROM {}.posts WHERE rowid IN ({})"),
+        ("comment", "SELECT id AS ref, * FROM {}.comments WHERE id IN ({})"),
+    ):
+        refs = [ref for _, hit_kind, ref in hits if hit_kind == kind]
+        if refs:
+            cursor.execute(sql.format(schema, ", ".join("?" * len(refs))), refs)
+            for row in cursor:
+                rows[(kind, row["ref"])] = row
+    return [(rank, kind, ref, rows.get((kind, ref))) for rank, kind, ref in hits]
+
+
+class Database(Storage):
+    def __init__(self, db_path="rssx.db", pool_size=8, busy_timeout=5.0,
+                 write_batch_size=0, write_batch_delay=0.0, pool=None, archive_dir=None,
+                 compress_threshold=0):
+        """Open db_path and apply migrations.
+
+        pool replaces the default ConnectionPool; it must provide the same
+        connection(), set_trace_callback() and close() methods (see
+        EnginePool). A write_batch_size above 0 sends votes and comments
+        through a WriteQueue that group-commits up to that many writes,
+        waiting at most write_batch_delay seconds for a batch to fill.
+        With archive_dir set, archive_old_posts moves old posts into
+        archive files there, and lookups and search fall back to them.
+        Post and comment content longer than compress_threshold bytes is
+        stored zlib-compressed (0 turns this off); reads decompress it.
+        """
         self.db_path = db_path
+        if pool is None:
+            pool = ConnectionPool(db_path, size=pool_size, busy_timeout=busy_timeout)
+        self.pool = pool
+        self.write_queue = None
+        self._change_callback = None
+        self.compress_threshold = compress_threshold
+        self.archives = ArchiveSet(archive_dir, busy_timeout) if archive_dir else None
         self.init_db()
-
-    def init_db(self):
-        """Initialize the database and create tables if they don't exist"""
+        if write_batch_size > 0:
+            self.write_queue = WriteQueue(self.pool, write_batch_size, write_batch_delay)
+
+    def close(self):
+        """Commit queued writes and close all pooled connections"""
+        if self.write_queue is not None:
+            self.write_queue.close()
+        if self.archives is not None:
+            self.archives.close()
+        self.pool.close()
+
+    def set_change_callback(self, callback):
+        """Call callback(event, post_id) after each committed change to what feeds show.
+
+        event is "post", "comment", "vote" or "edit" with the ID of the post
+        concerned, "user" for a new or replaced user (popularity resets), or
+        "spam" or "archive" (post_id None) for changes to many posts at once.
+        """
+        self._change_callback = callback
+
+    def _changed(self, event, post_id=None):
+        """Report a committed change to the change callback"""
+        callback = self._change_callback
+        if callback is None:
+            return
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            # Create users table
-            cursor.execute(
-                """
-            CREATE TABLE IF NOT EXISTS users (
-                username TEXT PRIMARY KEY,
-                password TEXT NOT NULL,
-                created_at INTEGER NOT NULL,
-                last_login INTEGER,
-                popularity INTEGER DEFAULT 0
-            )
-            """
-            )
-
-            # Create posts table
-            cursor.execute(
-                """
-            CREATE TABLE IF NOT EXISTS posts (
-                id TEXT PRIMARY KEY,
-                author TEXT NOT NULL,
-                content TEXT NOT NULL,
-                timestamp INTEGER NOT NULL,
-                signature TEXT NOT NULL,
-                upvotes INTEGER DEFAULT 0,
-                downvotes INTEGER DEFAULT 0,
-                spam INTEGER DEFAULT 0
-            )
-            """
-            )
+            callback(event, post_id)
+        except Exception as e:
+            logger.error(f"Change callback failed for {event}: {str(e)}")
 
-            # Create servers table
-            cursor.execute(
-                """
-            CREATE TABLE IF NOT EXISTS servers (
-                url TEXT PRIMARY KEY,
-                last_sync INTEGER
-            )
-            """
-            )
+    def _report_when_done(self, future, event, post_id):
+        """Report a change once an asynchronous write succeeds; return future"""
+        def done(future):
+            if future.exception() is None and future.result() is not None:
+                self._changed(event, post_id)
 
-            # Create votes table
-            cursor.execute(
-                """
-            CREATE TABLE IF NOT EXISTS votes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                post_id TEXT NOT NULL,
-                username TEXT NOT NULL,
-                vote_type TEXT NOT NULL CHECK(vote_type IN ('upvote', 'downvote')),
-                UNIQUE(post_id, username)
-            )
-            """
-            )
+        future.add_done_callback(done)
+        return future
 
-            conn.commit()
+    def init_db(self):
+        """Initialize the database by applying any pending schema migrations"""
+        try:
+            with self.pool.connection() as conn:
+                apply_migrations(conn)
             logger.info("Database initialized successfully")
 
-            # Import existing data if available
-            self._import_existing_data()
+            # Legacy JSON/.rssx data is imported by an explicit command, once
+            if self.get_meta(LEGACY_IMPORT_KEY) is None and legacy_data_present():
+                logger.warning(
+                    "Found users.json, servers.json or posts/ that have not been imported; "
+                    "run python -m rssx.database.db --import-legacy to load them"
+                )
 
         except sqlite3.Error as e:
             logger.error(f"Database initialization error: {str(e)}")
-        finally:
-            if conn:
-                conn.close()
-
-    def _import_existing_data(self):
-        """Import existing data from JSON files"""
-        # Import users
-        if os.path.exists("users.json"):
-            try:
-                with open("users.json", "r") as f:
-                    users = json.load(f)
-
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-
-                for username, password in users.items():
-                    # If password is a list or dict, serialize to JSON string
-                    if isinstance(password, (list, dict)):
-                        password = json.dumps(password)
-                    cursor.execute(
-                        "INSERT OR IGNORE INTO users (username, password, created_at) VALUES (?, ?, ?)",
-                        (username, password, int(time.time())),
-                    )
-
-                conn.commit()
-                conn.close()
-                logger.info("Imported existing users data")
-            except Exception as e:
-                logger.error(f"Error importing users data: {str(e)}")
-
-        # Import servers
-        if os.path.exists("servers.json"):
-            try:
-                with open("servers.json", "r") as f:
-                    servers = json.load(f)
-
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-
-                for server_url in servers:
-                    cursor.execute(
-                        "INSERT OR IGNORE INTO servers (url, last_sync) VALUES (?, ?)",
-                        (server_url, int(time.time())),
-                    )
-
-                conn.commit()
-                conn.close()
-                logger.info("Imported existing servers data")
-            except Exception as e:
-                logger.error(f"Error importing servers data: {str(e)}")
-
-        # Import posts
-        posts_dir = Path("posts")
-        if posts_dir.exists() and posts_dir.is_dir():
-            try:
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-
-                for post_file in posts_dir.glob("*.rssx"):
-                    with open(post_file, "r") as f:
-                        lines = f.readlines()
-
-                    post_data = {}
-                    for line in lines:
-                        if ": " in line:
-                            key, value = line.split(": ", 1)
-                            post_data[key.strip()] = value.strip()
-
-                    # Extract post data
-                    post_id = post_data.get("ID", str(int(time.time())))
-                    author = post_data.get("Author", "unknown")
-                    timestamp = post_data.get("Timestamp", str(int(time.time())))
-                    content = post_data.get("Content", "")
-                    signature = post_data.get("Signature", "")
-
-                    cursor.execute(
-                        "INSERT OR IGNORE INTO posts (id, author, content, timestamp, signature) VALUES (?, ?, ?, ?, ?)",
-                        (post_id, author, content, timestamp, signature),
-                    )
-
-                conn.commit()
-                conn.close()
-                logger.info("Imported existing posts data")
-            except Exception as e:
-                logger.error(f"Error importing posts data: {str(e)}")
 
     def get_user(self, username):
         """Get user by username"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT username, password FROM users WHERE username = ?", (username,)
-            )
-            user = cursor.fetchone()
-            conn.close()
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT username, password FROM users WHERE username = ?",
+                    (username,),
+                )
+                user = cursor.fetchone()
 
             if user:
                 return {"username": user[0], "password": user[1]}
@@ -186,16 +246,16 @@ class Database:
     def save_user(self, username, password):
         """Save a new user or update existing user"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute(
-                "INSERT OR REPLACE INTO users (username, password, created_at) VALUES (?, ?, ?)",
-                (username, password, int(time.time())),
-            )
+                cursor.execute(
+                    "INSERT OR REPLACE INTO users (username, password, created_at) VALUES (?, ?, ?)",
+                    (username, password, int(time.time())),
+                )
 
-            conn.commit()
-            conn.close()
+                conn.commit()
+            self._changed("user")
             return True
         except sqlite3.Error as e:
             logger.error(f"Database error in save_user: {str(e)}")
@@ -204,99 +264,161 @@ class Database:
     def update_login_time(self, username):
         """Update last login time for a user"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute(
-                "UPDATE users SET last_login = ? WHERE username = ?",
-                (int(time.time()), username),
-            )
+                cursor.execute(
+                    "UPDATE users SET last_login = ? WHERE username = ?",
+                    (int(time.time()), username),
+                )
 
-            conn.commit()
-            conn.close()
+                conn.commit()
             return True
         except sqlite3.Error as e:
             logger.error(f"Database error in update_login_time: {str(e)}")
             return False
 
+    def _insert_with_id(self, cursor, sql, params, record_id, generate):
+        """Run an INSERT whose first parameter is the row ID and return that ID.
+
+        If record_id is None a new one is generated, and regenerated should it
+        collide with an existing row.
+        """
+        for attempt in range(GENERATED_ID_ATTEMPTS):
+            candidate = record_id if record_id is not None else generate()
+            try:
+                cursor.execute(sql, (candidate,) + tuple(params))
+                return candidate
+            except sqlite3.IntegrityError as e:
+                if (
+                    record_id is not None
+                    or "UNIQUE" not in str(e)
+                    or attempt == GENERATED_ID_ATTEMPTS - 1
+                ):
+                    raise
+                logger.warning(f"Generated ID {candidate} already exists, retrying")
+
+    def _write(self, write, *args):
+        """Run write(cursor, *args) in a write transaction and return its result.
+
+        With a write queue the write joins the writer thread's next batch and
+        this call blocks until that batch commits; otherwise it gets its own
+        BEGIN IMMEDIATE transaction. Raises sqlite3.Error on failure.
+        """
+        if self.write_queue is not None:
+            return self.write_queue.submit(write, *args).result()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            result = write(cursor, *args)
+            conn.commit()
+        return result
+
+    def _write_async(self, write, *args):
+        """Like _write, but return a Future instead of waiting for the commit"""
+        if self.write_queue is not None:
+            return self.write_queue.submit(write, *args)
+        future = Future()
+        try:
+            future.set_result(self._write(write, *args))
+        except sqlite3.Error as e:
+            future.set_exception(e)
+        return future
+
     def save_post(self, post_data):
         """Save a new post, supporting federated_from for federated posts"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
 
-            # Add federated_from column if not present
-            try:
-                cursor.execute("ALTER TABLE posts ADD COLUMN federated_from TEXT")
-            except sqlite3.OperationalError as e:
-                if "duplicate column name" not in str(e):
-                    logger.error(f"Error adding federated_from column: {str(e)}")
-
-            post_id = post_data.get("id", str(int(time.time())))
-            author = post_data["author"]
-            content = post_data["content"]
-            timestamp = post_data["timestamp"]
-            signature = post_data["signature"]
-            federated_from = post_data.get("federated_from")
-
-            if federated_from:
-                cursor.execute(
-                    "INSERT INTO posts (id, author, content, timestamp, signature, federated_from) VALUES (?, ?, ?, ?, ?, ?)",
-                    (post_id, author, content, timestamp, signature, federated_from),
-                )
-            else:
-                cursor.execute(
-                    "INSERT INTO posts (id, author, content, timestamp, signature) VALUES (?, ?, ?, ?, ?)",
-                    (post_id, author, content, timestamp, signature),
+                post_id = self._insert_with_id(
+                    cursor,
+                    "INSERT INTO posts (id, author, content, timestamp, signature, federated_from, last_activity_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        post_data["author"],
+                        compress_content(post_data["content"], self.compress_threshold),
+                        post_data["timestamp"],
+                        post_data["signature"],
+                        post_data.get("federated_from"),
+                        post_data["timestamp"],
+                    ),
+                    post_data.get("id"),
+                    next_post_id,
                 )
-
-            conn.commit()
-            conn.close()
+                conn.commit()
+            if post_id is not None:
+                self._changed("post", post_id)
             return post_id
         except sqlite3.Error as e:
             logger.error(f"Database error in save_post: {str(e)}")
             return None
 
     def get_all_posts(self):
-        """Get all posts as a list of dicts, sorted by author popularity and post upvotes"""
+        """Get all posts as a list of Post records, sorted by author popularity and post upvotes"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            # Join posts with users to get author popularity
-            cursor.execute(
-                """
-                SELECT posts.*, users.popularity as author_popularity
-                FROM posts
-                LEFT JOIN users ON posts.author = users.username
-                ORDER BY author_popularity DESC, posts.upvotes DESC, posts.timestamp DESC
-            """
-            )
-            rows = cursor.fetchall()
-            posts = []
-            for row in rows:
-                post = dict(row)
-                post.pop("author_popularity", None)  # Remove if not needed in output
-                posts.append(post)
-            conn.close()
-            return posts
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = Post.from_row
+                # author_popularity mirrors users.popularity so idx_posts_feed
+                # can return rows already in feed order
+                cursor.execute(f"SELECT {Post.SELECT} FROM posts ORDER BY {FEED_ORDER}")
+                return cursor.fetchall()
         except sqlite3.Error as e:
             logger.error(f"Database error in get_all_posts: {str(e)}")
             return []
 
+    def get_posts_page(self, limit=20, cursor=None, sort="ranked"):
+        """Get one page of the feed and the cursor for the next page (None on the last page).
+
+        sort is "ranked" (author popularity, then upvotes, then newest) or
+        "activity" (most recently posted or commented on first). Pages are
+        keyset-paginated on the sort key, which has its own index, so every
+        page costs one index seek no matter how deep into the feed it is.
+        Raises ValueError if sort is unknown or cursor is malformed.
+        """
+        if sort not in FEED_SORT_KEYS:
+            raise ValueError(f"Unknown feed sort {sort!r}")
+        keys = FEED_SORT_KEYS[sort]
+        params = []
+        where = ""
+        if cursor:
+            params.extend(decode_cursor(cursor, len(keys)))
+            where = f"WHERE ({', '.join(keys)}) < ({', '.join('?' * len(keys))})"
+        params.append(limit + 1)
+        order = ", ".join(f"{column} DESC" for column in keys)
+        try:
+            with self.pool.connection() as conn:
+                db_cursor = conn.cursor()
+                db_cursor.row_factory = Post.from_row
+                db_cursor.execute(
+                    f"SELECT {Post.SELECT} FROM posts {where} ORDER BY {order} LIMIT ?", params
+                )
+                posts = db_cursor.fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Database error in get_posts_page: {str(e)}")
+            return [], None
+
+        next_cursor = None
+        if len(posts) > limit:
+            posts = posts[:limit]
+            last = posts[-1]
+            next_cursor = encode_cursor([getattr(last, column) for column in keys])
+        return posts, next_cursor
+
     def get_post_by_id(self, post_id):
-        """Get a specific post by ID and return as a dict"""
+        """Get a specific post by ID as a Post record, or None"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = Post.from_row
 
-            cursor.execute("SELECT * FROM posts WHERE id = ?", (post_id,))
-            row = cursor.fetchone()
-            conn.close()
+                cursor.execute(f"SELECT {Post.SELECT} FROM posts WHERE id = ?", (post_id,))
+                post = cursor.fetchone()
 
-            if row:
-                return dict(row)
+            if post:
+                return post
+            if self.archives is not None:
+                return self.archives.get_post(post_id)
             return None
         except sqlite3.Error as e:
             logger.error(f"Database error in get_post_by_id: {str(e)}")
@@ -305,15 +427,13 @@ class Database:
     def get_all_servers(self):
         """Get all connected servers"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute("SELECT url FROM servers")
-            rows = cursor.fetchall()
+                cursor.execute("SELECT url FROM servers")
+                rows = cursor.fetchall()
 
             servers = [row[0] for row in rows]
-
-            conn.close()
             return servers
         except sqlite3.Error as e:
             logger.error(f"Database error in get_all_servers: {str(e)}")
@@ -322,241 +442,518 @@ class Database:
     def add_server(self, server_url):
         """Add a new server connection"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
 
-            cursor.execute(
-                "INSERT OR IGNORE INTO servers (url, last_sync) VALUES (?, ?)",
-                (server_url, int(time.time())),
-            )
+                cursor.execute(
+                    "INSERT OR IGNORE INTO servers (url, last_sync) VALUES (?, ?)",
+                    (server_url, int(time.time())),
+                )
 
-            conn.commit()
-            result = cursor.rowcount > 0
-            conn.close()
+                conn.commit()
+                result = cursor.rowcount > 0
             return result
         except sqlite3.Error as e:
             logger.error(f"Database error in add_server: {str(e)}")
             return False
 
+    def _insert_comment(self, cursor, comment_data):
+        """Write step for save_comment"""
+        return self._insert_with_id(
+            cursor,
+            "INSERT INTO comments (id, author, timestamp, content, post_id, signature, federated_from) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                comment_data["author"],
+                comment_data["timestamp"],
+                compress_content(comment_data["content"], self.compress_threshold),
+                comment_data["post_id"],
+                comment_data["signature"],
+                comment_data.get("federated_from"),
+            ),
+            comment_data.get("id"),
+            next_id,
+        )
+
     def save_comment(self, comment_data):
         """Save a new comment to the database and return its ID. Supports federated_from for federated comments."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            # Ensure the comments table exists and has federated_from column
-            cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS comments (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    author TEXT NOT NULL,
-                    timestamp INTEGER NOT NULL,
-                    content TEXT NOT NULL,
-                    post_id TEXT NOT NULL,
-                    signature TEXT NOT NULL,
-                    federated_from TEXT
-                )
-            """
-            )
-            # Try to add federated_from column if not present
-            try:
-                cursor.execute("ALTER TABLE comments ADD COLUMN federated_from TEXT")
-            except sqlite3.OperationalError as e:
-                if "duplicate column name" not in str(e):
-                    logger.error(f"Error adding federated_from column to comments: {str(e)}")
-
-            federated_from = comment_data.get("federated_from")
-            if federated_from:
-                cursor.execute(
-                    "INSERT INTO comments (author, timestamp, content, post_id, signature, federated_from) VALUES (?, ?, ?, ?, ?, ?)",
-                    (
-                        comment_data["author"],
-                        comment_data["timestamp"],
-                        comment_data["content"],
-                        comment_data["post_id"],
-                        comment_data["signature"],
-                        federated_from,
-                    ),
-                )
-            else:
-                cursor.execute(
-                    "INSERT INTO comments (author, timestamp, content, post_id, signature) VALUES (?, ?, ?, ?, ?)",
-                    (
-                        comment_data["author"],
-                        comment_data["timestamp"],
-                        comment_data["content"],
-                        comment_data["post_id"],
-                        comment_data["signature"],
-                    ),
-                )
-            conn.commit()
-            comment_id = cursor.lastrowid
-            conn.close()
-            return comment_id
+            comment_id = self._write(self._insert_comment, comment_data)
         except sqlite3.Error as e:
             logger.error(f"Database error in save_comment: {str(e)}")
             return None
+        if comment_id is not None:
+            self._changed("comment", comment_data["post_id"])
+        return comment_id
+
+    def save_comment_async(self, comment_data):
+        """Like save_comment, but return a Future for the comment ID"""
+        return self._report_when_done(
+            self._write_async(self._insert_comment, comment_data), "comment", comment_data["post_id"]
+        )
 
     def get_comments_for_post(self, post_id):
-        """Get all comments for a given post_id, sorted by timestamp ascending"""
+        """Get all comments for a given post_id as Comment records, sorted by timestamp ascending"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM comments WHERE post_id = ? ORDER BY timestamp ASC", (post_id,))
-            rows = cursor.fetchall()
-            comments = [dict(row) for row in rows]
-            conn.close()
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = Comment.from_row
+                cursor.execute(
+                    f"SELECT {Comment.SELECT} FROM comments WHERE post_id = ? ORDER BY timestamp ASC",
+                    (post_id,),
+                )
+                comments = cursor.fetchall()
+                archived = self.archives is not None and conn.execute(
+                    "SELECT 1 FROM posts WHERE id = ?", (post_id,)
+                ).fetchone() is None
+            if archived:
+                comments = sorted(
+                    self.archives.get_comments(post_id) + comments, key=lambda c: c.timestamp
+                )
             return comments
         except sqlite3.Error as e:
             logger.error(f"Database error in get_comments_for_post: {str(e)}")
             return []
 
-    def update_post(self, post_id, new_content):
-        """Update the content of an existing post"""
+    def get_comments_for_posts(self, post_ids):
+        """Get comments for many posts at once as {post_id: [Comment]}, each list sorted by timestamp ascending"""
+        post_ids = list(dict.fromkeys(post_ids))
+        comments = {post_id: [] for post_id in post_ids}
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute(
-                "UPDATE posts SET content = ? WHERE id = ?", (new_content, post_id)
-            )
-            conn.commit()
-            success = cursor.rowcount > 0
-            conn.close()
-            return success
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = Comment.from_row
+                # Stay well under SQLite's bound-parameter limit on large pages
+                for start in range(0, len(post_ids), COMMENT_BATCH_SIZE):
+                    chunk = post_ids[start:start + COMMENT_BATCH_SIZE]
+                    placeholders = ", ".join("?" * len(chunk))
+                    cursor.execute(
+                        f"SELECT {Comment.SELECT} FROM comments WHERE post_id IN ({placeholders}) ORDER BY post_id, timestamp ASC",
+                        chunk,
+                    )
+                    for comment in cursor:
+                        comments[comment.post_id].append(comment)
+            return comments
         except sqlite3.Error as e:
-            logger.error(f"Database error in update_post: {str(e)}")
-            return False
+            logger.error(f"Database error in get_comments_for_posts: {str(e)}")
+            return {post_id: [] for post_id in post_ids}
+
+    def get_comments_page(self, post_id, limit=20, cursor=None):
+        """Get one page of a post's comments, oldest first, and the cursor for the next page.
 
-    def upvote_post(self, post_id, username):
-        """Allow a user to upvote a post only once"""
+        Keyset-paginated on (timestamp, id) through idx_comments_post_timestamp.
+        Returns (comments, next_cursor); next_cursor is None on the last page.
+        Raises ValueError if cursor is malformed.
+        """
+        after = decode_cursor(cursor, 2) if cursor else None
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            # Check if user already voted
-            cursor.execute(
-                "SELECT vote_type FROM votes WHERE post_id = ? AND username = ?",
-                (post_id, username),
-            )
-            row = cursor.fetchone()
-            if row:
-                if row[0] == "upvote":
-                    conn.close()
-                    return False  # Already upvoted
-                elif row[0] == "downvote":
-                    # Change downvote to upvote
+            with self.pool.connection() as conn:
+                if self.archives is not None and conn.execute(
+                    "SELECT 1 FROM posts WHERE id = ?", (post_id,)
+                ).fetchone() is None:
+                    comments = None
+                else:
+                    db_cursor = conn.cursor()
+                    db_cursor.row_factory = Comment.from_row
+                    where = "AND (timestamp, id) > (?, ?)" if after else ""
+                    db_cursor.execute(
+                        f"SELECT {Comment.SELECT} FROM comments WHERE post_id = ? {where} ORDER BY timestamp, id LIMIT ?",
+                        [post_id] + (after or []) + [limit + 1],
+                    )
+                    comments = db_cursor.fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Database error in get_comments_page: {str(e)}")
+            return [], None
+
+        if comments is None:
+            # Archived post: its comments are few and spread over two
+            # databases, so page through them in Python
+            comments = sorted(self.get_comments_for_post(post_id), key=lambda c: (c.timestamp, c.id))
+            if after:
+                comments = [c for c in comments if [c.timestamp, c.id] > after]
+            comments = comments[:limit + 1]
+        next_cursor = None
+        if len(comments) > limit:
+            comments = comments[:limit]
+            next_cursor = encode_cursor((comments[-1].timestamp, comments[-1].id))
+        return comments, next_cursor
+
+    def get_comment_previews(self, post_ids, per_post=3):
+        """Get the first per_post comments of many posts as {post_id: (comments, next_cursor)}.
+
+        next_cursor continues the list with get_comments_page, or is None if
+        the preview already holds every comment. Each post costs one index
+        seek for per_post + 1 rows, however long its thread is. per_post is
+        at least 1.
+        """
+        per_post = max(1, per_post)
+        post_ids = list(dict.fromkeys(post_ids))
+        rows = {post_id: [] for post_id in post_ids}
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = Comment.from_row
+                for start in range(0, len(post_ids), COMMENT_PREVIEW_BATCH_SIZE):
+                    chunk = post_ids[start:start + COMMENT_PREVIEW_BATCH_SIZE]
+                    query = " UNION ALL ".join(
+                        [f"SELECT * FROM (SELECT {Comment.SELECT} FROM comments WHERE post_id = ? ORDER BY timestamp, id LIMIT ?)"]
+                        * len(chunk)
+                    )
+                    params = []
+                    for post_id in chunk:
+                        params.extend((post_id, per_post + 1))
+                    cursor.execute(query, params)
+                    for comment in cursor:
+                        rows[comment.post_id].append(comment)
+        except sqlite3.Error as e:
+            logger.error(f"Database error in get_comment_previews: {str(e)}")
+            return {post_id: ([], None) for post_id in post_ids}
+
+        previews = {}
+        for post_id, comments in rows.items():
+            next_cursor = None
+            if len(comments) > per_post:
+                comments = comments[:per_post]
+                next_cursor = encode_cursor((comments[-1].timestamp, comments[-1].id))
+            previews[post_id] = (comments, next_cursor)
+        return previews
+
+    def search(self, text, limit=20, cursor=None):
+        """Full-text search over posts and comments, best matches first.
+
+        Returns (results, next_cursor). Each result is a post or comment dict
+        with a "type" key of "post" or "comment". The newest SEARCH_CANDIDATES
+        matches of each kind are ranked by BM25 and keyset-paginated on
+        (rank, type, rowid). Archived results (marked "archived") follow the
+        hot ones, newest archive first. Rows still waiting in search_pending
+        are not found until index_pending_search has run, and later pages
+        leave out rows indexed after the first page was read. BM25 scores
+        shift slightly as the index grows, so near-equal matches can still
+        move across a page boundary. Raises ValueError if text has no
+        searchable words or cursor is malformed.
+        """
+        match = build_match_query(text)
+        if match is None:
+            raise ValueError("Search query has no searchable words")
+        tiers = ["hot"] + (self.archives.periods() if self.archives is not None else [])
+        start, after, caps = 0, None, None
+        if cursor:
+            tier, rank, kind, ref, *caps = decode_cursor(cursor, 6)
+            if tier not in tiers or not all(cap is None or isinstance(cap, int) for cap in caps):
+                raise ValueError("Invalid cursor")
+            start, after = tiers.index(tier), (rank, kind, ref)
+
+        # Fetch one hit more than needed, from later tiers if necessary, to
+        # know whether there is another page
+        found = []
+        try:
+            for tier in tiers[start:]:
+                want = limit + 1 - len(found)
+                if tier == "hot":
+                    with self.pool.connection() as conn:
+                        db_cursor = conn.cursor()
+                        db_cursor.row_factory = sqlite3.Row
+                        if caps is None:
+                            caps = _search_caps(db_cursor)
+                        hits = _search_tier(db_cursor, "main", match, after, want, caps)
+                else:
+                    hits = self.archives.read(tier, _search_tier, match, after, want)
+                found.extend((tier, hit) for hit in hits)
+                after = None
+                if len(found) > limit:
+                    break
+        except sqlite3.Error as e:
+            logger.error(f"Database error in search: {str(e)}")
+            return [], None
+
+        next_cursor = None
+        if len(found) > limit:
+            found = found[:limit]
+            tier, (rank, kind, ref, _) = found[-1]
+            next_cursor = encode_cursor((tier, rank, kind, ref) + tuple(caps or (None, None)))
+
+        results = []
+        for tier, (rank, kind, ref, row) in found:
+            if row is None:
+                continue
+            result = dict(row)
+            result["content"] = decompress_content(result["content"])
+            result.pop("ref")
+            result.pop("author_popularity", None)
+            result["type"] = kind
+            if tier != "hot":
+                result["archived"] = True
+            results.append(result)
+        return results, next_cursor
+
+    def index_pending_search(self, batch_size=SEARCH_INDEX_BATCH_SIZE):
+        """Add up to batch_size queued posts and comments to the search index; return how many"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute("SELECT kind, ref FROM search_pending LIMIT ?", (batch_size,))
+                pending = cursor.fetchall()
+                for kind, table, rowid in (("post", "posts", "rowid"), ("comment", "comments", "id")):
+                    refs = [ref for pending_kind, ref in pending if pending_kind == kind]
+                    if not refs:
+                        continue
+                    placeholders = ", ".join("?" * len(refs))
                     cursor.execute(
-                        "UPDATE votes SET vote_type = 'upvote' WHERE post_id = ? AND username = ?",
-                        (post_id, username),
+                        f"INSERT INTO {table}_fts (rowid, content) SELECT {rowid}, {CONTENT_FUNCTION}(content) FROM {table} WHERE {rowid} IN ({placeholders})",
+                        refs,
                     )
                     cursor.execute(
-                        "UPDATE posts SET upvotes = upvotes + 1, downvotes = downvotes - 1 WHERE id = ?",
-                        (post_id,),
+                        f"DELETE FROM search_pending WHERE kind = ? AND ref IN ({placeholders})",
+                        [kind] + refs,
                     )
-                else:
-                    conn.close()
-                    return False
-            else:
-                # New upvote
-                cursor.execute(
-                    "INSERT INTO votes (post_id, username, vote_type) VALUES (?, ?, 'upvote')",
-                    (post_id, username),
-                )
-                cursor.execute(
-                    "UPDATE posts SET upvotes = upvotes + 1 WHERE id = ?", (post_id,)
-                )
-            # Update author popularity
-            cursor.execute("SELECT author FROM posts WHERE id = ?", (post_id,))
-            author = cursor.fetchone()
-            if author:
-                cursor.execute(
-                    "UPDATE users SET popularity = popularity + 1 WHERE username = ?",
-                    (author[0],),
-                )
-            conn.commit()
-            conn.close()
+                conn.commit()
+            return len(pending)
+        except sqlite3.Error as e:
+            logger.error(f"Database error in index_pending_search: {str(e)}")
+            return 0
+
+    def rebuild_search_index(self):
+        """Rebuild the full-text indexes from the posts and comments tables.
+
+        Posts are indexed by their implicit rowid, which VACUUM may renumber;
+        run this after a VACUUM or after editing the tables with triggers off.
+        """
+        try:
+            with self.pool.connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("DELETE FROM search_pending")
+                # Not FTS5's 'rebuild', which would index compressed content as stored
+                for table, rowid in (("posts", "rowid"), ("comments", "id")):
+                    conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('delete-all')")
+                    conn.execute(
+                        f"INSERT INTO {table}_fts (rowid, content) SELECT {rowid}, {CONTENT_FUNCTION}(content) FROM {table}"
+                    )
+                conn.commit()
             return True
         except sqlite3.Error as e:
-            logger.error(f"Database error in upvote_post: {str(e)}")
+            logger.error(f"Database error in rebuild_search_index: {str(e)}")
             return False
 
-    def downvote_post(self, post_id, username):
-        """Allow a user to downvote a post only once"""
+    def archive_old_posts(self, max_age_days, batch_size=ARCHIVE_BATCH_SIZE):
+        """Move posts older than max_age_days, with their comments and votes, to the archive files.
+
+        Archived posts leave the feed and can no longer be voted on, but
+        get_post_by_id, get_comments_for_post and search still find them.
+        Returns the number of posts moved.
+        """
+        if self.archives is None:
+            logger.error("archive_old_posts needs a Database opened with archive_dir")
+            return 0
+        cutoff = int(time.time()) - int(max_age_days * 86400)
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            # Check if user already voted
-            cursor.execute(
-                "SELECT vote_type FROM votes WHERE post_id = ? AND username = ?",
-                (post_id, username),
+            moved = archive_posts(self, self.archives.archive_dir, cutoff, batch_size)
+        except sqlite3.Error as e:
+            logger.error(f"Database error in archive_old_posts: {str(e)}")
+            # Earlier batches may have been moved before the error
+            self._changed("archive")
+            return 0
+        if moved:
+            self._changed("archive")
+        return moved
+
+    def backup(self, dest_path, pages=BACKUP_STEP_PAGES, pause=BACKUP_STEP_PAUSE):
+        """Copy the database to dest_path while it stays in use.
+
+        Copies pages pages per step with the sqlite3 backup API, pausing
+        between steps; see backup_connection. Returns BackupStats (with the
+        longest stall in longest_step), or None on error.
+        """
+        try:
+            with self.pool.connection() as conn:
+                stats = backup_connection(conn, dest_path, pages, pause)
+            logger.info(
+                f"Backed up {stats.pages} pages to {dest_path} in {stats.seconds:.2f}s "
+                f"({stats.steps} steps, longest {stats.longest_step * 1000:.1f} ms)"
             )
-            row = cursor.fetchone()
-            if row:
-                if row[0] == "downvote":
-                    conn.close()
-                    return False  # Already downvoted
-                elif row[0] == "upvote":
-                    # Change upvote to downvote
-                    cursor.execute(
-                        "UPDATE votes SET vote_type = 'downvote' WHERE post_id = ? AND username = ?",
-                        (post_id, username),
-                    )
-                    cursor.execute(
-                        "UPDATE posts SET downvotes = downvotes + 1, upvotes = upvotes - 1 WHERE id = ?",
-                        (post_id,),
-                    )
-                else:
-                    conn.close()
-                    return False
-            else:
-                # New downvote
-                cursor.execute(
-                    "INSERT INTO votes (post_id, username, vote_type) VALUES (?, ?, 'downvote')",
-                    (post_id, username),
-                )
+            return stats
+        except (sqlite3.Error, OSError) as e:
+            logger.error(f"Database error in backup: {str(e)}")
+            return None
+
+    def snapshot(self, snapshot_dir, keep=SNAPSHOT_KEEP):
+        """Back up to a timestamped file in snapshot_dir and delete all but the keep newest.
+
+        Returns BackupStats, or None on error.
+        """
+        try:
+            os.makedirs(snapshot_dir, exist_ok=True)
+        except OSError as e:
+            logger.error(f"Could not create snapshot directory: {str(e)}")
+            return None
+        stats = self.backup(snapshot_path(snapshot_dir))
+        if stats is not None:
+            try:
+                prune_snapshots(snapshot_dir, keep)
+            except OSError as e:
+                logger.error(f"Could not prune snapshots: {str(e)}")
+        return stats
+
+    def update_post(self, post_id, new_content):
+        """Update the content of an existing post"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
                 cursor.execute(
-                    "UPDATE posts SET downvotes = downvotes + 1 WHERE id = ?", (post_id,),
+                    "UPDATE posts SET content = ? WHERE id = ?",
+                    (compress_content(new_content, self.compress_threshold), post_id),
                 )
-            conn.commit()
-            conn.close()
-            return True
+                conn.commit()
+                success = cursor.rowcount > 0
+            if success:
+                self._changed("edit", post_id)
+            return success
         except sqlite3.Error as e:
-            logger.error(f"Database error in downvote_post: {str(e)}")
+            logger.error(f"Database error in update_post: {str(e)}")
             return False
 
-    def mark_spam_column(self):
-        """Ensure the posts table has a 'spam' column for decentralized spam marking."""
+    def _record_vote(self, cursor, post_id, username, vote_type):
+        """Write step for vote"""
+        cursor.execute(
+            """
+            INSERT INTO votes (post_id, username, vote_type)
+            SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM posts WHERE id = ?)
+            ON CONFLICT (post_id, username) DO UPDATE
+            SET vote_type = excluded.vote_type WHERE vote_type <> excluded.vote_type
+            RETURNING vote_type
+            """,
+            (post_id, username, vote_type, post_id),
+        )
+        if cursor.fetchone() is None:
+            return None
+        # RETURNING is evaluated before the triggers run, so read the
+        # counters they produced
+        cursor.execute("SELECT upvotes, downvotes, spam FROM posts WHERE id = ?", (post_id,))
+        upvotes, downvotes, spam = cursor.fetchone()
+        return {"upvotes": upvotes, "downvotes": downvotes, "spam": spam}
+
+    def vote(self, post_id, username, vote_type):
+        """Record a user's vote on a post, one vote per user per post.
+
+        vote_type is "upvote" or "downvote"; voting the other way replaces the
+        earlier vote. Returns {"upvotes", "downvotes", "spam"} for the post
+        after the vote, or None if the post does not exist, the user already
+        voted this way, or an error occurred.
+
+        The vote is a single UPSERT inside a BEGIN IMMEDIATE transaction. The
+        vote triggers adjust the post counters, the author's popularity and
+        the spam flag in the same statement, so concurrent votes queue on the
+        write lock instead of racing read-then-write.
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("ALTER TABLE posts ADD COLUMN spam INTEGER DEFAULT 0")
-            conn.commit()
-            conn.close()
-        except sqlite3.OperationalError as e:
-            # Column already exists
-            if "duplicate column name" not in str(e):
-                logger.error(f"Error adding spam column: {str(e)}")
+            counts = self._write(self._record_vote, post_id, username, vote_type)
+        except sqlite3.Error as e:
+            logger.error(f"Database error in vote: {str(e)}")
+            return None
+        if counts is not None:
+            self._changed("vote", post_id)
+        return counts
+
+    def vote_async(self, post_id, username, vote_type):
+        """Like vote, but return a Future for the new counts"""
+        return self._report_when_done(
+            self._write_async(self._record_vote, post_id, username, vote_type), "vote", post_id
+        )
+
+    def get_data_version(self):
+        """Return (version, changed_at) of the posts and comments data, or None on error.
+
+        version goes up with every write to posts or comments (votes and
+        new comments included); changed_at is the Unix time of the last one.
+        """
+        try:
+            with self.pool.connection() as conn:
+                row = conn.execute("SELECT version, changed_at FROM data_version WHERE id = 1").fetchone()
+            return tuple(row) if row else None
+        except sqlite3.Error as e:
+            logger.error(f"Database error in get_data_version: {str(e)}")
+            return None
+
+    def get_meta(self, key, default=None):
+        """Read a value from the meta key/value table"""
+        try:
+            with self.pool.connection() as conn:
+                row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else default
+        except sqlite3.Error as e:
+            logger.error(f"Database error in get_meta: {str(e)}")
+            return default
+
+    def set_meta(self, key, value):
+        """Write a value to the meta key/value table"""
+        try:
+            with self.pool.connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+                )
+                conn.commit()
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Database error in set_meta: {str(e)}")
+            return False
 
     def remove_spam_posts(self, blacklist=None):
-        """Mark posts as spam (decentralized): more downvotes than upvotes, or containing blacklisted words."""
-        self.mark_spam_column()
+        """Full re-scan marking posts as spam (decentralized): more downvotes than upvotes, or containing blacklisted words.
+
+        blacklist may be a BlacklistMatcher or a list of words. Content is
+        matched in Python with one pass per post, however long the list is.
+        Votes keep the downvote rule up to date per post through the
+        posts_flag_downvoted_spam trigger, so this only needs to run when the
+        blacklist changes (see rescan_spam_if_blacklist_changed).
+        """
+        if blacklist is not None and not isinstance(blacklist, BlacklistMatcher):
+            blacklist = BlacklistMatcher(blacklist)
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            # Mark posts with more downvotes than upvotes as spam
-            cursor.execute("UPDATE posts SET spam = 1 WHERE downvotes > upvotes")
-            # Mark posts containing blacklisted words as spam
-            if blacklist:
-                for word in blacklist:
-                    cursor.execute(
-                        "UPDATE posts SET spam = 1 WHERE content LIKE ?", (f"%{word}%",)
-                    )
-            conn.commit()
-            conn.close()
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                # Mark posts with more downvotes than upvotes as spam
+                cursor.execute(
+                    "UPDATE posts SET spam = 1 WHERE downvotes > upvotes AND spam = 0"
+                )
+                conn.commit()
+                flagged = cursor.rowcount
+
+                # Mark posts containing blacklisted words as spam. The read runs
+                # outside the write transaction so WAL writers are not blocked.
+                if blacklist:
+                    cursor.execute("SELECT rowid, content FROM posts WHERE spam = 0")
+                    matched = [
+                        rowid for rowid, content in cursor if blacklist.search(decompress_content(content))
+                    ]
+                    for start in range(0, len(matched), SPAM_UPDATE_BATCH_SIZE):
+                        cursor.executemany(
+                            "UPDATE posts SET spam = 1 WHERE rowid = ?",
+                            ((rowid,) for rowid in matched[start:start + SPAM_UPDATE_BATCH_SIZE]),
+                        )
+                        conn.commit()
+                    flagged += len(matched)
+            if flagged:
+                self._changed("spam")
             return True
         except sqlite3.Error as e:
             logger.error(f"Database error in remove_spam_posts: {str(e)}")
             return False
 
+    def rescan_spam_if_blacklist_changed(self, blacklist):
+        """Run the full spam re-scan only if the blacklist differs from the last scanned one.
+
+        Returns True if a re-scan ran.
+        """
+        if not isinstance(blacklist, BlacklistMatcher):
+            blacklist = BlacklistMatcher(blacklist or ())
+        fingerprint = hashlib.sha256("\n".join(blacklist.words).encode("utf-8")).hexdigest()
+        if self.get_meta("spam_blacklist_fingerprint") == fingerprint:
+            return False
+        logger.info(f"Blacklist changed ({len(blacklist)} words), re-scanning posts for spam")
+        if not self.remove_spam_posts(blacklist):
+            return False
+        self.set_meta("spam_blacklist_fingerprint", fingerprint)
+        return True
+
 
 if __name__ == "__main__":
     import argparse
@@ -571,11 +968,52 @@ if __name__ == "__main__":
     parser.add_argument(
         "--reset", action="store_true", help="Backup and reinitialize the database"
     )
+    parser.add_argument(
+        "--import-legacy",
+        action="store_true",
+        help="Import users.json, servers.json and posts/*.rssx into the database (once)",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="With --import-legacy, import again even if done before"
+    )
+    parser.add_argument(
+        "--archive",
+        type=float,
+        metavar="DAYS",
+        help="Move posts older than DAYS days into the archive/ directory",
+    )
+    parser.add_argument(
+        "--backup", metavar="PATH", help="Copy the database to PATH; safe while the server runs"
+    )
+    parser.add_argument(
+        "--snapshot",
+        action="store_true",
+        help="Back up to a timestamped file in db_backups/, keeping the --keep newest",
+    )
+    parser.add_argument(
+        "--keep", type=int, default=SNAPSHOT_KEEP, help="Snapshots to keep (default %(default)s)"
+    )
+    parser.add_argument(
+        "--restore",
+        metavar="PATH",
+        help="Replace the database with the backup at PATH; stop the server first",
+    )
     args = parser.parse_args()
 
     db_file = "rssx.db"
     backup_dir = "db_backups"
 
+    def report_backup(stats):
+        if stats is None:
+            raise SystemExit("Backup failed, see the log for details.")
+        print(
+            f"Backed up {stats.pages} pages to {stats.path} in {stats.seconds:.2f}s "
+            f"({stats.steps} steps, longest stall {stats.longest_step * 1000:.1f} ms)"
+        )
+
+    if args.restore:
+        restore_database(args.restore, db_file, report=print)
+
     if args.reset:
         if os.path.exists(db_file):
             # Create backup directory if it doesn't exist
@@ -590,14 +1028,38 @@ if __name__ == "__main__":
             backup_filename = f"rssx_{timestamp}_{timezone_abbr}.db"
             backup_path = os.path.join(backup_dir, backup_filename)
 
-            os.rename(db_file, backup_path)
+            # Back up through SQLite so anything still in the WAL is kept
+            db = Database(db_file)
+            stats = db.backup(backup_path)
+            db.close()
+            report_backup(stats)
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(db_file + suffix):
+                    os.remove(db_file + suffix)
             print(f"Existing database backed up as {backup_path}")
         else:
             print("No existing database found. Creating a fresh database.")
 
+    if args.backup or args.snapshot:
+        db = Database(db_file)
+        if args.backup:
+            report_backup(db.backup(args.backup))
+        if args.snapshot:
+            report_backup(db.snapshot(backup_dir, args.keep))
+        db.close()
+
     # Initialize the new (or reset) DB
-    if args.init or args.reset:
-        db = Database()
+    if args.init or args.reset or args.import_legacy or args.archive is not None:
+        db = Database(archive_dir="archive")
         print("Database initialized.")
-    else:
-        print("Use --init to initialize or --reset to backup and reset the database.")
+        if args.import_legacy:
+            import_legacy_data(db, force=args.force, report=print)
+        if args.archive is not None:
+            print(f"Archived {db.archive_old_posts(args.archive)} posts.")
+        db.close()
+    elif not (args.backup or args.snapshot or args.restore):
+        print(
+            "Use --init to initialize, --reset to backup and reset the database, "
+            "--import-legacy to import legacy data files, --archive DAYS to archive old posts, "
+            "--backup PATH or --snapshot to back up, or --restore PATH to restore a backup."
+        )
@@ -0,0 +1,102 @@
+import os
+import time
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Snowflake-style IDs that fit in 53 bits, so they survive a round trip
+# through JSON numbers in the browser:
+#
+#   41 bits  milliseconds since ID_EPOCH_MS (good until ~2093)
+#    5 bits  node ID (per process; RSSX_NODE_ID / NODE_ID to pin it)
+#    7 bits  per-millisecond sequence (128 IDs per ms per node)
+#
+# IDs from one generator are strictly increasing; IDs from different nodes
+# are ordered by millisecond. Post IDs are zero-padded to ID_WIDTH digits so
+# they also sort correctly as text.
+ID_EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+NODE_BITS = 5
+SEQUENCE_BITS = 7
+MAX_NODE_ID = (1 << NODE_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+ID_WIDTH = 16
+
+
+class IdGenerator:
+    def __init__(self, node_id=None):
+        """Create a generator; node_id defaults to RSSX_NODE_ID or one derived from the PID"""
+        self._lock = threading.Lock()
+        self._pinned = node_id is not None or "RSSX_NODE_ID" in os.environ
+        self.node_id = self._resolve_node_id(node_id)
+        self._last_ms = 0
+        self._sequence = 0
+
+    @property
+    def pinned(self):
+        """False while the node ID is derived from the PID, which other processes can share"""
+        return self._pinned
+
+    @staticmethod
+    def _resolve_node_id(node_id):
+        if node_id is None:
+            node_id = os.environ.get("RSSX_NODE_ID", os.getpid())
+        node_id = int(node_id)
+        return node_id & MAX_NODE_ID
+
+    def set_node_id(self, node_id):
+        """Pin the node ID, e.g. from configuration, so it survives forks"""
+        with self._lock:
+            self._pinned = True
+            self.node_id = self._resolve_node_id(node_id)
+
+    def _after_fork(self):
+        """Give a forked worker process its own node ID and fresh state"""
+        self._lock = threading.Lock()
+        if not self._pinned:
+            self.node_id = self._resolve_node_id(None)
+        self._last_ms = 0
+        self._sequence = 0
+
+    def next_id(self):
+        """Return the next unique, time-ordered integer ID"""
+        with self._lock:
+            now = int(time.time() * 1000) - ID_EPOCH_MS
+            if now < self._last_ms:
+                # Clock stepped backwards: keep counting from the last value
+                now = self._last_ms
+            if now == self._last_ms:
+                self._sequence = (self._sequence + 1) & MAX_SEQUENCE
+                if self._sequence == 0:
+                    # Sequence exhausted for this millisecond; borrow the next one
+                    now = self._last_ms + 1
+            else:
+                self._sequence = 0
+            self._last_ms = now
+            return (now << (NODE_BITS + SEQUENCE_BITS)) | (self.node_id << SEQUENCE_BITS) | self._sequence
+
+
+_generator = IdGenerator()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_generator._after_fork)
+
+
+def set_node_id(node_id):
+    """Pin the node ID used by this process"""
+    _generator.set_node_id(node_id)
+
+
+def node_id():
+    """Return this process's (node ID, pinned); see IdGenerator.pinned"""
+    return _generator.node_id, _generator.pinned
+
+
+def next_id():
+    """Return the next integer ID (used for comments)"""
+    return _generator.next_id()
+
+
+def next_post_id():
+    """Return the next post ID as zero-padded text that sorts in creation order"""
+    return f"{_generator.next_id():0{ID_WIDTH}d}"
+
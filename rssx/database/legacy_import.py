@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import logging
+
+from rssx.database.ids import next_post_id
+
+logger = logging.getLogger(__name__)
+
+# meta key recording when the legacy import finished and what it loaded
+LEGACY_IMPORT_KEY = "legacy_import"
+IMPORT_CHUNK_SIZE = 1000
+PROGRESS_INTERVAL = 2.0  # seconds between progress reports
+
+
+def legacy_data_present(users_file="users.json", servers_file="servers.json", posts_dir="posts"):
+    """Return True if any pre-database data files exist"""
+    return (
+        os.path.exists(users_file)
+        or os.path.exists(servers_file)
+        or os.path.isdir(posts_dir)
+    )
+
+
+def _user_rows(path):
+    # users.json is a single JSON object, so it has to be parsed whole; it
+    # holds one short entry per account.
+    with open(path, "r") as f:
+        users = json.load(f)
+    now = int(time.time())
+    for username, password in users.items():
+        # If password is a list or dict, serialize to JSON string
+        if isinstance(password, (list, dict)):
+            password = json.dumps(password)
+        yield username, password, now
+
+
+def _server_rows(path):
+    with open(path, "r") as f:
+        servers = json.load(f)
+    now = int(time.time())
+    for server_url in servers:
+        yield server_url, now
+
+
+def _parse_post_file(path):
+    """Read "Key: value" lines from one .rssx file, one line at a time"""
+    post_data = {}
+    with open(path, "r") as f:
+        for line in f:
+            if ": " in line:
+                key, value = line.split(": ", 1)
+                post_data[key.strip()] = value.strip()
+    return post_data
+
+
+def _post_rows(posts_dir):
+    with os.scandir(posts_dir) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".rssx") or not entry.is_file():
+                continue
+            try:
+                post_data = _parse_post_file(entry.path)
+            except (OSError, UnicodeError) as e:
+                logger.error(f"Skipping unreadable post file {entry.path}: {str(e)}")
+                continue
+            yield (
+                post_data.get("ID") or next_post_id(),
+                post_data.get("Author", "unknown"),
+                post_data.get("Content", ""),
+                post_data.get("Timestamp", str(int(time.time()))),
+                post_data.get("Signature", ""),
+            )
+
+
+def _import_rows(db, label, sql, rows, chunk_size, report):
+    """Insert rows with executemany, one transaction per chunk; return (read, inserted)"""
+    read = inserted = 0
+    start = last_report = time.perf_counter()
+    with db.pool.connection() as conn:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) < chunk_size:
+                continue
+            inserted += _insert_chunk(conn, sql, chunk)
+            read += len(chunk)
+            chunk = []
+            now = time.perf_counter()
+            if now - last_report >= PROGRESS_INTERVAL:
+                report(f"{label}: {read} read, {inserted} new ({read / (now - start):.0f} rows/s)")
+                last_report = now
+        if chunk:
+            inserted += _insert_chunk(conn, sql, chunk)
+            read += len(chunk)
+    elapsed = time.perf_counter() - start
+    rate = read / elapsed if elapsed > 0 else 0
+    report(f"{label}: {read} read, {inserted} new in {elapsed:.1f} s ({rate:.0f} rows/s)")
+    return read, inserted
+
+
+def _insert_chunk(conn, sql, chunk):
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    cursor.executemany(sql, chunk)
+    conn.commit()
+    return cursor.rowcount
+
+
+def import_legacy_data(db, users_file="users.json", servers_file="servers.json",
+                       posts_dir="posts", chunk_size=IMPORT_CHUNK_SIZE, force=False,
+                       report=logger.info):
+    """Import users.json, servers.json and posts/*.rssx into db once.
+
+    Files are streamed and inserted with executemany in transactions of
+    chunk_size rows, calling report(message) with progress and rows per
+    second. Existing rows are kept (INSERT OR IGNORE). Completion is recorded
+    in the meta table, and later calls return None without reading anything
+    unless force is set. Returns {"users", "servers", "posts"} with the number
+    of new rows for each.
+    """
+    done = db.get_meta(LEGACY_IMPORT_KEY)
+    if done and not force:
+        report(f"Legacy data already imported: {done}")
+        return None
+
+    totals = {}
+    sources = (
+        ("users", users_file, os.path.exists, _user_rows,
+         "INSERT OR IGNORE INTO users (username, password, created_at) VALUES (?, ?, ?)"),
+        ("servers", servers_file, os.path.exists, _server_rows,
+         "INSERT OR IGNORE INTO servers (url, last_sync) VALUES (?, ?)"),
+        ("posts", posts_dir, os.path.isdir, _post_rows,
+         "INSERT OR IGNORE INTO posts (id, author, content, timestamp, signature) VALUES (?, ?, ?, ?, ?)"),
+    )
+    for label, path, exists, rows, sql in sources:
+        totals[label] = 0
+        if not exists(path):
+            continue
+        _, totals[label] = _import_rows(db, label, sql, rows(path), chunk_size, report)
+
+    db.set_meta(LEGACY_IMPORT_KEY, json.dumps(dict(totals, completed_at=int(time.time()))))
+    return totals
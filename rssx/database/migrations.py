@@ -0,0 +1,500 @@
+import time
+import logging
+
+from rssx.database.compression import CONTENT_FUNCTION
+
+logger = logging.getLogger(__name__)
+
+
+def _column_names(conn, table):
+    """Return the set of column names defined on a table"""
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _add_column(conn, table, column, definition):
+    """Add a column unless an older release already created it"""
+    if column not in _column_names(conn, table):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _base_schema(conn):
+    """Tables that existed before migrations were tracked"""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY,
+            password TEXT NOT NULL,
+            created_at INTEGER NOT NULL,
+            last_login INTEGER,
+            popularity INTEGER DEFAULT 0
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS posts (
+            id TEXT PRIMARY KEY,
+            author TEXT NOT NULL,
+            content TEXT NOT NULL,
+            timestamp INTEGER NOT NULL,
+            signature TEXT NOT NULL,
+            upvotes INTEGER DEFAULT 0,
+            downvotes INTEGER DEFAULT 0,
+            spam INTEGER DEFAULT 0
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS servers (
+            url TEXT PRIMARY KEY,
+            last_sync INTEGER
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS votes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            post_id TEXT NOT NULL,
+            username TEXT NOT NULL,
+            vote_type TEXT NOT NULL CHECK(vote_type IN ('upvote', 'downvote')),
+            UNIQUE(post_id, username)
+        )
+        """
+    )
+
+
+def _federation_and_comments(conn):
+    """federated_from on posts, the comments table, and the spam flag"""
+    _add_column(conn, "posts", "federated_from", "TEXT")
+    # Very old databases predate the spam column in the posts table definition
+    _add_column(conn, "posts", "spam", "INTEGER DEFAULT 0")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS comments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            author TEXT NOT NULL,
+            timestamp INTEGER NOT NULL,
+            content TEXT NOT NULL,
+            post_id TEXT NOT NULL,
+            signature TEXT NOT NULL,
+            federated_from TEXT
+        )
+        """
+    )
+    _add_column(conn, "comments", "federated_from", "TEXT")
+
+
+def _feed_comment_vote_indexes(conn):
+    """Secondary indexes for the feed, comment and vote lookups"""
+    # The feed ranks posts by their author's popularity. Keeping a copy of it
+    # on posts lets a single index serve the whole ORDER BY instead of sorting
+    # a join on every feed load; the triggers keep the copy in step.
+    _add_column(conn, "posts", "author_popularity", "INTEGER NOT NULL DEFAULT 0")
+    conn.execute(
+        """
+        UPDATE posts SET author_popularity = COALESCE(
+            (SELECT popularity FROM users WHERE users.username = posts.author), 0
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS posts_author_popularity_on_insert
+        AFTER INSERT ON posts
+        WHEN EXISTS (
+            SELECT 1 FROM users WHERE username = NEW.author AND popularity <> 0
+        )
+        BEGIN
+            UPDATE posts SET author_popularity = (
+                SELECT popularity FROM users WHERE username = NEW.author
+            ) WHERE id = NEW.id;
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS users_popularity_on_insert
+        AFTER INSERT ON users
+        BEGIN
+            UPDATE posts SET author_popularity = COALESCE(NEW.popularity, 0)
+            WHERE author = NEW.username;
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS users_popularity_on_update
+        AFTER UPDATE OF popularity ON users
+        WHEN NEW.popularity IS NOT OLD.popularity
+        BEGIN
+            UPDATE posts SET author_popularity = COALESCE(NEW.popularity, 0)
+            WHERE author = NEW.username;
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_posts_feed
+        ON posts (author_popularity DESC, upvotes DESC, timestamp DESC, id DESC)
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_author ON posts (author)")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_comments_post_timestamp ON comments (post_id, timestamp)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_votes_username ON votes (username)")
+
+
+def _incremental_spam(conn):
+    """Flag vote-based spam per post as counters change, plus a key/value meta table"""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+        """
+    )
+    # Spam flags are sticky: once a post has had more downvotes than upvotes
+    # it stays flagged, matching the old full-table UPDATE.
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS posts_flag_downvoted_spam
+        AFTER UPDATE OF upvotes, downvotes ON posts
+        WHEN NEW.downvotes > NEW.upvotes AND COALESCE(NEW.spam, 0) = 0
+        BEGIN
+            UPDATE posts SET spam = 1 WHERE id = NEW.id;
+        END
+        """
+    )
+    conn.execute(
+        "UPDATE posts SET spam = 1 WHERE downvotes > upvotes AND COALESCE(spam, 0) = 0"
+    )
+
+
+def _full_text_search(conn):
+    """FTS5 indexes over post and comment content, filled from a pending queue"""
+    # External-content tables: the index stores only tokens and reads the text
+    # back from posts/comments, so content is not stored twice.
+    #
+    # Adding a row to an FTS5 index inside every save costs more than the save
+    # itself, so inserts only queue the row in search_pending and
+    # Database.index_pending_search adds queued rows to the index in batches.
+    # Edits and deletes of rows that are already indexed remove the old tokens
+    # straight away, since only then is the old content still at hand.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS search_pending (
+            kind TEXT NOT NULL,
+            ref INTEGER NOT NULL,
+            PRIMARY KEY (kind, ref)
+        ) WITHOUT ROWID
+        """
+    )
+    for kind, table, rowid in (("post", "posts", "rowid"), ("comment", "comments", "id")):
+        conn.execute(
+            f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5(
+                content,
+                content='{table}',
+                content_rowid='{rowid}',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+            """
+        )
+        pending = f"SELECT 1 FROM search_pending WHERE kind = '{kind}' AND ref = OLD.{rowid}"
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT ON {table}
+            BEGIN
+                INSERT OR IGNORE INTO search_pending (kind, ref) VALUES ('{kind}', NEW.{rowid});
+            END
+            """
+        )
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_search_update AFTER UPDATE OF content ON {table}
+            WHEN NOT EXISTS ({pending})
+            BEGIN
+                INSERT INTO {table}_fts ({table}_fts, rowid, content)
+                VALUES ('delete', OLD.{rowid}, OLD.content);
+                INSERT INTO search_pending (kind, ref) VALUES ('{kind}', NEW.{rowid});
+            END
+            """
+        )
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_search_delete AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO {table}_fts ({table}_fts, rowid, content)
+                SELECT 'delete', OLD.{rowid}, OLD.content WHERE NOT EXISTS ({pending});
+                DELETE FROM search_pending WHERE kind = '{kind}' AND ref = OLD.{rowid};
+            END
+            """
+        )
+        conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+
+
+def _vote_counter_triggers(conn):
+    """Keep post vote counters and author popularity in step with the votes table"""
+    # A vote is then a single UPSERT on votes; these triggers apply the
+    # counter and popularity changes inside the same statement. As before,
+    # every new upvote (or downvote turned upvote) adds one to the author's
+    # popularity, and downvotes leave it alone.
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS votes_counts_on_insert
+        AFTER INSERT ON votes
+        BEGIN
+            UPDATE posts SET
+                upvotes = upvotes + (NEW.vote_type = 'upvote'),
+                downvotes = downvotes + (NEW.vote_type = 'downvote')
+            WHERE id = NEW.post_id;
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS votes_counts_on_update
+        AFTER UPDATE OF vote_type ON votes
+        WHEN NEW.vote_type <> OLD.vote_type
+        BEGIN
+            UPDATE posts SET
+                upvotes = upvotes + (NEW.vote_type = 'upvote') - (OLD.vote_type = 'upvote'),
+                downvotes = downvotes + (NEW.vote_type = 'downvote') - (OLD.vote_type = 'downvote')
+            WHERE id = NEW.post_id;
+        END
+        """
+    )
+    for name, event, condition in (
+        ("insert", "INSERT", "NEW.vote_type = 'upvote'"),
+        ("update", "UPDATE OF vote_type", "NEW.vote_type = 'upvote' AND OLD.vote_type <> 'upvote'"),
+    ):
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS votes_popularity_on_{name}
+            AFTER {event} ON votes
+            WHEN {condition}
+            BEGIN
+                UPDATE users SET popularity = popularity + 1
+                WHERE username = (SELECT author FROM posts WHERE id = NEW.post_id);
+            END
+            """
+        )
+
+
+def _post_timestamp_index(conn):
+    """Index posts by age so the archiver can find old posts without a full scan"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_timestamp ON posts (timestamp)")
+
+
+def _comment_activity(conn):
+    """Per-post comment count and last activity time, kept up to date by triggers"""
+    # Stored on posts so the feed can show "N comments" and sort by recent
+    # activity without reading the comments table. last_activity_at is the
+    # time of the post or of its newest comment, whichever is later.
+    _add_column(conn, "posts", "comment_count", "INTEGER NOT NULL DEFAULT 0")
+    _add_column(conn, "posts", "last_activity_at", "INTEGER NOT NULL DEFAULT 0")
+    conn.execute(
+        """
+        UPDATE posts SET
+            comment_count = (SELECT COUNT(*) FROM comments WHERE post_id = posts.id),
+            last_activity_at = MAX(
+                timestamp,
+                COALESCE((SELECT MAX(timestamp) FROM comments WHERE post_id = posts.id), 0)
+            )
+        """
+    )
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_posts_activity
+        ON posts (last_activity_at DESC, id DESC)
+        """
+    )
+    # Database.save_post sets last_activity_at itself; this catches any
+    # other insert that leaves it out
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS posts_activity_on_insert
+        AFTER INSERT ON posts
+        WHEN NEW.last_activity_at = 0
+        BEGIN
+            UPDATE posts SET last_activity_at = NEW.timestamp WHERE rowid = NEW.rowid;
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS comments_activity_on_insert
+        AFTER INSERT ON comments
+        BEGIN
+            UPDATE posts SET
+                comment_count = comment_count + 1,
+                last_activity_at = MAX(last_activity_at, NEW.timestamp)
+            WHERE id = NEW.post_id;
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS comments_activity_on_delete
+        AFTER DELETE ON comments
+        BEGIN
+            UPDATE posts SET comment_count = comment_count - 1 WHERE id = OLD.post_id;
+        END
+        """
+    )
+
+
+def _decompressing_search_triggers(conn):
+    """Let the search triggers remove the tokens of compressed content"""
+    # Content may now be stored zlib-compressed (rssx/database/compression.py).
+    # The FTS5 'delete' command must be given the text that was indexed, so
+    # the update and delete triggers decompress OLD.content first.
+    for kind, table, rowid in (("post", "posts", "rowid"), ("comment", "comments", "id")):
+        pending = f"SELECT 1 FROM search_pending WHERE kind = '{kind}' AND ref = OLD.{rowid}"
+        conn.execute(f"DROP TRIGGER IF EXISTS {table}_search_update")
+        conn.execute(f"DROP TRIGGER IF EXISTS {table}_search_delete")
+        conn.execute(
+            f"""
+            CREATE TRIGGER {table}_search_update AFTER UPDATE OF content ON {table}
+            WHEN NOT EXISTS ({pending})
+            BEGIN
+                INSERT INTO {table}_fts ({table}_fts, rowid, content)
+                VALUES ('delete', OLD.{rowid}, {CONTENT_FUNCTION}(OLD.content));
+                INSERT INTO search_pending (kind, ref) VALUES ('{kind}', NEW.{rowid});
+            END
+            """
+        )
+        conn.execute(
+            f"""
+            CREATE TRIGGER {table}_search_delete AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO {table}_fts ({table}_fts, rowid, content)
+                SELECT 'delete', OLD.{rowid}, {CONTENT_FUNCTION}(OLD.content) WHERE NOT EXISTS ({pending});
+                DELETE FROM search_pending WHERE kind = '{kind}' AND ref = OLD.{rowid};
+            END
+            """
+        )
+
+
+def _data_version(conn):
+    """A counter bumped by every change to posts or comments, for HTTP validators"""
+    # Votes and new comments reach posts through the counter and activity
+    # triggers, so these triggers see them too. The row is one primary-key
+    # lookup, so a client whose ETag is current costs no feed query.
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL,
+            changed_at INTEGER NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        "INSERT OR IGNORE INTO data_version (id, version, changed_at) VALUES (1, 1, ?)",
+        (int(time.time()),),
+    )
+    # Updates count only for the columns responses show; author_popularity
+    # is rewritten on all of an author's posts for every upvote they get, and
+    # that upvote already bumps the version through the voted post's counter.
+    updated = {"posts": "content, upvotes, downvotes, spam, comment_count, last_activity_at", "comments": "content"}
+    for table in ("posts", "comments"):
+        for name, event in (("insert", "INSERT"), ("update", f"UPDATE OF {updated[table]}"), ("delete", "DELETE")):
+            conn.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_data_version_on_{name}
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE data_version SET
+                        version = version + 1,
+                        changed_at = CAST(strftime('%s', 'now') AS INTEGER)
+                    WHERE id = 1;
+                END
+                """
+            )
+
+
+def _user_data_version(conn):
+    """Bump the data version when saving a user rewrites their posts' ranking"""
+    # save_user's INSERT OR REPLACE recreates the users row with popularity 0,
+    # and users_popularity_on_insert copies that onto all the author's posts.
+    # author_popularity is left out of the posts update trigger, so the
+    # version has to move here; registering a user with no posts changes no
+    # feed and leaves it alone.
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS users_data_version_on_insert
+        AFTER INSERT ON users
+        WHEN EXISTS (SELECT 1 FROM posts WHERE author = NEW.username)
+        BEGIN
+            UPDATE data_version SET
+                version = version + 1,
+                changed_at = CAST(strftime('%s', 'now') AS INTEGER)
+            WHERE id = 1;
+        END
+        """
+    )
+
+
+# Ordered list of (version, name, function). Append new migrations at the end
+# and never renumber or edit one that has shipped.
+MIGRATIONS = [
+    (1, "base schema", _base_schema),
+    (2, "federation columns, comments table and spam flag", _federation_and_comments),
+    (3, "feed, comment and vote indexes", _feed_comment_vote_indexes),
+    (4, "incremental spam flagging and meta table", _incremental_spam),
+    (5, "full-text search over posts and comments", _full_text_search),
+    (6, "vote counter and popularity triggers", _vote_counter_triggers),
+    (7, "post timestamp index for archiving", _post_timestamp_index),
+    (8, "comment count and last activity on posts", _comment_activity),
+    (9, "search triggers read compressed content", _decompressing_search_triggers),
+    (10, "data version counter", _data_version),
+    (11, "data version follows saved users", _user_data_version),
+]
+
+
+def current_version(conn):
+    """Return the highest applied migration version, or 0 for a new database"""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at INTEGER NOT NULL
+        )
+        """
+    )
+    row = conn.execute("SELECT MAX(version) FROM schema_migrations").fetchone()
+    return row[0] or 0
+
+
+def apply_migrations(conn):
+    """Apply every pending migration, each in its own write transaction"""
+    applied = []
+    for version, name, migrate in MIGRATIONS:
+        if version <= current_version(conn):
+            continue
+        # BEGIN IMMEDIATE takes the write lock up front, so when several
+        # processes start at once only one of them runs each migration.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if version <= current_version(conn):
+                conn.rollback()
+                continue
+            migrate(conn)
+            conn.execute(
+                "INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+                (version, name, int(time.time())),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.error(f"Migration {version} ({name}) failed")
+            raise
+        logger.info(f"Applied migration {version}: {name}")
+        applied.append(version)
+    return applied
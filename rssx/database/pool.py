@@ -0,0 +1,114 @@
+import sqlite3
+import queue
+import threading
+import logging
+from contextlib import contextmanager
+
+from rssx.database.compression import register_functions
+
+logger = logging.getLogger(__name__)
+
+# Pragmas applied to every pooled connection. journal_mode=WAL is persistent
+# in the database file; the rest are per-connection settings.
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,  # negative means KiB, so ~16 MB per connection
+    "mmap_size": 268435456,  # 256 MB
+    "temp_store": "MEMORY",
+}
+
+
+def configure_connection(conn, busy_timeout, pragmas):
+    """Apply the busy timeout, pragmas and SQL functions every pooled connection gets"""
+    conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout * 1000)}")
+    for name, value in pragmas.items():
+        try:
+            conn.execute(f"PRAGMA {name} = {value}")
+        except sqlite3.Error as e:
+            logger.warning(f"Could not apply PRAGMA {name}={value}: {str(e)}")
+    register_functions(conn)
+
+
+class ConnectionPool:
+    def __init__(self, db_path, size=8, busy_timeout=5.0, pragmas=None):
+        """Create a pool of long-lived SQLite connections for db_path"""
+        self.db_path = db_path
+        # An in-memory database only exists for the connection that created it,
+        # so every caller has to share that single connection.
+        self.size = 1 if db_path == ":memory:" else max(1, size)
+        self.busy_timeout = busy_timeout
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self._idle = queue.LifoQueue()
+        self._all = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._trace_callback = None
+
+    def _create_connection(self):
+        """Open a new connection and apply the configured pragmas"""
+        conn = sqlite3.connect(
+            self.db_path, timeout=self.busy_timeout, check_same_thread=False
+        )
+        configure_connection(conn, self.busy_timeout, self.pragmas)
+        conn.set_trace_callback(self._trace_callback)
+        return conn
+
+    def _checkout(self):
+        """Take an idle connection, opening a new one while under the size limit"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Connection pool is closed")
+            if len(self._all) < self.size:
+                conn = self._create_connection()
+                self._all.append(conn)
+                return conn
+        try:
+            return self._idle.get(timeout=self.busy_timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"Timed out waiting for a database connection ({self.size} in use)"
+            )
+
+    def _checkin(self, conn):
+        """Return a connection to the pool, discarding any unfinished transaction"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error as e:
+            logger.error(f"Error resetting pooled connection: {str(e)}")
+        if self._closed:
+            conn.close()
+        else:
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with-block"""
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._checkin(conn)
+
+    def set_trace_callback(self, callback):
+        """Call callback(sql) for every statement run on any pooled connection"""
+        with self._lock:
+            self._trace_callback = callback
+            for conn in self._all:
+                conn.set_trace_callback(callback)
+
+    def close(self):
+        """Close every connection owned by the pool"""
+        with self._lock:
+            self._closed = True
+            connections, self._all = self._all, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
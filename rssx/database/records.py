@@ -0,0 +1,97 @@
+from collections import namedtuple
+
+from rssx.database.compression import decompress_content
+
+# Columns every post and comment record carries, in SELECT order
+POST_FIELDS = (
+    "id", "author", "content", "timestamp", "signature", "upvotes", "downvotes",
+    "spam", "federated_from", "comment_count", "last_activity_at",
+)
+COMMENT_FIELDS = ("id", "author", "timestamp", "content", "post_id", "signature", "federated_from")
+
+
+class _Record:
+    """Read-only row record backed by a tuple.
+
+    Records are built straight from the row tuple and hold about two thirds
+    of the memory of the dict(sqlite3.Row) they replace. Fields are attributes (post.author);
+    record["author"], record.get("author") and dict(record) also work, so
+    code written against dict rows keeps reading them unchanged. Anything
+    that needs extra keys (comments, formatted timestamps) builds its own
+    dict from to_dict() at the response boundary.
+
+    content is kept as stored and only decompressed when it is read, so
+    records that never reach a response cost no decompression.
+    """
+
+    __slots__ = ()
+    # Fields kept for internal use (e.g. keyset cursors) and left out of to_dict
+    PRIVATE_FIELDS = ()
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        """sqlite3 row_factory for rows selected with cls.SELECT"""
+        return tuple.__new__(cls, row)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        return tuple.__getitem__(self, key)
+
+    def __contains__(self, key):
+        return key in self._fields
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def keys(self):
+        return [field for field in self._fields if field not in self.PRIVATE_FIELDS]
+
+    def to_dict(self):
+        """Return the public fields as a new dict, ready for JSON"""
+        record = dict(zip(self._fields, self))
+        if "content" in record:
+            record["content"] = self.content
+        for field in self.PRIVATE_FIELDS:
+            del record[field]
+        return record
+
+
+def _stored_content(index):
+    """Property reading the content field at index, decompressing it if needed"""
+    return property(lambda self: decompress_content(tuple.__getitem__(self, index)))
+
+
+class Post(_Record, namedtuple("PostRow", POST_FIELDS + ("author_popularity",))):
+    """A row of the posts table"""
+
+    __slots__ = ()
+    PRIVATE_FIELDS = ("author_popularity",)
+    SELECT = ", ".join(POST_FIELDS + ("author_popularity",))
+    content = _stored_content(POST_FIELDS.index("content"))
+    archived = False
+
+
+class ArchivedPost(Post):
+    """A post read from an archive file; archives keep no author_popularity"""
+
+    __slots__ = ()
+    SELECT = ", ".join(POST_FIELDS + ("0",))
+    archived = True
+
+    def to_dict(self):
+        """Return the public fields as a new dict, with archived set"""
+        post = super().to_dict()
+        post["archived"] = True
+        return post
+
+
+class Comment(_Record, namedtuple("CommentRow", COMMENT_FIELDS)):
+    """A row of the comments table"""
+
+    __slots__ = ()
+    SELECT = ", ".join(COMMENT_FIELDS)
+    content = _stored_content(COMMENT_FIELDS.index("content"))
@@ -0,0 +1,113 @@
+import threading
+import logging
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import StaticPool
+
+from rssx.database.db import Database
+from rssx.database.pool import DEFAULT_PRAGMAS, configure_connection
+
+logger = logging.getLogger(__name__)
+
+# Prepared statements kept per connection by the sqlite3 driver
+STATEMENT_CACHE_SIZE = 256
+
+
+def create_sqlite_engine(url, pool_size=8, busy_timeout=5.0):
+    """Create a SQLAlchemy engine for a sqlite:// URL.
+
+    File databases get a QueuePool of pool_size connections. In-memory
+    databases exist only inside the connection that created them, so they
+    get a StaticPool that shares one connection.
+    """
+    url = make_url(url)
+    connect_args = {
+        "check_same_thread": False,
+        "timeout": busy_timeout,
+        "cached_statements": STATEMENT_CACHE_SIZE,
+    }
+    if url.database in (None, "", ":memory:"):
+        return create_engine(url, poolclass=StaticPool, connect_args=connect_args)
+    return create_engine(
+        url,
+        pool_size=pool_size,
+        max_overflow=0,
+        pool_timeout=busy_timeout,
+        connect_args=connect_args,
+    )
+
+
+class EnginePool:
+    """Lend sqlite3 connections from a SQLAlchemy engine's pool.
+
+    Offers the same connection(), set_trace_callback() and close() methods as
+    ConnectionPool, so Database runs unchanged on top of it. The engine's
+    pool rolls back any unfinished transaction when a connection is returned.
+    """
+
+    def __init__(self, engine, busy_timeout=5.0, pragmas=None):
+        """Wrap engine, which must use the sqlite dialect"""
+        if engine.dialect.name != "sqlite":
+            raise ValueError(
+                f"Unsupported database dialect {engine.dialect.name!r}: the RSSX schema needs SQLite"
+            )
+        self.engine = engine
+        self.db_path = engine.url.database or ":memory:"
+        self.busy_timeout = busy_timeout
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self._trace_callback = None
+        # A StaticPool hands the same connection to every caller, so callers
+        # have to take turns with it
+        self._shared = threading.Lock() if isinstance(engine.pool, StaticPool) else None
+        event.listen(engine, "connect", self._on_connect)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        """Set up each new connection exactly as ConnectionPool does, busy timeout included"""
+        configure_connection(dbapi_connection, self.busy_timeout, self.pragmas)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a sqlite3 connection for the duration of a with-block"""
+        if self._shared is not None:
+            self._shared.acquire()
+        try:
+            proxied = self.engine.raw_connection()
+            try:
+                conn = proxied.dbapi_connection
+                conn.set_trace_callback(self._trace_callback)
+                yield conn
+            finally:
+                proxied.close()
+        finally:
+            if self._shared is not None:
+                self._shared.release()
+
+    def set_trace_callback(self, callback):
+        """Call callback(sql) for every statement run on a borrowed connection"""
+        self._trace_callback = callback
+
+    def close(self):
+        """Close every pooled connection"""
+        self.engine.dispose()
+
+
+class SQLAlchemyDatabase(Database):
+    """Database whose connections come from a SQLAlchemy engine"""
+
+    def __init__(self, url="sqlite:///rssx.db", pool_size=8, busy_timeout=5.0,
+                 write_batch_size=0, write_batch_delay=0.0, engine=None, archive_dir=None,
+                 compress_threshold=0):
+        """Open a sqlite:// URL (or use engine) and apply migrations"""
+        if engine is None:
+            engine = create_sqlite_engine(url, pool_size, busy_timeout)
+        pool = EnginePool(engine, busy_timeout)
+        super().__init__(
+            pool.db_path,
+            write_batch_size=write_batch_size,
+            write_batch_delay=write_batch_delay,
+            pool=pool,
+            archive_dir=archive_dir,
+            compress_threshold=compress_threshold,
+        )
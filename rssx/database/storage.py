@@ -0,0 +1,132 @@
+from abc import ABC, abstractmethod
+
+from rssx.database.backup import SNAPSHOT_KEEP
+
+
+class Storage(ABC):
+    """The storage operations RSSXApi, WebUI and the background jobs rely on.
+
+    Database implements it on top of a pool of sqlite3 connections, and
+    SQLAlchemyDatabase on top of a SQLAlchemy engine's pool. Any backend
+    must pass tests/test_storage.py (add it to BACKENDS in tests/conftest.py).
+
+    Posts and comments come back as the read-only Post and Comment records
+    from rssx/database/records.py; callers build response dicts with
+    to_dict().
+    """
+
+    @abstractmethod
+    def close(self):
+        """Release every connection and background resource"""
+
+    # Users
+
+    @abstractmethod
+    def get_user(self, username):
+        """Return {"username", "password"} for a user, or None"""
+
+    @abstractmethod
+    def save_user(self, username, password):
+        """Create or replace a user; return True on success"""
+
+    @abstractmethod
+    def update_login_time(self, username):
+        """Record that a user just logged in; return True on success"""
+
+    # Posts
+
+    @abstractmethod
+    def save_post(self, post_data):
+        """Save a post dict and return its ID, or None on failure"""
+
+    @abstractmethod
+    def get_post_by_id(self, post_id):
+        """Return a Post, or None"""
+
+    @abstractmethod
+    def get_posts_page(self, limit=20, cursor=None, sort="ranked"):
+        """Return (posts, next_cursor) for one "ranked" or "activity" feed page; raise ValueError on bad input"""
+
+    @abstractmethod
+    def update_post(self, post_id, new_content):
+        """Replace a post's content; return True if the post exists"""
+
+    # Comments
+
+    @abstractmethod
+    def save_comment(self, comment_data):
+        """Save a comment dict and return its ID, or None on failure"""
+
+    @abstractmethod
+    def get_comments_for_post(self, post_id):
+        """Return a post's Comments, oldest first"""
+
+    @abstractmethod
+    def get_comments_for_posts(self, post_ids):
+        """Return {post_id: [Comment]} for many posts, each list oldest first"""
+
+    @abstractmethod
+    def get_comments_page(self, post_id, limit=20, cursor=None):
+        """Return (comments, next_cursor) for one page of a post's comments; raise ValueError on a bad cursor"""
+
+    @abstractmethod
+    def get_comment_previews(self, post_ids, per_post=3):
+        """Return {post_id: (first per_post comments, cursor for get_comments_page or None)}"""
+
+    # Votes
+
+    @abstractmethod
+    def vote(self, post_id, username, vote_type):
+        """Record an "upvote" or "downvote"; return the post's new counts, or None if nothing changed"""
+
+    def upvote_post(self, post_id, username):
+        """Allow a user to upvote a post only once; returns the new counts or None"""
+        return self.vote(post_id, username, "upvote")
+
+    def downvote_post(self, post_id, username):
+        """Allow a user to downvote a post only once; returns the new counts or None"""
+        return self.vote(post_id, username, "downvote")
+
+    # Servers
+
+    @abstractmethod
+    def get_all_servers(self):
+        """Return the URLs of every federated server"""
+
+    @abstractmethod
+    def add_server(self, server_url):
+        """Add a federated server; return True if it was new"""
+
+    # Search and maintenance
+
+    @abstractmethod
+    def search(self, text, limit=20, cursor=None):
+        """Return (results, next_cursor) for a full-text search; raise ValueError on bad input"""
+
+    @abstractmethod
+    def index_pending_search(self):
+        """Add a batch of newly saved rows to the search index; return how many"""
+
+    @abstractmethod
+    def rescan_spam_if_blacklist_changed(self, blacklist):
+        """Re-scan posts for spam if the blacklist changed; return True if it ran"""
+
+    @abstractmethod
+    def archive_old_posts(self, max_age_days):
+        """Move posts older than max_age_days out of the hot tables; return how many"""
+
+    @abstractmethod
+    def set_change_callback(self, callback):
+        """Call callback(event, post_id) after each committed change to what feeds show"""
+
+    @abstractmethod
+    def get_data_version(self):
+        """Return (version, changed_at), where version grows with every post or comment change; None on error"""
+
+    @abstractmethod
+    def backup(self, dest_path):
+        """Copy the database to dest_path while it stays in use; return BackupStats or None"""
+
+    @abstractmethod
+    def snapshot(self, snapshot_dir, keep=SNAPSHOT_KEEP):
+        """Back up to a new file in snapshot_dir, keeping the keep newest; return BackupStats or None"""
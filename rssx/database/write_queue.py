@@ -0,0 +1,109 @@
+import sqlite3
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# Sentinel that tells the writer thread to finish the queue and exit
+_STOP = object()
+
+
+class WriteQueue:
+    """Single writer thread that group-commits queued writes.
+
+    Each write is a function that takes a cursor and runs its statements;
+    submit() returns a Future for its result. The writer collects up to
+    max_batch writes, waiting at most max_delay seconds after the first one
+    for more to arrive (with 0 it takes whatever queued up while the previous
+    batch was committing), and runs them in one BEGIN IMMEDIATE transaction
+    with one commit. Every write gets its own savepoint, so a write that raises is
+    rolled back and fails its own Future without affecting the rest of the
+    batch. Futures are resolved only after the batch has committed.
+    """
+
+    def __init__(self, pool, max_batch=100, max_delay=0.0):
+        """Start the writer thread for connections from pool"""
+        self.pool = pool
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max(0.0, max_delay)
+        self._queue = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, write, *args):
+        """Queue write(cursor, *args) and return a Future for its return value"""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Write queue is closed")
+            self._queue.put((future, write, args))
+        return future
+
+    def close(self):
+        """Commit everything already queued, then stop the writer thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join()
+
+    def _collect(self, first):
+        """Gather a batch that starts with first; return (batch, stop_requested)"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch, stop = self._collect(item)
+            self._commit_batch(batch)
+
+    def _commit_batch(self, batch):
+        """Run one batch in a single transaction and resolve its futures"""
+        batch = [item for item in batch if item[0].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        results = []
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                for future, write, args in batch:
+                    cursor.execute("SAVEPOINT queued_write")
+                    try:
+                        results.append((future, write(cursor, *args), None))
+                        cursor.execute("RELEASE queued_write")
+                    except Exception as e:
+                        cursor.execute("ROLLBACK TO queued_write")
+                        cursor.execute("RELEASE queued_write")
+                        results.append((future, None, e))
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Write batch of {len(batch)} failed: {str(e)}")
+            for future, write, args in batch:
+                future.set_exception(e)
+            return
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
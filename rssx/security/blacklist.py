@@ -0,0 +1,128 @@
+import os
+import threading
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class BlacklistMatcher:
+    """Case-insensitive multi-word matcher built on an Aho-Corasick automaton.
+
+    Matching walks the content once no matter how many words are
+    blacklisted. The automaton is rebuilt off to the side and swapped in
+    with a single assignment, so reloads never disturb concurrent searches.
+    """
+
+    def __init__(self, words=(), path=None):
+        """Create a matcher from words, or from a file with one word per line"""
+        self.path = path
+        self._file_state = None
+        self._reload_lock = threading.Lock()
+        self._automaton = self._build(words)
+        if path:
+            self.reload_if_changed()
+
+    @property
+    def words(self):
+        """The blacklisted words, lower-cased and sorted"""
+        return self._automaton[3]
+
+    def __len__(self):
+        return len(self.words)
+
+    @staticmethod
+    def _normalize(words):
+        return sorted({word.strip().lower() for word in words if word and word.strip()})
+
+    @classmethod
+    def _build(cls, words):
+        """Compile words into (goto, fail, output, words) tables"""
+        words = tuple(cls._normalize(words))
+        goto = [{}]
+        output = [None]
+        for index, word in enumerate(words):
+            state = 0
+            for ch in word:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][ch] = next_state
+                    goto.append({})
+                    output.append(None)
+                state = next_state
+            if output[state] is None:
+                output[state] = index
+
+        # Breadth-first pass to fill in failure links. Each state also inherits
+        # the output of its failure state, so a search only checks one slot.
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in goto[state].items():
+                queue.append(child)
+                fallback = fail[state]
+                while fallback and ch not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[child] = goto[fallback].get(ch, 0)
+                if output[child] is None:
+                    output[child] = output[fail[child]]
+        return goto, fail, output, words
+
+    def search(self, content):
+        """Return the first blacklisted word found in content, or None"""
+        goto, fail, output, words = self._automaton
+        if not words or not content:
+            return None
+        state = 0
+        for ch in content.lower():
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state] is not None:
+                return words[output[state]]
+        return None
+
+    def set_words(self, words):
+        """Replace the blacklist with words"""
+        self._automaton = self._build(words)
+
+    def load_file(self, path):
+        """Read one word per line from path, ignoring blank lines and # comments"""
+        with open(path, "r", encoding="utf-8") as f:
+            words = [
+                line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")
+            ]
+        self.set_words(words)
+        logger.info(f"Loaded {len(self.words)} blacklisted words from {path}")
+
+    def use_file(self, path):
+        """Load the blacklist from path and watch it for reload_if_changed"""
+        with self._reload_lock:
+            self.path = path
+            self._file_state = None
+        return self.reload_if_changed()
+
+    def reload_if_changed(self):
+        """Reload the blacklist file if it changed since the last load; return True if it did"""
+        if not self.path:
+            return False
+        with self._reload_lock:
+            try:
+                stat = os.stat(self.path)
+                file_state = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                file_state = None
+            if file_state == self._file_state:
+                return False
+            try:
+                if file_state is None:
+                    self.set_words(())
+                else:
+                    self.load_file(self.path)
+            except (OSError, UnicodeError) as e:
+                logger.error(f"Error loading blacklist file {self.path}: {str(e)}")
+                return False
+            self._file_state = file_state
+            return True
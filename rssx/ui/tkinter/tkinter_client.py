@@ -3,9 +3,14 @@ from tkinter import ttk, messagebox, scrolledtext
 import requests
 import json
 import os
+import queue
+import threading
+import time
 import tkinter.simpledialog as simpledialog
 from datetime import datetime
 
+from rssx.utils.http_client import ETagCache, read_events
+
 _temp_root = tk.Tk()
 _temp_root.withdraw()
 default_server_url = simpledialog.askstring("Server URL", "Enter the server URL:", initialvalue="http://localhost:5000")
@@ -14,12 +19,28 @@ _temp_root.destroy()
 if default_server_url:
     os.environ["DEFAULT_SERVER"] = default_server_url
 
+# Seconds between event stream reconnects; a stream silent for
+# STREAM_READ_TIMEOUT (several missed heartbeats) is reconnected too
+STREAM_RETRY = 3
+STREAM_READ_TIMEOUT = 60
+# Milliseconds between checks for stream events on the Tk main loop
+STREAM_APPLY_INTERVAL = 250
+
+
 class RSSXTkinterUI:
     def __init__(self, config):
         self.config = config
         self.server_url = config.get("DEFAULT_SERVER") or os.environ.get("DEFAULT_SERVER") or "http://localhost:5000"
         self.token = None
         self.username = None
+        self.next_cursor = None
+        self.etag_cache = ETagCache()
+        # Posts on display by ID, with the counters stream events update
+        self.posts = {}
+        # Filled by the stream thread, applied on the Tk main loop
+        self.stream_events = queue.Queue()
+        # True while /api/stream is connected: changes then arrive as events
+        self.live = False
 
         self.root = tk.Tk()
         self.root.title("RSSX Client")
@@ -48,6 +69,8 @@ class RSSXTkinterUI:
 
         self.load_token()
         self.refresh_feed()
+        threading.Thread(target=self.read_stream, name="rssx-stream", daemon=True).start()
+        self.root.after(STREAM_APPLY_INTERVAL, self.apply_stream_events)
 
     def show_login_dialog(self):
         login_dialog = tk.Toplevel(self.root)
@@ -130,7 +153,8 @@ class RSSXTkinterUI:
                 )
                 if response.status_code == 201:
                     messagebox.showinfo("Success", "Post created successfully")
-                    self.refresh_feed()
+                    if not self.live:
+                        self.refresh_feed()
                     post_dialog.destroy()
                 else:
                     error = response.json().get("error", "Failed to create post")
@@ -174,7 +198,8 @@ class RSSXTkinterUI:
                 )
                 if response.status_code == 201:
                     messagebox.showinfo("Success", "Comment added successfully")
-                    self.refresh_feed()
+                    if not self.live:
+                        self.refresh_feed()
                     comment_dialog.destroy()
                 else:
                     error = response.json().get("error", "Failed to add comment")
@@ -187,7 +212,54 @@ class RSSXTkinterUI:
         ttk.Button(button_frame, text="Cancel", command=comment_dialog.destroy).pack(side=tk.LEFT)
         ttk.Button(button_frame, text="Comment", command=do_comment).pack(side=tk.RIGHT)
 
+    def show_comments(self, post_id):
+        """Open a window listing a post's comments, one page at a time"""
+        comments_window = tk.Toplevel(self.root)
+        comments_window.title("Comments")
+        comments_window.geometry("500x400")
+        comments_window.transient(self.root)
+
+        comments_text = scrolledtext.ScrolledText(comments_window, wrap=tk.WORD, state=tk.DISABLED)
+        comments_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        load_more_button = ttk.Button(comments_window, text="Load more")
+        state = {"cursor": None}
+
+        def load_page():
+            try:
+                params = {"cursor": state["cursor"]} if state["cursor"] else {}
+                status, data = self.get_json(f"/api/post/{post_id}/comments", params)
+                if status != 200:
+                    error = data.get("error", "Failed to fetch comments")
+                    messagebox.showerror("Error", error)
+                    return
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to fetch comments: {e}")
+                return
+            comments_text.config(state=tk.NORMAL)
+            for comment in data.get("comments", []):
+                author = comment.get("author", "Unknown")
+                if comment.get("federated_from"):
+                    author = f"{author}@{comment['federated_from']}"
+                comments_text.insert(
+                    tk.END, f"{author} ({comment.get('timestamp_formatted', '')}):\n{comment.get('content', '')}\n\n"
+                )
+            comments_text.config(state=tk.DISABLED)
+            state["cursor"] = data.get("next_cursor")
+            if state["cursor"]:
+                load_more_button.pack(pady=5)
+            else:
+                load_more_button.pack_forget()
+
+        load_more_button.config(command=load_page)
+        load_page()
+
+    def get_json(self, path, params=None, headers=None):
+        """GET a JSON endpoint on the server and return (status code, data), revalidating cached responses"""
+        return self.etag_cache.get_json(f"{self.server_url}{path}", headers, params)
+
     def refresh_feed(self):
+        self.next_cursor = None
+        self.posts = {}
         if not self.token:
             self.feed_text.config(state=tk.NORMAL)
             self.feed_text.delete("1.0", tk.END)
@@ -195,53 +267,170 @@ class RSSXTkinterUI:
             self.feed_text.config(state=tk.DISABLED)
             return
 
+        self.feed_text.config(state=tk.NORMAL)
+        self.feed_text.delete("1.0", tk.END)
+        self.feed_text.config(state=tk.DISABLED)
+        self.load_feed_page()
+
+    def load_feed_page(self, cursor=None):
+        """Fetch one feed page and append it, followed by a Load more button if there are more"""
         try:
             headers = {"Authorization": f"Bearer {self.token}"}
-            response = requests.get(f"{self.server_url}/api/feed", headers=headers, timeout=10)
-            if response.status_code == 200:
-                posts = response.json().get("posts", [])
+            # Comments are fetched per post when they are opened
+            params = {"comments": 0}
+            if cursor:
+                params["cursor"] = cursor
+            status, data = self.get_json("/api/feed", params, headers)
+            if status == 200:
+                self.next_cursor = data.get("next_cursor")
                 self.feed_text.config(state=tk.NORMAL)
-                self.feed_text.delete("1.0", tk.END)
-                for post in posts:
-                    self.display_post(post)
+                # Drop the previous page's Load more button before appending
+                if "load_more" in self.feed_text.mark_names():
+                    self.feed_text.delete("load_more", tk.END)
+                for post in data.get("posts", []):
+                    # A post the stream already put on top, or one that moved
+                    # to a later page since the previous one was fetched
+                    if post.get("id") not in self.posts:
+                        self.display_post(post)
+                if self.next_cursor:
+                    self.feed_text.mark_set("load_more", tk.END)
+                    self.feed_text.mark_gravity("load_more", tk.LEFT)
+                    load_more_button = ttk.Button(
+                        self.root, text="Load more", command=lambda: self.load_feed_page(self.next_cursor)
+                    )
+                    self.feed_text.window_create(tk.END, window=load_more_button)
                 self.feed_text.config(state=tk.DISABLED)
             else:
-                error = response.json().get("error", "Failed to fetch feed")
+                error = data.get("error", "Failed to fetch feed")
                 messagebox.showerror("Error", error)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to fetch feed: {e}")
 
-    def display_post(self, post):
+    def display_post(self, post, index=tk.END):
+        """Insert a post at index, tagged so stream events can update it in place"""
         author = post.get("author", "Unknown")
         content = post.get("content", "")
         timestamp = post.get("timestamp", 0)
         post_id = post.get("id", "Unknown")
-        upvotes = post.get("upvotes", 0)
-        downvotes = post.get("downvotes", 0)
         spam = post.get("spam", 0)
         date_str = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+        self.posts[post_id] = {key: post.get(key, 0) for key in ("upvotes", "downvotes", "comment_count", "spam")}
+
+        # Everything goes in at this mark, which moves past each insert
+        self.feed_text.mark_set("post_insert", index)
+        self.feed_text.mark_gravity("post_insert", tk.RIGHT)
 
         # Show suspected spam warning if marked
         if spam:
-            self.feed_text.insert(tk.END, "[SUSPECTED SPAM] This post has been flagged as spam by the network.\n", 'spam')
-            self.feed_text.tag_config('spam', foreground='red', font=('TkDefaultFont', 10, 'bold'))
+            self.insert_spam_warning("post_insert")
 
-        # Display the post content
-        self.feed_text.insert(tk.END, f"Author: {author}\nDate: {date_str}\nContent:\n{content}\nUpvotes: {upvotes}  Downvotes: {downvotes}\n\n")
+        # Display the post content; the header and counters are tagged by post ID
+        self.feed_text.insert("post_insert", f"Author: {author}\nDate: {date_str}\n", f"post-{post_id}")
+        self.feed_text.insert("post_insert", f"Content:\n{content}\n")
+        self.feed_text.insert("post_insert", self.counters_text(post_id), f"counters-{post_id}")
+        self.feed_text.insert("post_insert", "\n\n")
 
         # Add an upvote button for each post
         upvote_button = ttk.Button(self.root, text="Upvote", command=lambda: self.upvote_post(post_id))
-        self.feed_text.window_create(tk.END, window=upvote_button)
+        self.feed_text.window_create("post_insert", window=upvote_button)
 
         # Add a downvote button for each post
         downvote_button = ttk.Button(self.root, text="Downvote", command=lambda: self.downvote_post(post_id))
-        self.feed_text.window_create(tk.END, window=downvote_button)
+        self.feed_text.window_create("post_insert", window=downvote_button)
 
         # Add a comment button for each post
         comment_button = ttk.Button(self.root, text="Comment", command=lambda: self.show_comment_dialog(post_id))
-        self.feed_text.window_create(tk.END, window=comment_button)
-
-        self.feed_text.insert(tk.END, "\n" + ("="*40) + "\n\n")
+        self.feed_text.window_create("post_insert", window=comment_button)
+
+        # Add a button that opens the post's comments
+        comments_button = ttk.Button(self.root, text="Comments", command=lambda: self.show_comments(post_id))
+        self.feed_text.window_create("post_insert", window=comments_button)
+
+        self.feed_text.insert("post_insert", "\n" + ("="*40) + "\n\n")
+
+    def counters_text(self, post_id):
+        counters = self.posts[post_id]
+        return (
+            f"Upvotes: {counters['upvotes']}  Downvotes: {counters['downvotes']}  "
+            f"Comments: {counters['comment_count']}"
+        )
+
+    def insert_spam_warning(self, index):
+        self.feed_text.insert(index, "[SUSPECTED SPAM] This post has been flagged as spam by the network.\n", 'spam')
+        self.feed_text.tag_config('spam', foreground='red', font=('TkDefaultFont', 10, 'bold'))
+
+    def read_stream(self):
+        """Read /api/stream on a background thread, queueing events for apply_stream_events"""
+        last_event_id = None
+        while True:
+            headers = {"Last-Event-ID": last_event_id} if last_event_id else {}
+            try:
+                with requests.get(
+                    f"{self.server_url}/api/stream", headers=headers, stream=True, timeout=(5, STREAM_READ_TIMEOUT)
+                ) as response:
+                    if response.status_code == 200:
+                        self.live = True
+                        for event_id, kind, data in read_events(response):
+                            last_event_id = event_id or last_event_id
+                            self.stream_events.put((kind, json.loads(data)))
+            except (requests.RequestException, ValueError):
+                pass
+            # Until the stream is back, actions refresh the whole feed; the
+            # reconnect resumes after last_event_id, so nothing is missed
+            self.live = False
+            time.sleep(STREAM_RETRY)
+
+    def apply_stream_events(self):
+        """Apply queued stream events to the feed shown, then check again shortly"""
+        refresh = False
+        try:
+            while True:
+                kind, data = self.stream_events.get_nowait()
+                if not self.token:
+                    continue
+                self.feed_text.config(state=tk.NORMAL)
+                try:
+                    refresh = self.apply_event(kind, data) or refresh
+                except Exception as e:
+                    # One bad event must not stop the updates that follow
+                    print(f"Error applying {kind} event: {e}")
+                finally:
+                    self.feed_text.config(state=tk.DISABLED)
+        except queue.Empty:
+            pass
+        finally:
+            self.root.after(STREAM_APPLY_INTERVAL, self.apply_stream_events)
+        if refresh:
+            self.refresh_feed()
+
+    def apply_event(self, kind, data):
+        """Apply one stream event to the feed text; return True if the feed needs a full reload"""
+        if kind == "post":
+            if data.get("id") not in self.posts:
+                self.display_post(data, "1.0")
+            return False
+        if kind == "reset" or (kind == "spam" and data.get("post_id") is None):
+            return True
+        post_id = data.get("post_id")
+        counters = self.posts.get(post_id)
+        if counters is None:
+            return False  # not on display
+        if kind == "spam" or (kind == "vote" and data.get("spam")):
+            if not counters["spam"]:
+                counters["spam"] = 1
+                self.insert_spam_warning(f"post-{post_id}.first")
+        if kind == "vote":
+            counters["upvotes"], counters["downvotes"] = data.get("upvotes", 0), data.get("downvotes", 0)
+        elif kind == "comment":
+            counters["comment_count"] += 1
+        else:
+            return False
+        # Rewrite every range, last first so the earlier indexes stay valid
+        ranges = self.feed_text.tag_ranges(f"counters-{post_id}")
+        for start, end in reversed(list(zip(ranges[0::2], ranges[1::2]))):
+            self.feed_text.delete(start, end)
+            self.feed_text.insert(start, self.counters_text(post_id), f"counters-{post_id}")
+        return False
 
     def downvote_post(self, post_id):
         if not self.token:
@@ -257,7 +446,8 @@ class RSSXTkinterUI:
             )
             if response.status_code == 200:
                 messagebox.showinfo("Success", "Post downvoted successfully")
-                self.refresh_feed()
+                if not self.live:
+                    self.refresh_feed()
             else:
                 error = response.json().get("error", "Failed to downvote post")
                 messagebox.showerror("Error", error)
@@ -279,7 +469,8 @@ class RSSXTkinterUI:
             )
             if response.status_code == 200:
                 messagebox.showinfo("Success", "Post upvoted successfully")
-                self.refresh_feed()
+                if not self.live:
+                    self.refresh_feed()
             else:
                 error = response.json().get("error", "Failed to upvote post")
                 messagebox.showerror("Error", error)
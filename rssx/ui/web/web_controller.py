@@ -6,11 +6,13 @@ import requests
 logger = logging.getLogger(__name__)
 
 class WebUI:
-    def __init__(self, db, security, config):
-        """Initialize the Web UI with database, security, and configuration"""
+    def __init__(self, db, security, config, feed_cache=None, events=None):
+        """Initialize the Web UI with a Storage backend, security, configuration, and optional FeedCache and EventBus"""
         self.db = db
         self.security = security
         self.config = config
+        self.feed_cache = feed_cache
+        self.events = events
         self.web = Blueprint('web', __name__, 
                            template_folder=config.get("WEB_TEMPLATE_DIR"),
                            static_folder=config.get("WEB_STATIC_DIR"))
@@ -21,6 +23,7 @@ class WebUI:
         # Main pages
         self.web.route('/', methods=['GET'])(self.index)
         self.web.route('/feed', methods=['GET'])(self.feed)
+        self.web.route('/search', methods=['GET'])(self.search)
         self.web.route('/servers', methods=['GET', 'POST'])(self.servers)
         
         # Authentication
@@ -46,9 +49,10 @@ class WebUI:
             self.current_user = None
     
     def _get_formatted_posts(self, posts_raw):
-        """Format raw post data for display"""
+        """Format Post records as dicts for display"""
         formatted_posts = []
-        for post in posts_raw:
+        for record in posts_raw:
+            post = record.to_dict()
             # Get the content from the post dict
             content = post.get("content", "")
             # Optionally format content, e.g., split into lines if needed:
@@ -66,20 +70,61 @@ class WebUI:
         return render_template('index.html', current_user=self.current_user)
     
     def feed(self):
-        """Display the post feed"""
-        posts_raw = self.db.get_all_posts()
-        posts = self._get_formatted_posts(posts_raw)
-        # Attach comments to each post
-        for post in posts:
-            comments = self.db.get_comments_for_post(post['id'])
-            for comment in comments:
-                comment['timestamp_formatted'] = datetime.fromtimestamp(comment['timestamp']).strftime('%Y-%m-%d %H:%M:%S')
-            post['comments'] = comments
+        """Display one page of the post feed"""
+        cursor = request.args.get('cursor')
+        sort = request.args.get('sort', 'ranked')
+        page_size = self.config.get("FEED_PAGE_SIZE", 20)
+        preview_size = self.config.get("COMMENT_PREVIEW_SIZE", 3)
+        key = ('web', sort, cursor, page_size, preview_size)
+        cached = self.feed_cache.get(key) if self.feed_cache is not None else None
+        if cached is None:
+            generation = self.feed_cache.generation() if self.feed_cache is not None else None
+            try:
+                posts_raw, next_cursor = self.db.get_posts_page(page_size, cursor, sort)
+            except ValueError:
+                flash("That feed page link is no longer valid", "warning")
+                return redirect(url_for('web.feed'))
+            posts = self._get_formatted_posts(posts_raw)
+            # Show the first few comments of each post, fetched for the whole page
+            # in one query; the page loads the rest from the API on request
+            previews = self.db.get_comment_previews((post['id'] for post in posts), preview_size)
+            for post in posts:
+                comments, post['comments_cursor'] = previews[post['id']]
+                post['comments'] = []
+                for comment in comments:
+                    comment_dict = comment.to_dict()
+                    comment_dict['timestamp_formatted'] = datetime.fromtimestamp(comment.timestamp).strftime('%Y-%m-%d %H:%M:%S')
+                    post['comments'].append(comment_dict)
+            cached = (posts, next_cursor)
+            if self.feed_cache is not None:
+                self.feed_cache.put(key, cached, sort, (post['id'] for post in posts), generation)
+        posts, next_cursor = cached
         return render_template('feed.html', 
                                current_user=self.current_user,
                                posts=posts,
+                               next_cursor=next_cursor,
+                               sort=sort,
+                               first_page=not cursor,
                                token=session.get("token"))
     
+    def search(self):
+        """Search posts and comments"""
+        query = request.args.get('q', '').strip()
+        cursor = request.args.get('cursor')
+        results, next_cursor = [], None
+        if query:
+            try:
+                results, next_cursor = self.db.search(query, self.config.get("FEED_PAGE_SIZE", 20), cursor)
+            except ValueError:
+                flash("Enter at least one word to search for", "warning")
+        for result in results:
+            result['timestamp_formatted'] = datetime.fromtimestamp(result['timestamp']).strftime('%Y-%m-%d %H:%M:%S')
+        return render_template('search.html',
+                               current_user=self.current_user,
+                               query=query,
+                               results=results,
+                               next_cursor=next_cursor)
+    
     def servers(self):
         """Manage connected servers"""
         if request.method == 'POST':
@@ -229,5 +274,9 @@ class WebUI:
                 flash("Failed to create post", "danger")
             else:
                 flash("Post created successfully", "success")
+                # Readers of /api/stream see the post without reloading
+                post = self.db.get_post_by_id(post_id) if self.events is not None else None
+                if post:
+                    self.events.publish("post", post.to_dict())
             
             return redirect(url_for('web.feed'))
\ No newline at end of file
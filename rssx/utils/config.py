@@ -23,6 +23,27 @@ class Config:
             
             # Database settings
             "DB_PATH": "rssx.db",
+            # Optional sqlite:// URL; when set, connections come from a SQLAlchemy engine
+            "DB_URL": None,
+            "DB_POOL_SIZE": 8,
+            "DB_BUSY_TIMEOUT": 5.0,
+            # 0-31; set a distinct value per server process sharing a database
+            "NODE_ID": None,
+            # > 0 group-commits votes and comments in batches of up to this many
+            "WRITE_BATCH_SIZE": 0,
+            "WRITE_BATCH_DELAY_MS": 0,
+            # Posts older than ARCHIVE_AFTER_DAYS move to per-year files in
+            # ARCHIVE_DIR; 0 keeps everything in DB_PATH
+            "ARCHIVE_DIR": "archive",
+            "ARCHIVE_AFTER_DAYS": 0,
+            "ARCHIVE_INTERVAL": 3600,
+            # Seconds between online backups into SNAPSHOT_DIR; 0 turns them off
+            "SNAPSHOT_DIR": "db_backups",
+            "SNAPSHOT_INTERVAL": 0,
+            "SNAPSHOT_KEEP": 7,
+            # Store post and comment content longer than this many bytes
+            # zlib-compressed; 0 stores everything as plain text
+            "COMPRESS_CONTENT_OVER": 0,
             
             # Path settings
             "POSTS_DIRECTORY": "posts",
@@ -33,6 +54,28 @@ class Config:
             "LOG_LEVEL": "INFO",
             "LOG_FILE": "rssx.log",
             
+            # Spam settings
+            "BLACKLIST_FILE": "blacklist.txt",
+            "SPAM_RESCAN_INTERVAL": 10,
+            
+            # Feed settings
+            "FEED_PAGE_SIZE": 20,
+            # Comments shown under each post in the web feed before "Show more"
+            "COMMENT_PREVIEW_SIZE": 3,
+            # Feed pages kept in memory between requests (0 turns the cache
+            # off), each for at most FEED_CACHE_TTL seconds
+            "FEED_CACHE_SIZE": 256,
+            "FEED_CACHE_TTL": 30,
+            # gzip level (1-9) for JSON and HTML responses to clients that
+            # accept it, 0 to send them uncompressed; smaller bodies are sent as is
+            "GZIP_LEVEL": 6,
+            "GZIP_MIN_SIZE": 500,
+            # Open /api/stream connections allowed at once (0 turns the
+            # stream off) and seconds between heartbeats on an idle one
+            "SSE_MAX_CONNECTIONS": 100,
+            "SSE_HEARTBEAT": 15,
+            "SEARCH_INDEX_INTERVAL": 1.0,
+            
             # UI settings
             "ENABLE_WEB_UI": True,
             "ENABLE_TUI": True,
@@ -0,0 +1,136 @@
+import json
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+
+SSE_MAX_CONNECTIONS = 100
+# Events waiting to be sent to one connection; a client that falls this far
+# behind is disconnected and catches up from the history when it reconnects
+SSE_QUEUE_SIZE = 256
+# Recent events kept for Last-Event-ID resume
+SSE_HISTORY = 1000
+SSE_HEARTBEAT = 15.0  # seconds between comment lines on an idle stream
+
+# text is the whole SSE message, encoded once and shared by every connection
+Event = namedtuple("Event", "number kind text")
+
+
+class Subscription:
+    """One connection's queue of events to send"""
+
+    def __init__(self, queue_size, backlog, reset):
+        self.queue = queue.Queue(queue_size)
+        # When the client missed events, the ID to send with a reset event:
+        # it should reload what it shows and resume from there
+        self.reset = reset
+        # Set when the queue overflowed; the connection is then closed
+        self.overflowed = False
+        for event in backlog:
+            self.offer(event)
+
+    def offer(self, event):
+        """Queue event without blocking the publisher"""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def next(self, timeout):
+        """Return the next event, or None if none came within timeout seconds"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventBus:
+    """In-process fan-out of feed events to Server-Sent Events connections.
+
+    publish encodes each event once and offers it to every subscription
+    without blocking: a connection whose queue is full is marked
+    overflowed and closed by its stream, so one slow client never holds
+    up writers or other clients. Event IDs are "<epoch>-<number>", where
+    epoch identifies this process, so subscribe can resume from a client's
+    Last-Event-ID out of the recent history, or tell it to reload when the
+    ID is from another process or too old.
+    """
+
+    def __init__(
+        self, max_connections=SSE_MAX_CONNECTIONS, queue_size=SSE_QUEUE_SIZE, history=SSE_HISTORY, heartbeat=SSE_HEARTBEAT
+    ):
+        """Allow up to max_connections subscriptions at once; streams send a heartbeat every heartbeat seconds"""
+        self.max_connections = max_connections
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.epoch = str(int(time.time() * 1000))
+        self._history = deque(maxlen=history)
+        self._subscriptions = set()
+        self._number = 0
+        self._lock = threading.Lock()
+        self.published = self.dropped = self.refused = 0
+
+    def publish(self, kind, data):
+        """Send event kind with JSON-serializable data to every subscription"""
+        payload = json.dumps(data, separators=(",", ":"), sort_keys=True)
+        with self._lock:
+            self._number += 1
+            event = Event(
+                self._number, kind, f"id: {self.epoch}-{self._number}\nevent: {kind}\ndata: {payload}\n\n"
+            )
+            self._history.append(event)
+            for subscription in self._subscriptions:
+                if not subscription.overflowed:
+                    subscription.offer(event)
+                    if subscription.overflowed:
+                        self.dropped += 1
+            self.published += 1
+
+    def subscribe(self, last_event_id=None):
+        """Return a Subscription, or None if max_connections are open.
+
+        With last_event_id, the events published after it are queued first;
+        if they are no longer all in the history, the subscription's reset
+        is set to the latest event ID instead.
+        """
+        with self._lock:
+            if len(self._subscriptions) >= self.max_connections:
+                self.refused += 1
+                return None
+            backlog, reset = [], None
+            if last_event_id:
+                number = self._event_number(last_event_id)
+                oldest = self._history[0].number if self._history else self._number + 1
+                if number is None or number > self._number or number < oldest - 1:
+                    reset = f"{self.epoch}-{self._number}"
+                else:
+                    backlog = [event for event in self._history if event.number > number]
+                    # Replaying more than fits the queue would only overflow it
+                    if len(backlog) > self.queue_size:
+                        backlog, reset = [], f"{self.epoch}-{self._number}"
+            subscription = Subscription(self.queue_size, backlog, reset)
+            self._subscriptions.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def stats(self):
+        """Return open connections and published, dropped and refused counters"""
+        with self._lock:
+            return {
+                "connections": len(self._subscriptions),
+                "max_connections": self.max_connections,
+                "published": self.published,
+                "dropped": self.dropped,
+                "refused": self.refused,
+            }
+
+    def _event_number(self, event_id):
+        epoch, _, number = event_id.partition("-")
+        if epoch != self.epoch or not number.isdigit():
+            return None
+        return int(number)
@@ -0,0 +1,121 @@
+import threading
+import time
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+FEED_CACHE_SIZE = 256
+FEED_CACHE_TTL = 30.0  # seconds; bounds staleness from writers in other processes
+
+# Feed sorts whose order a change can shift, by Database change event; None
+# means every cached page. Pages showing the changed post are dropped too.
+REORDERED_SORTS = {
+    "post": None,
+    "comment": ("activity",),
+    "vote": ("ranked",),
+    "user": ("ranked",),
+    "edit": (),
+    "spam": None,
+    "archive": None,
+}
+
+
+class FeedCache:
+    """Bounded LRU cache of built feed pages, invalidated by Database change events.
+
+    Each entry is stored with the sort it was built for and the IDs of the
+    posts on it. on_change (see Database.set_change_callback) drops exactly
+    the entries a write can affect: pages showing the changed post, and
+    pages of any sort the change can reorder. Entries also expire after ttl
+    seconds, which bounds how stale a page can get when another process
+    writes to the same database.
+    """
+
+    def __init__(self, size=FEED_CACHE_SIZE, ttl=FEED_CACHE_TTL):
+        """Keep up to size entries, each for at most ttl seconds"""
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires, sort, post_ids, value)
+        self._by_post = {}
+        self._by_sort = {}
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; a page built across one is not stored
+        self._generation = 0
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def generation(self):
+        """Return a token to pass to put once the page is built"""
+        return self._generation
+
+    def get(self, key):
+        """Return the cached value for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[3]
+
+    def put(self, key, value, sort, post_ids, generation):
+        """Store value for key unless the cache was invalidated since generation was taken"""
+        with self._lock:
+            if generation != self._generation:
+                return False
+            if key in self._entries:
+                self._remove(key)
+            post_ids = frozenset(post_ids)
+            self._entries[key] = (time.monotonic() + self.ttl, sort, post_ids, value)
+            self._by_sort.setdefault(sort, set()).add(key)
+            for post_id in post_ids:
+                self._by_post.setdefault(post_id, set()).add(key)
+            while len(self._entries) > self.size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def on_change(self, event, post_id=None):
+        """Drop the entries a Database change event can affect"""
+        # Unknown events drop everything
+        sorts = REORDERED_SORTS.get(event)
+        with self._lock:
+            self._generation += 1
+            if sorts is None:
+                keys = list(self._entries)
+            else:
+                keys = set(self._by_post.get(post_id, ()))
+                for sort in sorts:
+                    keys.update(self._by_sort.get(sort, ()))
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+
+    def stats(self):
+        """Return the entry count and hit, miss, eviction, expiration and invalidation counters"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size": self.size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, key):
+        _, sort, post_ids, _ = self._entries.pop(key)
+        self._by_sort[sort].discard(key)
+        for post_id in post_ids:
+            keys = self._by_post[post_id]
+            keys.discard(key)
+            if not keys:
+                del self._by_post[post_id]
@@ -0,0 +1,191 @@
+import threading
+import zlib
+from collections import OrderedDict
+
+from werkzeug.http import parse_accept_header
+
+GZIP_LEVEL = 6
+# Bodies smaller than this gain too little from gzip to be worth the CPU
+GZIP_MIN_SIZE = 500
+# Streamed bodies are flushed to the client whenever this much uncompressed
+# output is pending, so a stream keeps arriving while it is compressed
+GZIP_STREAM_FLUSH = 16 * 1024
+# Compressed bodies kept by URL and ETag; an ETag names one representation of
+# a URL, so a response with the same pair has the same body
+GZIP_MEMO_SIZE = 64
+
+COMPRESSIBLE_TYPES = frozenset(
+    (
+        "application/json",
+        "application/javascript",
+        "image/svg+xml",
+        "text/css",
+        "text/html",
+        "text/javascript",
+        "text/plain",
+    )
+)
+SKIPPED_STATUSES = ("204", "206", "304")
+
+
+class GzipMiddleware:
+    """WSGI middleware that gzips text responses for clients that accept it.
+
+    Responses are compressed when the client's Accept-Encoding allows gzip,
+    the content type is in COMPRESSIBLE_TYPES and the body is at least
+    min_size bytes. Bodies of known length are compressed in one piece;
+    streamed bodies (no Content-Length) are compressed as they are read.
+    Compressed responses carry a weak ETag, since their bytes differ from
+    the identity representation, and every compressible response gets
+    Vary: Accept-Encoding.
+    """
+
+    def __init__(self, app, level=GZIP_LEVEL, min_size=GZIP_MIN_SIZE, memo_size=GZIP_MEMO_SIZE):
+        """Wrap the WSGI app; level is the zlib level (1-9)"""
+        self.app = app
+        self.level = level
+        self.min_size = min_size
+        self.memo_size = memo_size
+        self._memo = OrderedDict()  # (path, query, etag) -> compressed body
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        # Headers are held back until the app returns, so they can still change
+        pending = []
+
+        def defer(status, headers, exc_info=None):
+            if pending is None:
+                # The app started its response while being iterated; pass it on
+                return start_response(status, headers, exc_info)
+            pending[:] = [status, headers]
+            return self._write_through(pending, start_response)
+
+        app_iter = self.app(environ, defer)
+        if not pending:
+            pending = None
+            return app_iter
+        status, headers = pending
+        del pending[:]
+        content_type = _header(headers, "Content-Type")
+        if content_type is None or content_type.split(";")[0].strip().lower() not in COMPRESSIBLE_TYPES:
+            start_response(status, headers)
+            return app_iter
+        headers = _add_vary(headers)
+        if (
+            status[:3] in SKIPPED_STATUSES
+            or _header(headers, "Content-Encoding") is not None
+            or environ.get("REQUEST_METHOD") == "HEAD"
+            or parse_accept_header(environ.get("HTTP_ACCEPT_ENCODING", "")).quality("gzip") <= 0
+        ):
+            start_response(status, headers)
+            return app_iter
+
+        length = _header(headers, "Content-Length")
+        if length is None:
+            start_response(status, _gzip_headers(headers, None))
+            return self._compress_stream(app_iter)
+        if int(length) < self.min_size:
+            start_response(status, headers)
+            return app_iter
+
+        etag = _header(headers, "ETag")
+        key = (environ.get("PATH_INFO"), environ.get("QUERY_STRING"), etag) if etag else None
+        body = self._remembered(key)
+        try:
+            if body is None:
+                body = _gzip(b"".join(app_iter), self.level)
+                self._remember(key, body)
+        finally:
+            if hasattr(app_iter, "close"):
+                app_iter.close()
+        start_response(status, _gzip_headers(headers, len(body)))
+        return [body]
+
+    def _write_through(self, pending, start_response):
+        """Return the write() callable for the app: it sends the held-back headers uncompressed"""
+        def write(data):
+            if pending:
+                status, headers = pending
+                del pending[:]
+                write.send = start_response(status, headers)
+            write.send(data)
+
+        return write
+
+    def _compress_stream(self, app_iter):
+        """Yield app_iter gzipped, flushing whenever GZIP_STREAM_FLUSH bytes are pending"""
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        pending = 0
+        first = True
+        try:
+            for chunk in app_iter:
+                if not chunk:
+                    continue
+                data = compressor.compress(chunk)
+                pending += len(chunk)
+                # The first chunk goes out at once so the client sees the response start
+                if first or pending >= GZIP_STREAM_FLUSH:
+                    data += compressor.flush(zlib.Z_SYNC_FLUSH)
+                    pending = 0
+                    first = False
+                if data:
+                    yield data
+            yield compressor.flush(zlib.Z_FINISH)
+        finally:
+            if hasattr(app_iter, "close"):
+                app_iter.close()
+
+    def _remembered(self, key):
+        if key is None or not self.memo_size:
+            return None
+        with self._lock:
+            body = self._memo.get(key)
+            if body is not None:
+                self._memo.move_to_end(key)
+            return body
+
+    def _remember(self, key, body):
+        if key is None or not self.memo_size:
+            return
+        with self._lock:
+            self._memo[key] = body
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+
+
+def _gzip(data, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _header(headers, name):
+    name = name.lower()
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _add_vary(headers):
+    vary = _header(headers, "Vary")
+    if vary is None:
+        return headers + [("Vary", "Accept-Encoding")]
+    if "accept-encoding" in vary.lower() or vary.strip() == "*":
+        return headers
+    return [(k, v) for k, v in headers if k.lower() != "vary"] + [("Vary", f"{vary}, Accept-Encoding")]
+
+
+def _gzip_headers(headers, length):
+    """Return headers for the gzipped body: encoding, new length and a weak ETag"""
+    result = []
+    for key, value in headers:
+        lower = key.lower()
+        if lower == "content-length":
+            continue
+        if lower == "etag" and not value.startswith("W/"):
+            value = "W/" + value
+        result.append((key, value))
+    result.append(("Content-Encoding", "gzip"))
+    if length is not None:
+        result.append(("Content-Length", str(length)))
+    return result
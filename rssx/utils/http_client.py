@@ -0,0 +1,68 @@
+import threading
+from collections import OrderedDict
+
+import requests
+
+# Responses kept for revalidation with If-None-Match, oldest dropped first
+ETAG_CACHE_SIZE = 64
+
+
+class ETagCache:
+    """Client-side cache of JSON responses, revalidated with their ETags.
+
+    get_json sends the ETag of the last 200 response for the same URL and
+    parameters, and reuses that response's data when the server answers
+    304 Not Modified. Used by the terminal and Tkinter clients.
+    """
+
+    def __init__(self, size=ETAG_CACHE_SIZE):
+        """Keep up to size responses"""
+        self.size = size
+        self._entries = OrderedDict()  # (url, params) -> (etag, data)
+        self._lock = threading.Lock()
+
+    def get_json(self, url, headers=None, params=None, timeout=10):
+        """GET a JSON endpoint and return (status code, data)"""
+        key = (url, tuple(sorted((params or {}).items())))
+        with self._lock:
+            cached = self._entries.get(key)
+        headers = dict(headers or {})
+        if cached:
+            headers["If-None-Match"] = cached[0]
+        response = requests.get(url, headers=headers, params=params, timeout=timeout)
+        if response.status_code == 304 and cached:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+            return 200, cached[1]
+        data = response.json()
+        etag = response.headers.get("ETag")
+        if response.status_code == 200 and etag:
+            with self._lock:
+                self._entries[key] = (etag, data)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+        return response.status_code, data
+
+
+def read_events(response):
+    """Yield (event id, event type, data) for each message of a Server-Sent Events response"""
+    event_id, kind, data = None, "message", []
+    # chunk_size=None hands over each chunk as it arrives instead of waiting to fill a buffer
+    for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+        if not line:
+            if data:
+                yield event_id, kind, "\n".join(data)
+            kind, data = "message", []
+            continue
+        if line.startswith(":"):
+            continue  # heartbeat
+        field, _, value = line.partition(":")
+        value = value[1:] if value.startswith(" ") else value
+        if field == "id":
+            event_id = value
+        elif field == "event":
+            kind = value
+        elif field == "data":
+            data.append(value)
@@ -0,0 +1,52 @@
+import os
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so every process runs the jobs
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class MaintenanceLock:
+    """Picks the one server process that runs the background maintenance jobs.
+
+    Several processes (e.g. gunicorn workers) can share a database, but the
+    search indexer, spam re-scan, archiver and snapshotter should each run
+    in only one of them. claim takes an exclusive flock on path without
+    waiting and keeps it for the life of the process; when that process
+    exits the OS releases the lock, and the next claim in another process
+    takes over. With path None (e.g. an in-memory database, which no other
+    process can see) every claim succeeds.
+    """
+
+    def __init__(self, path):
+        """Lock path, which is created if missing"""
+        self.path = path
+        self._file = None
+
+    @classmethod
+    def for_database(cls, db_path):
+        """Return the lock for the database file at db_path"""
+        return cls(None if db_path in (None, "", ":memory:") else f"{db_path}.maintenance.lock")
+
+    def claim(self):
+        """Return True if this process holds the lock, taking it if it is free"""
+        if self._file is not None or self.path is None or fcntl is None:
+            return True
+        lock_file = open(self.path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        logger.info(f"Process {os.getpid()} runs the maintenance jobs ({self.path})")
+        return True
+
+    def release(self):
+        """Give the lock up so another process can claim it"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
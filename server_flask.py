@@ -1,13 +1,24 @@
 import argparse
+import hashlib
+import json
 import logging
 from flask import Flask, session, render_template
 from rssx.utils.config import Config
+from rssx.utils.event_bus import SSE_HEARTBEAT, SSE_MAX_CONNECTIONS, EventBus
+from rssx.utils.feed_cache import FEED_CACHE_SIZE, FEED_CACHE_TTL, FeedCache
+from rssx.utils.gzip_middleware import GZIP_LEVEL, GZIP_MIN_SIZE, GzipMiddleware
 from rssx.utils.logging_config import setup_logging
-from rssx.database.db import Database
+from rssx.utils.maintenance_lock import MaintenanceLock
+from rssx.database.db import Database, SEARCH_INDEX_BATCH_SIZE
+from rssx.database.backup import SNAPSHOT_KEEP
+from rssx.database.records import Comment
+from rssx.database.ids import MAX_NODE_ID, node_id, set_node_id
 from rssx.security.crypto import Security
+from rssx.security.blacklist import BlacklistMatcher
 from rssx.ui.web.web_controller import WebUI
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 import time
+import threading
 from collections import defaultdict, deque
 from flask_cors import CORS
 
@@ -16,7 +27,22 @@ logger = logging.getLogger(__name__)
 # In-memory throttling and spam filter state
 THROTTLE_LIMIT = 5  # max requests per user per minute
 THROTTLE_WINDOW = 60  # seconds
-BLACKLISTED_WORDS = []
+# Loaded from BLACKLIST_FILE in create_app and hot-reloaded when it changes
+BLACKLIST = BlacklistMatcher()
+
+SPAM_RESCAN_INTERVAL = 10  # seconds between blacklist file change checks
+SEARCH_INDEX_INTERVAL = 1.0  # seconds between search index catch-ups
+ARCHIVE_INTERVAL = 3600  # seconds between archiving runs
+
+# Feed pagination
+FEED_PAGE_SIZE = 20
+FEED_MAX_PAGE_SIZE = 100
+# Posts read from the database per step of a streamed feed
+FEED_STREAM_BATCH_SIZE = 100
+# Milliseconds an EventSource waits before reconnecting to /api/stream
+SSE_RETRY_MS = 3000
+COMMENTS_PAGE_SIZE = 50
+COMMENTS_MAX_PAGE_SIZE = 200
 user_post_times = defaultdict(lambda: deque(maxlen=THROTTLE_LIMIT))
 user_comment_times = defaultdict(lambda: deque(maxlen=THROTTLE_LIMIT))
 user_last_post_content = {}
@@ -24,10 +50,17 @@ user_last_comment_content = {}
 
 
 class RSSXApi:
-    def __init__(self, database, security):
-        """Initialize the API with database and security instances"""
+    def __init__(self, database, security, feed_cache=None, events=None):
+        """Initialize the API with a Storage backend and security instance.
+
+        feed_cache, a FeedCache fed by the backend's change callback, keeps
+        built feed pages between requests. events, an EventBus, receives the
+        posts, comments and votes written through the API for /api/stream.
+        """
         self.db = database
         self.security = security
+        self.feed_cache = feed_cache
+        self.events = events
         self.api = Blueprint("api", __name__)
         self.register_routes()
 
@@ -41,6 +74,9 @@ class RSSXApi:
         self.api.route("/post", methods=["POST"])(self.create_post)
         self.api.route("/feed", methods=["GET"])(self.get_feed)
         self.api.route("/post/<post_id>", methods=["GET"])(self.get_post)
+        self.api.route("/post/<post_id>/comments", methods=["GET"])(self.get_comments)
+        self.api.route("/search", methods=["GET"])(self.search)
+        self.api.route("/stream", methods=["GET"])(self.stream_events)
         self.api.route("/upvote", methods=["POST"])(self.upvote_post)
         self.api.route("/downvote", methods=["POST"])(self.downvote_post)
 
@@ -134,6 +170,7 @@ class RSSXApi:
         if not comment_id:
             logger.error(f"Failed to save federated comment from {federated_from}")
             return jsonify({"error": "Failed to save federated comment"}), 500
+        self._publish_comment(comment_id, comment_data)
         logger.info(
             f"Federated comment received from {federated_from} for post {post_id}"
         )
@@ -173,14 +210,12 @@ class RSSXApi:
                 logger.error(f"Error forwarding federated vote: {e}")
                 return jsonify({"error": "Network error forwarding vote to origin server"}), 502
         # Use voter as username for uniqueness
-        if vote_type == "upvote":
-            success = self.db.upvote_post(post_id, voter)
-        elif vote_type == "downvote":
-            success = self.db.downvote_post(post_id, voter)
-        else:
+        if vote_type not in ("upvote", "downvote"):
             return jsonify({"error": "Invalid vote_type"}), 400
-        if success:
-            return jsonify({"message": f"{vote_type} registered"}), 200
+        counts = self.db.vote(post_id, voter, vote_type)
+        if counts:
+            self._publish_vote(post_id, counts)
+            return jsonify({"message": f"{vote_type} registered", **counts}), 200
         else:
             return jsonify({"error": f"Failed to register {vote_type}"}), 400
 
@@ -219,12 +254,12 @@ class RSSXApi:
         user_last_comment_content[username] = content
 
         # Spam filter: block blacklisted words
-        for word in BLACKLISTED_WORDS:
-            if word.lower() in content.lower():
-                return (
-                    jsonify({"error": f"Spam detected: '{word}' is not allowed"}),
-                    400,
-                )
+        word = BLACKLIST.search(content)
+        if word:
+            return (
+                jsonify({"error": f"Spam detected: '{word}' is not allowed"}),
+                400,
+            )
 
         # Create comment data
         timestamp = int(time.time())
@@ -246,6 +281,7 @@ class RSSXApi:
         if not comment_id:
             logger.error(f"Failed to save comment for user: {username}")
             return jsonify({"error": "Failed to save comment"}), 500
+        self._publish_comment(comment_id, comment_data)
         logger.info(
             f"Comment created by {username} with ID: {comment_id} for post {post_id}"
         )
@@ -353,12 +389,12 @@ class RSSXApi:
         user_last_post_content[username] = content
 
         # Spam filter: block blacklisted words
-        for word in BLACKLISTED_WORDS:
-            if word.lower() in content.lower():
-                return (
-                    jsonify({"error": f"Spam detected: '{word}' is not allowed"}),
-                    400,
-                )
+        word = BLACKLIST.search(content)
+        if word:
+            return (
+                jsonify({"error": f"Spam detected: '{word}' is not allowed"}),
+                400,
+            )
 
         # Create post data
         timestamp = int(time.time())
@@ -376,6 +412,7 @@ class RSSXApi:
             logger.error(f"Failed to save post for user: {username}")
             return jsonify({"error": "Failed to save post"}), 500
 
+        self._publish_post(post_id)
         logger.info(f"Post created by {username} with ID: {post_id}")
         return (
             jsonify({"message": "Post created successfully", "post_id": post_id}),
@@ -398,10 +435,10 @@ class RSSXApi:
         post_id = data.get("post_id")
         if not post_id:
             return jsonify({"error": "post_id is required"}), 400
-        success = self.db.upvote_post(post_id, username)
-        self.db.remove_spam_posts()  # Update spam status after voting
-        if success:
-            return jsonify({"message": "Post upvoted successfully"}), 200
+        counts = self.db.upvote_post(post_id, username)
+        if counts:
+            self._publish_vote(post_id, counts)
+            return jsonify({"message": "Post upvoted successfully", **counts}), 200
         else:
             return (
                 jsonify(
@@ -426,10 +463,10 @@ class RSSXApi:
         post_id = data.get("post_id")
         if not post_id:
             return jsonify({"error": "post_id is required"}), 400
-        success = self.db.downvote_post(post_id, username)
-        self.db.remove_spam_posts()  # Update spam status after voting
-        if success:
-            return jsonify({"message": "Post downvoted successfully"}), 200
+        counts = self.db.downvote_post(post_id, username)
+        if counts:
+            self._publish_vote(post_id, counts)
+            return jsonify({"message": "Post downvoted successfully", **counts}), 200
         else:
             return (
                 jsonify(
@@ -439,39 +476,264 @@ class RSSXApi:
             )
 
     def get_feed(self):
-        """Get all posts sorted by author popularity and upvotes, including comments"""
-        posts = self.db.get_all_posts()
-        # Sort posts by author popularity and upvotes
-        posts.sort(
-            key=lambda post: (
-                self.db.get_user(post["author"]).get("popularity", 0),
-                post.get("upvotes", 0),
-            ),
-            reverse=True,
-        )
-        # Attach comments to each post
-        for post in posts:
-            comments = self.db.get_comments_for_post(post["id"])
-            # Format timestamp for comments
-            for comment in comments:
-                comment["timestamp_formatted"] = time.strftime(
-                    "%Y-%m-%d %H:%M:%S", time.localtime(comment["timestamp"])
-                )
-            post["comments"] = comments
-        return jsonify({"posts": posts}), 200
+        """Get one page of posts sorted by author popularity and upvotes, including comments.
+
+        Ranking happens once, in the get_posts_page query. Query parameters:
+        limit (default FEED_PAGE_SIZE), sort ("ranked" or "activity"),
+        cursor, the next_cursor value returned by the previous page, and
+        comments: "all" (the default) embeds every comment, a number K
+        embeds only the first K plus a comments_cursor for
+        /api/post/<post_id>/comments (null once all are shown), and 0 embeds
+        none. Each post carries comment_count and last_activity_at.
+
+        With stream=1 the response holds every post from cursor to the end
+        of the feed instead of one page (limit is ignored), written out
+        FEED_STREAM_BATCH_SIZE posts at a time as they are read, so memory
+        stays bounded however long the feed is.
+        """
+        try:
+            limit = int(request.args.get("limit", FEED_PAGE_SIZE))
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        limit = max(1, min(limit, FEED_MAX_PAGE_SIZE))
+        preview = request.args.get("comments", "all")
+        if preview != "all":
+            try:
+                preview = max(0, int(preview))
+            except ValueError:
+                return jsonify({"error": 'comments must be "all" or an integer'}), 400
+        stream = request.args.get("stream") in ("1", "true")
+        sort = request.args.get("sort", "ranked")
+        cursor = request.args.get("cursor")
+        # Pages (not streams) are served from the feed cache when they can be
+        cache = None if stream else self.feed_cache
+        key = ("api", sort, cursor, limit, preview)
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            body, etag, last_modified = cached
+            not_modified = self._not_modified(etag, last_modified)
+            if not_modified is not None:
+                return not_modified
+            return self._with_validators(Response(body, mimetype="application/json"), etag, last_modified)
+
+        generation = cache.generation() if cache is not None else None
+        etag, last_modified = self._data_validators()
+        not_modified = self._not_modified(etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        try:
+            posts, next_cursor = self.db.get_posts_page(FEED_STREAM_BATCH_SIZE if stream else limit, cursor, sort)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if stream:
+            response = Response(self._stream_feed(posts, next_cursor, sort, preview), mimetype="application/json")
+        else:
+            response = jsonify({"posts": self._feed_payload(posts, preview), "next_cursor": next_cursor})
+            if cache is not None:
+                cache.put(key, (response.get_data(), etag, last_modified), sort, (post.id for post in posts), generation)
+        return self._with_validators(response, etag, last_modified)
+
+    def _data_validators(self):
+        """Return (etag, last_modified) for responses built from posts and comments.
+
+        Both come from the database's data version, which every write to
+        posts or comments bumps. Returns (None, None) if it can't be read.
+        """
+        version = self.db.get_data_version()
+        if version is None:
+            return None, None
+        version, changed_at = version
+        return f"{version}.{changed_at}", changed_at
+
+    def _not_modified(self, etag, last_modified):
+        """Return a 304 response if the request's If-None-Match (or If-Modified-Since) still holds"""
+        if etag is None:
+            return None
+        if request.if_none_match:
+            fresh = request.if_none_match.contains_weak(etag)
+        elif request.if_modified_since and _date_settled(last_modified):
+            fresh = request.if_modified_since.timestamp() >= last_modified
+        else:
+            fresh = False
+        if not fresh:
+            return None
+        return self._with_validators(Response(status=304), etag, last_modified)
+
+    def _with_validators(self, response, etag, last_modified):
+        """Add ETag and Last-Modified to response and ask clients to revalidate before reuse"""
+        if etag is not None:
+            response.set_etag(etag, weak=True)
+            if _date_settled(last_modified):
+                response.last_modified = last_modified
+            response.cache_control.no_cache = True
+        return response
+
+    def _feed_payload(self, posts, preview):
+        """Turn a page of Post records into response dicts with their comments attached"""
+        # Comments are fetched for the whole page in one query
+        payload = [post.to_dict() for post in posts]
+        if preview == "all":
+            comments_by_post = self.db.get_comments_for_posts(post.id for post in posts)
+            for post in payload:
+                post["comments"] = self._format_comments(comments_by_post[post["id"]])
+        elif preview > 0:
+            previews = self.db.get_comment_previews((post.id for post in posts), preview)
+            for post in payload:
+                comments, post["comments_cursor"] = previews[post["id"]]
+                post["comments"] = self._format_comments(comments)
+        return payload
+
+    def _stream_feed(self, posts, cursor, sort, preview):
+        """Yield the JSON of a whole feed, one batch of posts at a time, starting with posts.
+
+        Each batch is a fresh keyset page, so no database connection is held
+        while the client reads.
+        """
+        yield '{"posts":['
+        separator = ""
+        while True:
+            for post in self._feed_payload(posts, preview):
+                # Encoded like jsonify, so both modes return the same bytes per post
+                yield separator + json.dumps(post, separators=(",", ":"), sort_keys=True)
+                separator = ","
+            if cursor is None:
+                break
+            try:
+                posts, cursor = self.db.get_posts_page(FEED_STREAM_BATCH_SIZE, cursor, sort)
+            except ValueError as e:
+                logger.error(f"Feed stream stopped: {str(e)}")
+                break
+        yield '],"next_cursor":null}'
+
+    def stream_events(self):
+        """Stream new posts, comments, votes and spam flags as Server-Sent Events.
+
+        Events: post (the post), comment (the comment), vote (post_id,
+        upvotes, downvotes, spam), spam (post_id, or null when the blacklist
+        flagged several posts) and reset, sent when events were missed: the
+        client should reload what it shows. A reconnecting client resumes
+        after its Last-Event-ID header (or last_event_id parameter).
+        """
+        if self.events is None:
+            return jsonify({"error": "Event stream is disabled"}), 404
+        last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+        subscription = self.events.subscribe(last_event_id)
+        if subscription is None:
+            response = jsonify({"error": "Too many open event streams, try again later"})
+            response.status_code = 503
+            response.headers["Retry-After"] = str(SSE_RETRY_MS // 1000)
+            return response
+        response = Response(self._event_stream(subscription), mimetype="text/event-stream")
+        # The generator's own cleanup never runs if it is not started, as for
+        # HEAD or a client gone before the first read
+        response.call_on_close(lambda: self.events.unsubscribe(subscription))
+        response.headers["Cache-Control"] = "no-cache"
+        # Keep reverse proxies from buffering the stream
+        response.headers["X-Accel-Buffering"] = "no"
+        return response
+
+    def _event_stream(self, subscription):
+        """Yield SSE messages for subscription until its client disconnects or falls behind"""
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            if subscription.reset:
+                yield f"id: {subscription.reset}\nevent: reset\ndata: {{}}\n\n"
+            # An overflowed queue is dropped: the client reconnects and resumes
+            while not subscription.overflowed:
+                event = subscription.next(self.events.heartbeat)
+                yield ": heartbeat\n\n" if event is None else event.text
+        finally:
+            self.events.unsubscribe(subscription)
+
+    def _publish_post(self, post_id):
+        """Send a saved post to /api/stream"""
+        if self.events is None:
+            return
+        post = self.db.get_post_by_id(post_id)
+        if post:
+            self.events.publish("post", post.to_dict())
+
+    def _publish_comment(self, comment_id, comment_data):
+        """Send a saved comment to /api/stream"""
+        if self.events is None:
+            return
+        comment = Comment(**dict({field: comment_data.get(field) for field in Comment._fields}, id=comment_id))
+        self.events.publish("comment", self._format_comments([comment])[0])
+
+    def _publish_vote(self, post_id, counts):
+        """Send a post's counters after a vote to /api/stream, and a spam event if the vote flagged it"""
+        if self.events is None:
+            return
+        self.events.publish("vote", dict(counts, post_id=post_id))
+        if counts.get("spam"):
+            self.events.publish("spam", {"post_id": post_id})
+
+    def get_comments(self, post_id):
+        """Get one page of a post's comments, oldest first.
+
+        Query parameters: limit (default COMMENTS_PAGE_SIZE) and cursor, the
+        next_cursor of the previous page or a feed post's comments_cursor.
+        """
+        try:
+            limit = int(request.args.get("limit", COMMENTS_PAGE_SIZE))
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        limit = max(1, min(limit, COMMENTS_MAX_PAGE_SIZE))
+        cursor = request.args.get("cursor")
+        etag, last_modified = self._data_validators()
+        not_modified = self._not_modified(etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        try:
+            comments, next_cursor = self.db.get_comments_page(post_id, limit, cursor)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if not comments and not cursor and not self.db.get_post_by_id(post_id):
+            return jsonify({"error": "Post not found"}), 404
+        response = jsonify({"comments": self._format_comments(comments), "next_cursor": next_cursor})
+        return self._with_validators(response, etag, last_modified)
+
+    def _format_comments(self, comments):
+        """Turn Comment records into response dicts with timestamp_formatted added"""
+        payload = []
+        for comment in comments:
+            comment_dict = comment.to_dict()
+            comment_dict["timestamp_formatted"] = time.strftime(
+                "%Y-%m-%d %H:%M:%S", time.localtime(comment.timestamp)
+            )
+            payload.append(comment_dict)
+        return payload
+
+    def search(self):
+        """Full-text search over posts and comments, best matches first.
+
+        Query parameters: q (required), limit (default FEED_PAGE_SIZE) and
+        cursor, the next_cursor value returned by the previous page.
+        """
+        query = request.args.get("q", "")
+        try:
+            limit = int(request.args.get("limit", FEED_PAGE_SIZE))
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        limit = max(1, min(limit, FEED_MAX_PAGE_SIZE))
+        try:
+            results, next_cursor = self.db.search(query, limit, request.args.get("cursor"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"results": results, "next_cursor": next_cursor}), 200
 
     def get_post(self, post_id):
         """Get a specific post by ID, including comments"""
+        etag, last_modified = self._data_validators()
+        not_modified = self._not_modified(etag, last_modified)
+        if not_modified is not None:
+            return not_modified
         post = self.db.get_post_by_id(post_id)
         if not post:
             return jsonify({"error": "Post not found"}), 404
-        comments = self.db.get_comments_for_post(post_id)
-        for comment in comments:
-            comment["timestamp_formatted"] = time.strftime(
-                "%Y-%m-%d %H:%M:%S", time.localtime(comment["timestamp"])
-            )
-        post["comments"] = comments
-        return jsonify({"post": post}), 200
+        payload = post.to_dict()
+        payload["comments"] = self._format_comments(self.db.get_comments_for_post(post_id))
+        return self._with_validators(jsonify({"post": payload}), etag, last_modified)
 
     def list_servers(self):
         """List all connected servers"""
@@ -547,8 +809,13 @@ class RSSXApi:
         return jsonify({"profile": profile}), 200
 
     def health_check(self):
-        """Health check endpoint"""
-        return jsonify({"status": "ok", "timestamp": int(time.time())}), 200
+        """Health check endpoint, with the feed cache's and event stream's counters when they are on"""
+        health = {"status": "ok", "timestamp": int(time.time())}
+        if self.feed_cache is not None:
+            health["feed_cache"] = self.feed_cache.stats()
+        if self.events is not None:
+            health["events"] = self.events.stats()
+        return jsonify(health), 200
 
     def get_public_key(self):
         """Expose the server's public key in PEM format for federation encryption"""
@@ -558,7 +825,12 @@ class RSSXApi:
             encoding=serialization.Encoding.PEM,
             format=serialization.PublicFormat.SubjectPublicKeyInfo,
         ).decode()
-        return jsonify({"public_key": pem})
+        # The key only changes when the server's key files do, so it is its own validator
+        etag = hashlib.sha256(pem.encode()).hexdigest()[:32]
+        not_modified = self._not_modified(etag, None)
+        if not_modified is not None:
+            return not_modified
+        return self._with_validators(jsonify({"public_key": pem}), etag, None)
 
     def receive_post(self):
         """Receive a federated post encrypted for this server"""
@@ -602,10 +874,117 @@ class RSSXApi:
         if not post_id:
             logger.error(f"Failed to save federated post from {federated_from}")
             return jsonify({"error": "Failed to save federated post"}), 500
+        self._publish_post(post_id)
         logger.info(f"Federated post received from {federated_from} with ID: {post_id}")
         return jsonify({"message": "Federated post received", "post_id": post_id}), 201
 
 
+def _date_settled(last_modified):
+    """Return True if last_modified (whole seconds) is before the current second.
+
+    Until then another write can land in the same second without changing
+    the date, so the date can't tell a client's copy from the newer data and
+    only the ETag is used.
+    """
+    return last_modified is not None and last_modified < int(time.time())
+
+
+def _runs_maintenance(lock):
+    """Return True if this process should run maintenance jobs; see MaintenanceLock"""
+    return lock is None or lock.claim()
+
+
+def start_spam_rescan_scheduler(db, interval=SPAM_RESCAN_INTERVAL, lock=None):
+    """Hot-reload BLACKLIST and re-scan posts for spam when it changes.
+
+    Vote-based spam flags are maintained per post inside each vote, so the
+    full table scan only runs when the blacklist is different from the one
+    recorded after the last scan. Checking the file costs one stat call.
+    Every process reloads its BLACKLIST; only the one holding lock re-scans.
+    """
+    stop = threading.Event()
+
+    def run():
+        changed = True  # the startup check compares against the stored fingerprint
+        held = False
+        while True:
+            try:
+                # A process that just took over checks too: the previous one may have missed a change
+                if _runs_maintenance(lock) and (changed or not held):
+                    held = True
+                    db.rescan_spam_if_blacklist_changed(BLACKLIST)
+            except Exception as e:
+                logger.error(f"Spam re-scan failed: {str(e)}")
+            if stop.wait(interval):
+                return
+            changed = BLACKLIST.reload_if_changed()
+
+    thread = threading.Thread(target=run, name="spam-rescan", daemon=True)
+    thread.start()
+    return stop
+
+
+def start_search_indexer(db, interval=SEARCH_INDEX_INTERVAL, lock=None):
+    """Add newly saved posts and comments to the search index in the background.
+
+    Saves only queue rows for indexing, so new content becomes searchable
+    within about one interval. Runs only while this process holds lock.
+    """
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            if not _runs_maintenance(lock):
+                continue
+            try:
+                # Keep going while full batches come back, i.e. a backlog remains
+                while db.index_pending_search() == SEARCH_INDEX_BATCH_SIZE:
+                    pass
+            except Exception as e:
+                logger.error(f"Search indexing failed: {str(e)}")
+
+    thread = threading.Thread(target=run, name="search-indexer", daemon=True)
+    thread.start()
+    return stop
+
+
+def start_archiver(db, max_age_days, interval=ARCHIVE_INTERVAL, lock=None):
+    """Move posts older than max_age_days into the archive files, once per interval, while holding lock"""
+    stop = threading.Event()
+
+    def run():
+        while True:
+            try:
+                if _runs_maintenance(lock):
+                    db.archive_old_posts(max_age_days)
+            except Exception as e:
+                logger.error(f"Archiving failed: {str(e)}")
+            if stop.wait(interval):
+                return
+
+    thread = threading.Thread(target=run, name="archiver", daemon=True)
+    thread.start()
+    return stop
+
+
+def start_snapshotter(db, snapshot_dir, interval, keep=SNAPSHOT_KEEP, lock=None):
+    """Back the database up into snapshot_dir every interval seconds, keeping the keep newest, while holding lock"""
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            if not _runs_maintenance(lock):
+                continue
+            try:
+                db.snapshot(snapshot_dir, keep)
+            except Exception as e:
+                logger.error(f"Snapshot failed: {str(e)}")
+
+    thread = threading.Thread(target=run, name="snapshotter", daemon=True)
+    thread.start()
+    return stop
+
+
 def create_app(config=None):
     """Create and configure the Flask application"""
     if config is None:
@@ -619,8 +998,69 @@ def create_app(config=None):
     logger.info("Starting RSSX Server")
 
     # Initialize database
-    db = Database(config.get("DB_PATH"))
-    logger.info(f"Database initialized at {config.get('DB_PATH')}")
+    if config.get("NODE_ID") is not None:
+        set_node_id(config.get("NODE_ID"))
+    node, pinned = node_id()
+    if not pinned:
+        # Only the low bits of the PID are used, so two workers can share a node
+        # ID and create the same post or comment ID in the same millisecond
+        logger.warning(
+            f"NODE_ID is not set; using node ID {node} from the process ID. "
+            f"Set a distinct NODE_ID (0-{MAX_NODE_ID}) or RSSX_NODE_ID for each server process sharing a database"
+        )
+    db_options = dict(
+        pool_size=config.get("DB_POOL_SIZE", 8),
+        busy_timeout=config.get("DB_BUSY_TIMEOUT", 5.0),
+        write_batch_size=config.get("WRITE_BATCH_SIZE", 0),
+        write_batch_delay=config.get("WRITE_BATCH_DELAY_MS", 0) / 1000,
+        archive_dir=config.get("ARCHIVE_DIR"),
+        compress_threshold=config.get("COMPRESS_CONTENT_OVER", 0),
+    )
+    if config.get("DB_URL"):
+        # Imported here so SQLAlchemy is only needed when it is configured
+        from rssx.database.sqlalchemy_backend import SQLAlchemyDatabase
+
+        db = SQLAlchemyDatabase(config.get("DB_URL"), **db_options)
+        logger.info(f"Database initialized at {config.get('DB_URL')} (SQLAlchemy)")
+    else:
+        db = Database(config.get("DB_PATH"), **db_options)
+        logger.info(f"Database initialized at {config.get('DB_PATH')}")
+
+    BLACKLIST.use_file(config.get("BLACKLIST_FILE", "blacklist.txt"))
+    # Worker processes sharing the database leave the jobs below to one of them
+    maintenance = MaintenanceLock.for_database(db.pool.db_path)
+    start_spam_rescan_scheduler(db, config.get("SPAM_RESCAN_INTERVAL", SPAM_RESCAN_INTERVAL), maintenance)
+    start_search_indexer(db, config.get("SEARCH_INDEX_INTERVAL", SEARCH_INDEX_INTERVAL), maintenance)
+    if config.get("ARCHIVE_AFTER_DAYS"):
+        start_archiver(
+            db, config.get("ARCHIVE_AFTER_DAYS"), config.get("ARCHIVE_INTERVAL", ARCHIVE_INTERVAL), maintenance
+        )
+    if config.get("SNAPSHOT_INTERVAL"):
+        start_snapshotter(
+            db,
+            config.get("SNAPSHOT_DIR", "db_backups"),
+            config.get("SNAPSHOT_INTERVAL"),
+            config.get("SNAPSHOT_KEEP", SNAPSHOT_KEEP),
+            maintenance,
+        )
+
+    feed_cache = None
+    if config.get("FEED_CACHE_SIZE", FEED_CACHE_SIZE) > 0:
+        feed_cache = FeedCache(config.get("FEED_CACHE_SIZE", FEED_CACHE_SIZE), config.get("FEED_CACHE_TTL", FEED_CACHE_TTL))
+    events = None
+    if config.get("SSE_MAX_CONNECTIONS", SSE_MAX_CONNECTIONS) > 0:
+        events = EventBus(
+            config.get("SSE_MAX_CONNECTIONS", SSE_MAX_CONNECTIONS), heartbeat=config.get("SSE_HEARTBEAT", SSE_HEARTBEAT)
+        )
+
+    def on_change(event, post_id=None):
+        if feed_cache is not None:
+            feed_cache.on_change(event, post_id)
+        # Blacklist re-scans flag posts outside the API's write paths
+        if event == "spam" and events is not None:
+            events.publish("spam", {"post_id": None})
+
+    db.set_change_callback(on_change)
 
     # Initialize security
     security = Security(config.config)
@@ -635,6 +1075,10 @@ def create_app(config=None):
     CORS(app)
     app.config["SECRET_KEY"] = config.get("JWT_SECRET_KEY")
     app.config["SESSION_TYPE"] = "filesystem"
+    if config.get("GZIP_LEVEL", GZIP_LEVEL) > 0:
+        app.wsgi_app = GzipMiddleware(
+            app.wsgi_app, config.get("GZIP_LEVEL", GZIP_LEVEL), config.get("GZIP_MIN_SIZE", GZIP_MIN_SIZE)
+        )
 
     # Register index route here, after app is defined
     @app.route("/")
@@ -650,6 +1094,7 @@ def create_app(config=None):
                     "/api/register",
                     "/api/login",
                     "/api/feed",
+                    "/api/search",
                     "/api/post",
                     "/api/list_servers",
                     "/api/add_server",
@@ -658,13 +1103,13 @@ def create_app(config=None):
             }
 
     # Initialize API
-    api = RSSXApi(db, security)
+    api = RSSXApi(db, security, feed_cache, events)
     app.register_blueprint(api.api, url_prefix="/api")
     logger.info("API registered at /api")
 
     # Initialize Web UI if enabled
     if config.get("ENABLE_WEB_UI"):
-        web_ui = WebUI(db, security, config)
+        web_ui = WebUI(db, security, config, feed_cache, events)
         app.register_blueprint(web_ui.web, url_prefix="/")
         logger.info("Web UI registered at /")
     return app
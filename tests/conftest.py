@@ -0,0 +1,70 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine
+
+from rssx.database.db import Database
+from rssx.database.sqlalchemy_backend import SQLAlchemyDatabase
+
+
+def archive_dir(tmp):
+    return os.path.join(tmp, "archive")
+
+
+# Every Storage backend the server can run on; storage tests run against each
+BACKENDS = {
+    "sqlite3 file": lambda tmp: Database(
+        os.path.join(tmp, "conformance.db"), archive_dir=archive_dir(tmp)
+    ),
+    "sqlite3 file + write queue": lambda tmp: Database(
+        os.path.join(tmp, "conformance.db"), write_batch_size=50, archive_dir=archive_dir(tmp)
+    ),
+    "sqlite3 file + compression": lambda tmp: Database(
+        os.path.join(tmp, "conformance.db"), archive_dir=archive_dir(tmp), compress_threshold=64
+    ),
+    "sqlite3 memory": lambda tmp: Database(":memory:", archive_dir=archive_dir(tmp)),
+    "sqlalchemy file": lambda tmp: SQLAlchemyDatabase(
+        "sqlite:///" + os.path.join(tmp, "conformance.db"), archive_dir=archive_dir(tmp)
+    ),
+    "sqlalchemy memory": lambda tmp: SQLAlchemyDatabase("sqlite://", archive_dir=archive_dir(tmp)),
+    # An engine built by the caller, without create_sqlite_engine's connect arguments
+    "sqlalchemy given engine": lambda tmp: SQLAlchemyDatabase(
+        engine=create_engine("sqlite:///" + os.path.join(tmp, "conformance.db")), archive_dir=archive_dir(tmp)
+    ),
+}
+
+
+@pytest.fixture(params=list(BACKENDS), ids=list(BACKENDS))
+def db(request, tmp_path):
+    """A fresh, empty database on each backend"""
+    database = BACKENDS[request.param](str(tmp_path))
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Return a function building the Flask app on db_path, with config overrides"""
+    from rssx.utils.config import Config
+    import server_flask
+
+    apps = []
+
+    def build(db_path=None, **overrides):
+        config = Config(str(tmp_path / "config.json"))
+        config.config.update(
+            DB_PATH=db_path or str(tmp_path / "rssx.db"),
+            LOG_FILE=str(tmp_path / "rssx.log"),
+            PUBLIC_KEY_FILE=str(tmp_path / "public.pem"),
+            PRIVATE_KEY_FILE=str(tmp_path / "private.pem"),
+            ENABLE_WEB_UI=False,
+            SEARCH_INDEX_INTERVAL=3600,
+        )
+        config.config.update(overrides)
+        app = server_flask.create_app(config)
+        apps.append(app)
+        return app
+
+    yield build
+    for app in apps:
+        app.view_functions["api.get_feed"].__self__.db.close()
@@ -0,0 +1,10 @@
+def make_post(db, content="hello world", author="alice", timestamp=1, **extra):
+    return db.save_post(
+        dict({"author": author, "content": content, "timestamp": timestamp, "signature": "sig"}, **extra)
+    )
+
+
+def make_comment(db, post_id, content="nice post", author="bob", timestamp=2):
+    return db.save_comment(
+        {"author": author, "content": content, "timestamp": timestamp, "post_id": post_id, "signature": "sig"}
+    )
@@ -0,0 +1,40 @@
+from werkzeug.http import http_date
+
+import server_flask
+
+
+def bump_data_version(db, changed_at):
+    with db.pool.connection() as conn:
+        conn.execute("UPDATE data_version SET version = version + 1, changed_at = ? WHERE id = 1", (changed_at,))
+        conn.commit()
+
+
+def test_if_none_match(make_app):
+    client = make_app(FEED_CACHE_SIZE=0).test_client()
+    etag = client.get("/api/feed").headers["ETag"]
+    assert client.get("/api/feed", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/api/feed", headers={"If-None-Match": 'W/"0.0"'}).status_code == 200
+
+
+def test_if_modified_since_with_two_writes_in_one_second(make_app, monkeypatch):
+    app = make_app(FEED_CACHE_SIZE=0)
+    client = app.test_client()
+    db = app.view_functions["api.get_feed"].__self__.db
+    second = db.get_data_version()[1] + 100
+    monkeypatch.setattr(server_flask.time, "time", lambda: second + 0.2)
+    bump_data_version(db, second)
+    # Read between two writes in the same second: no date to revalidate with
+    response = client.get("/api/feed")
+    assert response.status_code == 200 and "Last-Modified" not in response.headers
+    bump_data_version(db, second)
+    response = client.get("/api/feed", headers={"If-Modified-Since": http_date(second)})
+    assert response.status_code == 200
+
+    # Once the second is over the date is safe to use
+    monkeypatch.setattr(server_flask.time, "time", lambda: second + 1.2)
+    response = client.get("/api/feed")
+    assert response.headers["Last-Modified"] == http_date(second)
+    headers = {"If-Modified-Since": response.headers["Last-Modified"]}
+    assert client.get("/api/feed", headers=headers).status_code == 304
+    bump_data_version(db, second + 1)
+    assert client.get("/api/feed", headers=headers).status_code == 200
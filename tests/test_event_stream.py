@@ -0,0 +1,15 @@
+"""/api/stream must give back its subscription however the response ends"""
+
+
+def test_closed_streams_release_subscriptions(make_app):
+    app = make_app()
+    client = app.test_client()
+    events = app.view_functions["api.get_feed"].__self__.events
+    # HEAD and an unread GET never start the stream generator
+    client.head("/api/stream").close()
+    client.get("/api/stream", buffered=False).close()
+    response = client.get("/api/stream", buffered=False)
+    next(response.response)
+    assert events.stats()["connections"] == 1
+    response.close()
+    assert events.stats()["connections"] == 0
@@ -0,0 +1,57 @@
+"""GET /api/feed must run the same small number of SQL statements at any size.
+
+The count must not depend on how many posts, comments or authors the
+database holds, including posts by federated authors with no local user row.
+"""
+from flask import Flask
+
+from rssx.database.db import Database
+from server_flask import RSSXApi
+
+MAX_STATEMENTS = 4
+SIZES = (10, 100, 1000)
+
+
+def seed(db, posts):
+    with db.pool.connection() as conn:
+        conn.executemany(
+            "INSERT INTO users (username, password, created_at, popularity) VALUES (?, 'x', 0, ?)",
+            ((f"user{i}", i) for i in range(20)),
+        )
+        conn.executemany(
+            "INSERT INTO posts (id, author, content, timestamp, signature, federated_from) VALUES (?, ?, ?, ?, '', ?)",
+            (
+                # Every fifth post comes from a federated author with no users row
+                (f"p{i}", f"remote{i}" if i % 5 == 0 else f"user{i % 20}", f"post {i}", i,
+                 "peer.example" if i % 5 == 0 else None)
+                for i in range(posts)
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO comments (author, timestamp, content, post_id, signature) VALUES ('user1', ?, 'hi', ?, '')",
+            ((i, f"p{i % posts}") for i in range(posts * 3)),
+        )
+        conn.commit()
+
+
+def count_statements(db_path, size, limit=100):
+    statements = []
+    db = Database(db_path)
+    try:
+        seed(db, size)
+        app = Flask(__name__)
+        app.register_blueprint(RSSXApi(db, security=None).api, url_prefix="/api")
+        db.pool.set_trace_callback(statements.append)
+        response = app.test_client().get(f"/api/feed?limit={limit}")
+        db.pool.set_trace_callback(None)
+    finally:
+        db.close()
+    assert response.status_code == 200, response.data
+    # Trigger bodies are reported with a leading "--"; only count real statements
+    return sum(1 for sql in statements if not sql.startswith("--"))
+
+
+def test_statement_count_is_constant(tmp_path):
+    counts = {size: count_statements(str(tmp_path / f"feed{size}.db"), size) for size in SIZES}
+    assert len(set(counts.values())) == 1, counts
+    assert max(counts.values()) <= MAX_STATEMENTS, counts
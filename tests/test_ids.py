@@ -0,0 +1,29 @@
+import os
+
+from rssx.database import ids
+
+
+def test_pid_node_id_is_not_pinned(monkeypatch):
+    monkeypatch.delenv("RSSX_NODE_ID", raising=False)
+    generator = ids.IdGenerator()
+    assert not generator.pinned and generator.node_id == os.getpid() & ids.MAX_NODE_ID
+    generator.set_node_id(35)
+    assert generator.pinned and generator.node_id == 3
+    monkeypatch.setenv("RSSX_NODE_ID", "7")
+    assert ids.IdGenerator().pinned
+
+
+def test_ids_increase():
+    generator = ids.IdGenerator(node_id=1)
+    values = [generator.next_id() for _ in range(1000)]
+    assert values == sorted(set(values))
+
+
+def test_startup_warns_about_pid_node_id(make_app, monkeypatch, caplog):
+    monkeypatch.delenv("RSSX_NODE_ID", raising=False)
+    monkeypatch.setattr(ids, "_generator", ids.IdGenerator())
+    make_app()
+    assert "NODE_ID is not set" in caplog.text
+    caplog.clear()
+    make_app(NODE_ID=2)
+    assert "NODE_ID is not set" not in caplog.text
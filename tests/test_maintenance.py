@@ -0,0 +1,49 @@
+import os
+import time
+
+from rssx.database.backup import prune_snapshots
+from rssx.database.db import Database
+from rssx.utils.maintenance_lock import MaintenanceLock
+from server_flask import start_search_indexer
+from tests.helpers import make_post
+
+
+def test_one_holder_per_database(tmp_path):
+    db_path = str(tmp_path / "rssx.db")
+    first, second = MaintenanceLock.for_database(db_path), MaintenanceLock.for_database(db_path)
+    assert first.claim() and first.claim()
+    assert not second.claim()
+    first.release()
+    assert second.claim()
+    second.release()
+    assert MaintenanceLock.for_database(":memory:").claim()
+
+
+def test_jobs_run_only_in_the_holder(tmp_path):
+    db = Database(str(tmp_path / "rssx.db"))
+    other = MaintenanceLock.for_database(db.pool.db_path)
+    assert other.claim()
+    stop = start_search_indexer(db, 0.05, MaintenanceLock.for_database(db.pool.db_path))
+    try:
+        make_post(db, content="a searchable fox")
+        time.sleep(0.3)
+        assert db.search("fox")[0] == []
+        # The holder went away; this process takes over on its next run
+        other.release()
+        deadline = time.monotonic() + 5
+        while not db.search("fox")[0] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert len(db.search("fox")[0]) == 1
+    finally:
+        stop.set()
+        db.close()
+
+
+def test_prune_skips_snapshots_already_removed(tmp_path, monkeypatch):
+    names = [f"rssx-2000010{day}-000000.db" for day in range(1, 5)]
+    for name in names:
+        (tmp_path / name).touch()
+    listed = [str(tmp_path / name) for name in reversed(names)]
+    os.remove(listed[-1])  # another process pruned it after the listing
+    monkeypatch.setattr("rssx.database.backup.list_snapshots", lambda snapshot_dir: listed)
+    assert prune_snapshots(str(tmp_path), keep=2) == [listed[2]]
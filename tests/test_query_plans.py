@@ -0,0 +1,106 @@
+"""No Database query may fall back to a full table scan.
+
+Every public Database method is exercised against a seeded database while
+the pool's trace callback records the SQL it runs. Each distinct statement
+is then run through EXPLAIN QUERY PLAN; a plain "SCAN <table>" step (one
+that is not walking an index) fails unless the statement is in
+ALLOWED_SCANS.
+"""
+import re
+import sqlite3
+
+from rssx.database.compression import register_functions
+from rssx.database.db import Database
+
+# Statements that are meant to read a whole table, with the reason.
+ALLOWED_SCANS = {
+    "SELECT url FROM servers": "lists every federated server",
+    "UPDATE posts SET spam = 1 WHERE downvotes > upvotes": "full spam re-scan",
+    "SELECT rowid, content FROM posts WHERE spam = 0": "full spam re-scan",
+    "SELECT kind, ref FROM search_pending LIMIT": "drains the search queue from the front",
+    "SELECT k, v FROM 'main'.": "FTS5 loading its small config table",
+}
+
+FULL_SCAN = re.compile(r"\bSCAN (?!CONSTANT ROW)[\w.]+(?![\w.])(?! USING (?:COVERING )?INDEX| VIRTUAL TABLE INDEX)")
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def exercise(db):
+    """Call every public Database method at least once"""
+    db.save_user("alice", "x")
+    db.save_user("bob", "x")
+    db.get_user("alice")
+    db.update_login_time("alice")
+    for i in range(50):
+        db.save_post(
+            {
+                "id": f"p{i}",
+                "author": "alice" if i % 2 else "bob",
+                "content": f"post {i}",
+                "timestamp": i,
+                "signature": "",
+            }
+        )
+    db.get_all_posts()
+    posts, cursor = db.get_posts_page(10)
+    db.get_posts_page(10, cursor)
+    posts, cursor = db.get_posts_page(10, sort="activity")
+    db.get_posts_page(10, cursor, sort="activity")
+    db.get_post_by_id("p1")
+    db.update_post("p1", "edited")
+    db.add_server("http://peer.example")
+    db.get_all_servers()
+    db.save_comment(
+        {"author": "bob", "timestamp": 1, "content": "hi", "post_id": "p1", "signature": ""}
+    )
+    db.get_comments_for_post("p1")
+    db.get_comments_for_posts([f"p{i}" for i in range(10)])
+    comments, cursor = db.get_comments_page("p1", 1)
+    db.get_comments_page("p1", 1, cursor)
+    db.get_comment_previews([f"p{i}" for i in range(10)], 2)
+    db.upvote_post("p1", "bob")
+    db.downvote_post("p1", "bob")
+    db.downvote_post("p2", "alice")
+    db.upvote_post("p2", "alice")
+    db.index_pending_search()
+    results, cursor = db.search("post", 5)
+    db.search("post", 5, cursor)
+    db.remove_spam_posts(["spam"])
+    db.rescan_spam_if_blacklist_changed(["spam", "scam"])
+    db.archive_old_posts(30, batch_size=20)
+
+
+def is_allowed(sql):
+    return any(sql.startswith(prefix) for prefix in ALLOWED_SCANS)
+
+
+def test_statements_use_an_index(tmp_path):
+    statements = []
+
+    def record(sql):
+        head = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+        if head in ("SELECT", "UPDATE", "DELETE", "INSERT", "WITH"):
+            statements.append(" ".join(sql.split()))
+
+    db_path = str(tmp_path / "plans.db")
+    db = Database(db_path, archive_dir=str(tmp_path / "archive"))
+    try:
+        db.pool.set_trace_callback(record)
+        exercise(db)
+        db.pool.set_trace_callback(None)
+    finally:
+        db.close()
+
+    conn = sqlite3.connect(db_path)
+    register_functions(conn)
+    failures = []
+    try:
+        # One representative per statement shape, ignoring bound values
+        shapes = {LITERAL.sub("?", sql): sql for sql in statements}
+        for sql in shapes.values():
+            plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+            if any(FULL_SCAN.search(step) for step in plan) and not is_allowed(sql):
+                failures.append(f"{sql}\n    " + "\n    ".join(plan))
+    finally:
+        conn.close()
+    assert not failures, "statements fall back to a full table scan:\n" + "\n".join(failures)
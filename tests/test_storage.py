@@ -0,0 +1,315 @@
+"""Behaviour every Storage backend must share.
+
+Each test gets a fresh, empty backend (the db fixture in conftest.py) and
+exercises part of the Storage interface the way RSSXApi and WebUI use it.
+"""
+import os
+import threading
+import time
+
+import pytest
+
+from rssx.database.db import Database
+from rssx.database.storage import Storage
+from tests.helpers import make_comment, make_post
+
+
+def test_implements_storage(db):
+    assert isinstance(db, Storage)
+
+
+def test_connection_settings(db):
+    with db.pool.connection() as conn:
+        settings = {
+            name: conn.execute(f"PRAGMA {name}").fetchone()[0] for name in ("busy_timeout", "synchronous", "temp_store")
+        }
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    assert settings == {"busy_timeout": 5000, "synchronous": 1, "temp_store": 2}
+    assert journal_mode == ("memory" if db.pool.db_path == ":memory:" else "wal")
+
+
+def test_write_waits_for_another_writer(db):
+    if db.pool.db_path == ":memory:":
+        pytest.skip("in-memory backends share one connection, so writers take turns in the pool")
+    saved = []
+    with db.pool.connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("INSERT INTO servers (url) VALUES ('http://busy.example')")
+        writer = threading.Thread(target=lambda: saved.append(make_post(db)))
+        writer.start()
+        time.sleep(0.3)
+        # Still waiting on the write lock rather than failing with "database is locked"
+        assert writer.is_alive()
+        conn.commit()
+    writer.join(5)
+    assert saved and saved[0] is not None
+    assert db.get_all_servers() == ["http://busy.example"]
+
+
+def test_users(db):
+    assert db.get_user("alice") is None
+    assert db.save_user("alice", "hash1")
+    assert db.get_user("alice") == {"username": "alice", "password": "hash1"}
+    assert db.save_user("alice", "hash2")
+    assert db.get_user("alice")["password"] == "hash2"
+    assert db.update_login_time("alice")
+
+
+def test_posts(db):
+    post_id = make_post(db)
+    assert isinstance(post_id, str)
+    post = db.get_post_by_id(post_id)
+    assert post["content"] == "hello world" and post["author"] == "alice"
+    assert post["upvotes"] == 0 and post["downvotes"] == 0 and not post["spam"]
+    assert db.get_post_by_id("missing") is None
+    assert db.update_post(post_id, "edited")
+    assert db.get_post_by_id(post_id)["content"] == "edited"
+    assert not db.update_post("missing", "edited")
+    # Explicit IDs (federated posts) are kept as given
+    assert make_post(db, id="remote-1", federated_from="peer.example") == "remote-1"
+    assert make_post(db, id="remote-1") is None
+
+
+def test_feed_pages(db):
+    db.save_user("popular", "x")
+    db.vote(make_post(db, author="popular"), "seed", "upvote")
+    ids = [make_post(db, content=f"post {i}", timestamp=i) for i in range(25)]
+    seen = []
+    posts, cursor = db.get_posts_page(10)
+    assert posts[0]["author"] == "popular"
+    seen.extend(posts)
+    while cursor:
+        posts, cursor = db.get_posts_page(10, cursor)
+        seen.extend(posts)
+    assert len(seen) == 26 and len({post["id"] for post in seen}) == 26
+    assert set(ids) <= {post["id"] for post in seen}
+    # Newest first among equally ranked posts
+    rest = [post["timestamp"] for post in seen[1:]]
+    assert rest == sorted(rest, reverse=True)
+    with pytest.raises(ValueError):
+        db.get_posts_page(10, "not a cursor")
+
+
+def test_comments(db):
+    first, second = make_post(db), make_post(db)
+    comment_ids = [make_comment(db, first, f"c{i}", timestamp=10 - i) for i in range(3)]
+    assert len(set(comment_ids)) == 3
+    assert [c["content"] for c in db.get_comments_for_post(first)] == ["c2", "c1", "c0"]
+    batched = db.get_comments_for_posts([first, second, "missing"])
+    assert batched[first] == db.get_comments_for_post(first)
+    assert batched[second] == [] and batched["missing"] == []
+
+
+def test_comment_pages(db):
+    post_id, quiet = make_post(db), make_post(db)
+    # Equal timestamps are ordered by ID, so no comment is skipped or repeated
+    ids = [make_comment(db, post_id, f"c{i}", timestamp=100 + i // 2) for i in range(7)]
+    seen, cursor = [], None
+    while True:
+        page, cursor = db.get_comments_page(post_id, 3, cursor)
+        assert len(page) <= 3
+        seen.extend(page)
+        if cursor is None:
+            break
+    assert [c["id"] for c in seen] == [c["id"] for c in db.get_comments_for_post(post_id)]
+    assert sorted(c["id"] for c in seen) == sorted(ids)
+    assert db.get_comments_page(quiet) == ([], None)
+
+    previews = db.get_comment_previews([post_id, quiet, "missing"], 2)
+    comments, cursor = previews[post_id]
+    assert [c["id"] for c in comments] == [c["id"] for c in seen[:2]]
+    assert [c["id"] for c in db.get_comments_page(post_id, 10, cursor)[0]] == [c["id"] for c in seen[2:]]
+    assert previews[quiet] == ([], None) and previews["missing"] == ([], None)
+    assert db.get_comment_previews([post_id], 7)[post_id][1] is None
+    with pytest.raises(ValueError):
+        db.get_comments_page(post_id, 3, "not a cursor")
+
+
+def test_activity(db):
+    quiet, busy, newest = (make_post(db, content=f"p{i}", timestamp=10 + i) for i in range(3))
+    make_comment(db, busy, "first", timestamp=50)
+    make_comment(db, busy, "second", timestamp=40)
+    post = db.get_post_by_id(busy)
+    assert (post["comment_count"], post["last_activity_at"]) == (2, 50)
+    assert (db.get_post_by_id(quiet)["comment_count"], db.get_post_by_id(quiet)["last_activity_at"]) == (0, 10)
+    posts, cursor = db.get_posts_page(2, sort="activity")
+    assert [p["id"] for p in posts] == [busy, newest] and posts[0]["comment_count"] == 2
+    posts, cursor = db.get_posts_page(2, cursor, sort="activity")
+    assert [p["id"] for p in posts] == [quiet] and cursor is None
+    for bad in ({"sort": "sideways"}, {"cursor": db.get_posts_page(1)[1], "sort": "activity"}):
+        with pytest.raises(ValueError):
+            db.get_posts_page(2, **bad)
+
+
+def test_votes(db):
+    db.save_user("alice", "x")
+    post_id = make_post(db)
+    assert db.upvote_post(post_id, "bob") == {"upvotes": 1, "downvotes": 0, "spam": 0}
+    assert db.upvote_post(post_id, "bob") is None
+    assert db.downvote_post(post_id, "bob") == {"upvotes": 0, "downvotes": 1, "spam": 1}
+    assert db.vote(post_id, "carol", "upvote")["upvotes"] == 1
+    assert db.vote("missing", "bob", "upvote") is None
+    assert db.vote(post_id, "dave", "sideways") is None
+    post = db.get_post_by_id(post_id)
+    assert (post["upvotes"], post["downvotes"]) == (1, 1)
+    # Spam flags are sticky once a post has been downvoted below zero
+    assert post["spam"] == 1
+
+
+def test_data_version(db):
+    versions = [db.get_data_version()[0]]
+    post_id = make_post(db)
+    versions.append(db.get_data_version()[0])
+    make_comment(db, post_id)
+    versions.append(db.get_data_version()[0])
+    db.vote(post_id, "bob", "upvote")
+    versions.append(db.get_data_version()[0])
+    db.update_post(post_id, "edited")
+    versions.append(db.get_data_version()[0])
+    assert versions == sorted(set(versions)), versions
+    # Reads and writes outside posts and comments leave it alone
+    db.get_posts_page(10)
+    db.save_user("carol", "x")
+    db.add_server("http://peer.example")
+    version, changed_at = db.get_data_version()
+    assert version == versions[-1] and changed_at >= time.time() - 60
+    # Saving a user who has posts resets the author popularity those posts rank by
+    db.save_user("alice", "x")
+    assert db.get_data_version()[0] > version
+
+
+def test_change_events(db):
+    events = []
+    db.set_change_callback(lambda event, post_id: events.append((event, post_id)))
+    post_id = make_post(db)
+    make_comment(db, post_id)
+    assert db.vote(post_id, "bob", "upvote")
+    assert db.vote(post_id, "bob", "upvote") is None  # no change, no event
+    assert db.update_post(post_id, "hello again")
+    assert db.save_user("carol", "hash")
+    assert events == [("post", post_id), ("comment", post_id), ("vote", post_id), ("edit", post_id), ("user", None)]
+    # Failed writes report nothing
+    del events[:]
+    assert db.vote("no-such-post", "bob", "upvote") is None
+    assert events == []
+
+
+def test_servers(db):
+    assert db.get_all_servers() == []
+    assert db.add_server("http://peer.example")
+    assert not db.add_server("http://peer.example")
+    assert db.get_all_servers() == ["http://peer.example"]
+
+
+def test_search(db):
+    post_id = make_post(db, content="The quick brown fox")
+    make_comment(db, post_id, "a lazy dog")
+    make_post(db, content="nothing to see")
+    assert db.search("fox") == ([], None)  # not indexed yet
+    while db.index_pending_search():
+        pass
+    results, cursor = db.search("QUICK fox")
+    assert [r["id"] for r in results] == [post_id] and cursor is None
+    assert [r["type"] for r in db.search("dog")[0]] == ["comment"]
+    db.update_post(post_id, "now about cats")
+    db.index_pending_search()
+    assert db.search("fox")[0] == [] and len(db.search("cats")[0]) == 1
+    for bad in ("", "  ?! "):
+        with pytest.raises(ValueError):
+            db.search(bad)
+
+
+def test_search_pages_ignore_rows_indexed_later(db, monkeypatch):
+    monkeypatch.setattr("rssx.database.db.SEARCH_CANDIDATES", 4)
+    for i in range(6):
+        make_post(db, content=f"fox number {i}", timestamp=i)
+    while db.index_pending_search():
+        pass
+    expected = [r["id"] for r in db.search("fox", limit=10)[0]]
+    assert len(expected) == 4
+    seen, cursor = db.search("fox", limit=2)
+    # New matches would push the oldest candidates out of the window
+    for i in range(3):
+        make_post(db, content=f"another fox {i}", timestamp=100 + i)
+    while db.index_pending_search():
+        pass
+    while cursor:
+        page, cursor = db.search("fox", limit=2, cursor=cursor)
+        seen.extend(page)
+    assert [r["id"] for r in seen] == expected
+
+
+def test_spam_rescan(db):
+    clean, dirty = make_post(db, content="fine"), make_post(db, content="Buy CHEAP pills")
+    assert db.rescan_spam_if_blacklist_changed(["cheap"])
+    assert not db.rescan_spam_if_blacklist_changed(["cheap"])
+    assert db.get_post_by_id(dirty)["spam"] == 1
+    assert db.get_post_by_id(clean)["spam"] == 0
+
+
+def test_archiving(db):
+    old = make_post(db, content="an ancient fox", timestamp=1000)
+    make_comment(db, old, "old comment", timestamp=1001)
+    db.vote(old, "bob", "upvote")
+    fresh = make_post(db, content="a fresh fox", timestamp=int(time.time()))
+    while db.index_pending_search():
+        pass
+    assert db.archive_old_posts(30) == 1
+    assert db.archive_old_posts(30) == 0
+    post = db.get_post_by_id(old)
+    assert post["content"] == "an ancient fox" and post["upvotes"] == 1 and post["archived"]
+    assert [c["content"] for c in db.get_comments_for_post(old)] == ["old comment"]
+    assert [c["content"] for c in db.get_comments_page(old)[0]] == ["old comment"]
+    assert [p["id"] for p in db.get_posts_page(10)[0]] == [fresh]
+    # Archived posts are read-only
+    assert db.vote(old, "carol", "upvote") is None
+    # Hot results come first, then archived ones
+    first, cursor = db.search("fox", limit=1)
+    assert [r["id"] for r in first] == [fresh] and cursor
+    second, cursor = db.search("fox", limit=1, cursor=cursor)
+    assert [r["id"] for r in second] == [old] and second[0]["archived"] and cursor is None
+    assert [r["type"] for r in db.search("comment")[0]] == ["comment"]
+
+
+def test_long_content(db):
+    # Long enough to be stored compressed on backends that compress
+    body = "A long essay about foxes and hounds. " * 40
+    post_id = make_post(db, content=body + "Buy cheap pills", timestamp=1000)
+    make_comment(db, post_id, body + "with a note on badgers")
+    assert db.get_post_by_id(post_id)["content"] == body + "Buy cheap pills"
+    assert db.get_comments_for_post(post_id)[0].content.endswith("badgers")
+    while db.index_pending_search():
+        pass
+    assert [r["content"] for r in db.search("badgers")[0]] == [body + "with a note on badgers"]
+    assert db.rescan_spam_if_blacklist_changed(["cheap"])
+    assert db.get_post_by_id(post_id)["spam"] == 1
+    # Editing a long post replaces its tokens in the search index
+    assert db.update_post(post_id, body + "now about otters")
+    db.index_pending_search()
+    assert db.search("pills")[0] == [] and len(db.search("otters")[0]) == 1
+    assert db.rebuild_search_index() and len(db.search("otters")[0]) == 1
+    assert db.archive_old_posts(30) == 1
+    assert db.get_post_by_id(post_id)["content"].endswith("otters")
+    assert [r["type"] for r in db.search("otters")[0]] == ["post"]
+    assert len(db.search("badgers")[0]) == 1
+
+
+def test_backup(db):
+    post_id = make_post(db, content="kept in the backup")
+    make_comment(db, post_id)
+    tmp = os.path.dirname(db.archives.archive_dir)
+    stats = db.backup(os.path.join(tmp, "copy.db"), pages=1, pause=0)
+    assert stats is not None and stats.steps > 1
+    copy = Database(stats.path)
+    try:
+        assert copy.get_post_by_id(post_id)["content"] == "kept in the backup"
+        assert len(copy.get_comments_for_post(post_id)) == 1
+    finally:
+        copy.close()
+    # Only the keep newest snapshots survive
+    snapshot_dir = os.path.join(tmp, "snapshots")
+    os.makedirs(snapshot_dir)
+    for old in ("rssx-20000101-000000.db", "rssx-20000102-000000.db"):
+        open(os.path.join(snapshot_dir, old), "w").close()
+    stats = db.snapshot(snapshot_dir, keep=2)
+    assert sorted(os.listdir(snapshot_dir)) == ["rssx-20000102-000000.db", os.path.basename(stats.path)]
@@ -0,0 +1,93 @@
+"""Votes from many processes and threads must leave consistent counters.
+
+Several processes, each running several threads with its own pooled
+Database, vote randomly on a handful of hot posts. Afterwards every post's
+upvotes/downvotes must equal the votes table, and every author's
+popularity must equal the number of successful upvotes their posts got.
+"""
+import multiprocessing
+import random
+import threading
+from collections import Counter
+
+from rssx.database.db import Database
+
+POSTS = 5
+AUTHORS = 3
+VOTERS = 200
+PROCESSES = 3
+THREADS = 3
+VOTES = 300  # per thread
+
+
+def worker(args):
+    db_path, seed, threads, votes = args
+    db = Database(db_path, pool_size=threads)
+    upvotes_by_post = Counter()
+    errors = []
+    lock = threading.Lock()
+
+    def run(thread_seed):
+        rng = random.Random(thread_seed)
+        local = Counter()
+        for _ in range(votes):
+            post_id = f"hot{rng.randrange(POSTS)}"
+            vote_type = rng.choice(("upvote", "downvote"))
+            counts = db.vote(post_id, f"voter{rng.randrange(VOTERS)}", vote_type)
+            if counts is None:
+                continue
+            if counts["upvotes"] < 0 or counts["downvotes"] < 0:
+                with lock:
+                    errors.append(f"negative counts on {post_id}: {counts}")
+            if vote_type == "upvote":
+                local[post_id] += 1
+        with lock:
+            upvotes_by_post.update(local)
+
+    pool = [threading.Thread(target=run, args=(seed * 1000 + i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    db.close()
+    return upvotes_by_post, errors
+
+
+def test_counters_match_votes_table(tmp_path):
+    db_path = str(tmp_path / "votes.db")
+    db = Database(db_path)
+    try:
+        for i in range(AUTHORS):
+            db.save_user(f"author{i}", "x")
+        for i in range(POSTS):
+            db.save_post(
+                {"id": f"hot{i}", "author": f"author{i % AUTHORS}", "content": "hot", "timestamp": i, "signature": ""}
+            )
+
+        with multiprocessing.Pool(PROCESSES) as pool:
+            results = pool.map(worker, [(db_path, seed, THREADS, VOTES) for seed in range(PROCESSES)])
+
+        upvotes_by_post = Counter()
+        failures = []
+        for counter, errors in results:
+            upvotes_by_post.update(counter)
+            failures.extend(errors)
+
+        with db.pool.connection() as conn:
+            for post_id, upvotes, downvotes in conn.execute("SELECT id, upvotes, downvotes FROM posts ORDER BY id"):
+                tally = dict(
+                    conn.execute(
+                        "SELECT vote_type, COUNT(*) FROM votes WHERE post_id = ? GROUP BY vote_type", (post_id,)
+                    ).fetchall()
+                )
+                if (upvotes, downvotes) != (tally.get("upvote", 0), tally.get("downvote", 0)):
+                    failures.append(f"{post_id}: counters {upvotes}/{downvotes}, votes table {tally}")
+            expected = Counter()
+            for post_id, count in upvotes_by_post.items():
+                expected[f"author{int(post_id[3:]) % AUTHORS}"] += count
+            for username, popularity in conn.execute("SELECT username, popularity FROM users"):
+                if popularity != expected[username]:
+                    failures.append(f"{username}: popularity {popularity}, expected {expected[username]}")
+    finally:
+        db.close()
+    assert not failures, "\n".join(failures)